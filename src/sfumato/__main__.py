@@ -0,0 +1,4 @@
+# python -m sfumato <サブコマンド> (sfumato コマンドと同じ)
+from sfumato.cli import main
+
+main()
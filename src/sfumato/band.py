@@ -0,0 +1,192 @@
+# 複数局 (バンド全体) の送信・受信モデル
+#
+# バンドは中心周波数 center_freq のまわりの複素ベースバンド信号 (SDRのキャプチャと同じ) で、
+# サンプリング周波数は num_channels * channel_fs。局はチャンネル番号 k で指定し、
+# 搬送波は center_freq + k * channel_fs (k は負でもよい)。
+# 送信はポリフェーズ合成器、受信はポリフェーズ・チャンネライザで全チャンネルを一度に
+# 処理するので、局を1つ増やしたときに増える演算は、その局の低レート (channel_fs) の
+# FM変調・復調だけになる。
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from sfumato import settings
+from sfumato.dsp.channelizer import PolyphaseChannelizer, PolyphaseSynthesizer
+from sfumato.receiver import FmReceiver
+from sfumato.transmitter import FmTransmitter
+
+
+class MultiStationTransmitter:
+    def __init__(
+        self,
+        num_channels: int = settings.BAND_CHANNELS,
+        channel_fs: float = settings.IQ_FS,
+        center_freq: float = 0.0,
+        taps_per_channel: int = 16,
+        precision: str = settings.PRECISION,
+    ):
+        """
+        複数のFM局を含むバンド (複素ベースバンド) を合成する送信機
+
+        Args:
+            num_channels: チャンネル数 M (バンドのサンプリング周波数 = M * channel_fs)
+            channel_fs: チャンネル間隔 = 各局のIQのサンプリング周波数 (Hz)
+            center_freq: バンドの中心周波数 (Hz)。搬送波の表示用
+            taps_per_channel: 合成フィルタバンクの各枝のタップ数
+            precision: 演算精度 "float64" / "float32"
+        """
+        self.num_channels = int(num_channels)
+        self.channel_fs = channel_fs
+        self.band_fs = self.num_channels * channel_fs
+        self.center_freq = center_freq
+        self.taps_per_channel = taps_per_channel
+
+        # 各局は FmTransmitter.modulate_iq で channel_fs のIQ信号にする
+        self.tx = FmTransmitter(iq_fs=channel_fs, precision=precision)
+
+    def carrier_freq(self, channel: int) -> float:
+        """チャンネル番号 -> 搬送波周波数 (Hz)"""
+        return self.center_freq + channel * self.channel_fs
+
+    def modulate(self, stations: dict[int, np.ndarray]) -> np.ndarray:
+        """
+        局ごとの音声を受け取り、バンド全体の複素ベースバンド信号を返す
+
+        Args:
+            stations: {チャンネル番号: 音声 (N,) または (N, 2) [48kHz]}
+
+        Returns:
+            np.ndarray: 複素IQ信号 [num_channels * channel_fs]。
+                長さは一番長い局に合わせる (短い局は無音ではなく無信号になる)
+        """
+        channels = _channel_columns(stations, self.num_channels)
+        iq = {ch: self.tx.modulate_iq(audio) for ch, audio in stations.items()}
+
+        n_frames = max((len(x) for x in iq.values()), default=0)
+        frames = np.zeros((n_frames, self.num_channels), dtype=self.tx.complex_dtype)
+        for ch, x in iq.items():
+            frames[: len(x), channels[ch]] = x
+
+        synthesizer = PolyphaseSynthesizer(self.num_channels, self.taps_per_channel)
+        return synthesizer.process(frames)
+
+
+class MultiStationReceiver:
+    def __init__(
+        self,
+        channels: Iterable[int],
+        num_channels: int = settings.BAND_CHANNELS,
+        channel_fs: float = settings.IQ_FS,
+        taps_per_channel: int = 16,
+        decimation: str = "fir",
+        precision: str = settings.PRECISION,
+    ):
+        """
+        バンド全体の IQ信号から、複数の局を同時に受信する受信機
+
+        ポリフェーズ・チャンネライザで全チャンネルを一度に channel_fs のIQに分け、
+        受信する局だけを FmReceiver (process_iq / process_iq_block) で復調する。
+
+        Args:
+            channels: 受信するチャンネル番号 (MultiStationTransmitter と同じ番号)
+            num_channels: チャンネル数 M
+            channel_fs: チャンネル間隔 = 各局のIQのサンプリング周波数 (Hz)
+            taps_per_channel: チャンネライザの各枝のタップ数
+            decimation: FmReceiver の間引きの方式
+            precision: 演算精度 "float64" / "float32"
+        """
+        self.num_channels = int(num_channels)
+        self.channel_fs = channel_fs
+        self.band_fs = self.num_channels * channel_fs
+        self.taps_per_channel = taps_per_channel
+        self.channels = list(channels)
+        self._columns = _channel_columns(self.channels, self.num_channels)
+
+        self.receivers = {
+            ch: FmReceiver(iq_fs=channel_fs, decimation=decimation, precision=precision)
+            for ch in self.channels
+        }
+        self.reset_stream()
+
+    def channelize(self, band_iq: np.ndarray) -> np.ndarray:
+        """
+        バンド全体を全チャンネルのIQに分ける
+
+        Returns:
+            np.ndarray: (N, num_channels)。列 k % num_channels がチャンネル k
+        """
+        channelizer = PolyphaseChannelizer(self.num_channels, self.taps_per_channel)
+        return channelizer.process(band_iq)
+
+    def process(self, band_iq: np.ndarray) -> dict[int, np.ndarray]:
+        """
+        バンド全体の IQ信号を受け取り、局ごとのステレオ音声を返す
+
+        Returns:
+            dict[int, np.ndarray]: {チャンネル番号: ステレオ音声 (M, 2) [48 kHz]}
+        """
+        frames = self.channelize(band_iq)
+        if not self.receivers:
+            return {}
+
+        # 復調・間引きは全局 (列) をまとめて1回で行う (受信機の設定は全局で同じ)
+        columns = [self._columns[ch] for ch in self.receivers]
+        rx0 = next(iter(self.receivers.values()))
+        mpx = rx0.process_iq(frames[:, columns])
+
+        # PLL はサンプルごとの逐次処理なので局ごとに回す
+        audio = {}
+        for i, (ch, rx) in enumerate(self.receivers.items()):
+            mpx_signal = np.ascontiguousarray(mpx[:, i])
+            carrier_38k = rx._recover_carrier(mpx_signal)
+            audio[ch] = rx._stereo_decode(mpx_signal, carrier_38k)
+        return audio
+
+    # ==========================================
+    # ブロック (ストリーミング) 処理
+    # ==========================================
+
+    def reset_stream(self):
+        """ブロック処理の内部状態を初期化する"""
+        self._channelizer = PolyphaseChannelizer(
+            self.num_channels, self.taps_per_channel
+        )
+        for rx in self.receivers.values():
+            rx.reset_stream()
+
+    def process_block(self, band_block: np.ndarray) -> dict[int, np.ndarray]:
+        """
+        バンドのIQブロックを1つ受け取り、局ごとに確定したステレオ音声を返す
+        """
+        frames = self._channelizer.process(band_block)
+        return {
+            ch: rx.process_iq_block(frames[:, self._columns[ch]])
+            for ch, rx in self.receivers.items()
+        }
+
+    def flush(self) -> dict[int, np.ndarray]:
+        """各局の受信機に残っている音声を返す"""
+        audio = {ch: rx.flush() for ch, rx in self.receivers.items()}
+        self.reset_stream()
+        return audio
+
+    def stream(
+        self, band_blocks: Iterable[np.ndarray]
+    ) -> Iterator[dict[int, np.ndarray]]:
+        """
+        バンドのIQブロックの列を受け取り、局ごとの音声ブロックの辞書を順に返す
+        """
+        self.reset_stream()
+        for band_block in band_blocks:
+            yield self.process_block(band_block)
+        yield self.flush()
+
+
+def _channel_columns(channels: Iterable[int], num_channels: int) -> dict[int, int]:
+    """チャンネル番号 (負も可) -> フィルタバンクの列番号"""
+    columns = {}
+    for ch in channels:
+        if not -(num_channels // 2) <= ch < num_channels - num_channels // 2:
+            raise ValueError(f"Channel {ch} is out of the band (M={num_channels})")
+        columns[ch] = ch % num_channels
+    return columns
@@ -0,0 +1,406 @@
+# 処理段ごとのベンチマーク
+#
+# 送信 -> 通信路 -> 受信 の各段を、いくつかの信号長で計測し、
+#   - 処理時間 (repeat 回の最小値)
+#   - スループット (入力サンプル/秒) と 実時間比 (信号の長さ / 処理時間)
+#   - ピークメモリ (tracemalloc で計測。時間計測とは別に1回だけ実行する)
+# を JSON に書き出す。コミットごとの結果を比べれば性能の劣化がわかる。
+# 受信の段は FmReceiver と同じ前段 (既定は "ddc"、--front-end で選ぶ) で分けるので、
+# 段ごとの時間の合計が rx.process とほぼ一致する。
+# --output を省略すると、結果は一時ディレクトリ (DEFAULT_OUTPUT_DIR) に保存する。
+#
+#   python -m sfumato.bench --durations 1 5 10 --repeat 3 --output old.json
+#   python -m sfumato.bench --front-end mixer --stages rx.mix_to_baseband rx.process
+#   python -m sfumato.bench --compare old.json new.json
+#   python -m sfumato.bench --discriminators --durations 5
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+import scipy
+
+from sfumato import settings
+from sfumato.channnel import add_awgn
+from sfumato.dsp.discriminator import DISCRIMINATOR_METHODS
+from sfumato.dsp.pll import PilotPLL
+from sfumato.receiver import FmReceiver
+from sfumato.sweep import _receive, audio_metrics
+from sfumato.transmitter import FmTransmitter
+from sfumato.utils.audio_source import AudioSource
+from sfumato.utils.output_audio import save_audio
+
+DEFAULT_DURATIONS = (1.0, 5.0, 10.0)
+DEFAULT_OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "sfumato-bench")
+DISCRIMINATOR_SNR_DBS = (10.0, 20.0, 30.0, 40.0)
+
+
+def _stages(
+    duration: float, tmp_dir: str, front_end: str | None = None
+) -> list[tuple[str, Callable, int, float]]:
+    """
+    計測する段の一覧を作る (前段の出力を次段の入力として用意しておく)
+
+    Args:
+        front_end: 受信機の前段 ("ddc" / "mixer")。None なら FmReceiver の既定
+
+    Returns:
+        list: (段の名前, 引数なしの関数, 入力サンプル数, 入力のサンプリング周波数)
+    """
+    audio = AudioSource().stereo_sine_tone(440, 1000, duration)
+    tx = FmTransmitter()
+    rx = FmReceiver() if front_end is None else FmReceiver(front_end=front_end)
+
+    # 各段の入力を前もって作っておく
+    l_ch, r_ch = audio[:, 0], audio[:, 1]
+    l_pre = tx.emphasis.pre_emphasis(l_ch)
+    r_pre = tx.emphasis.pre_emphasis(r_ch)
+    l_up = tx._upsample(l_pre, tx.audio_fs, tx.mpx_fs)
+    r_up = tx._upsample(r_pre, tx.audio_fs, tx.mpx_fs)
+    mpx_tx = tx._generate_mpx(l_up, r_up)
+    rf = tx.modulate(audio)
+    noisy = add_awgn(rf, settings.DEFAULT_SNR_DB, seed=0)
+
+    # rx.process と同じ前段: ミキシング (RFレート) か DDC (RF -> IQ_FS) か
+    if rx.front_end == "ddc":
+        front_name = "rx.ddc"
+
+        def front():
+            return np.concatenate([rx.ddc.process(noisy), rx.ddc.flush()])
+
+        def demodulate():
+            # process_iq と同じく RF経路のスケールに揃えるところまで
+            return rx._demodulate(baseband) * (rx.iq_fs / rx.rf_fs)
+
+        demod_fs = rx.iq_fs
+    else:
+        front_name = "rx.mix_to_baseband"
+
+        def front():
+            return rx._mix_to_baseband(noisy)
+
+        def demodulate():
+            return rx._demodulate(baseband)
+
+        demod_fs = rx.rf_fs
+
+    baseband = front()
+    freq_dev = demodulate()
+    mpx = rx._decimate(freq_dev, fs_from=demod_fs)
+    carrier = rx._recover_carrier(mpx)
+    decoded = rx._stereo_decode(mpx, carrier)
+
+    def pll():
+        # 状態を持ち越さないよう毎回作る
+        return PilotPLL(fs=rx.mpx_fs).process(mpx)
+
+    def save():
+        with contextlib.redirect_stdout(io.StringIO()):
+            save_audio(decoded, rx.audio_fs, os.path.join(tmp_dir, "bench.wav"))
+
+    n_audio = len(audio)
+    n_mpx = len(mpx_tx)
+    n_rf = len(rf)
+    return [
+        (
+            "tx.pre_emphasis",
+            lambda: tx.emphasis.pre_emphasis(l_ch),
+            n_audio,
+            tx.audio_fs,
+        ),
+        (
+            "tx.upsample_audio_to_mpx",
+            lambda: tx._upsample(l_pre, tx.audio_fs, tx.mpx_fs),
+            n_audio,
+            tx.audio_fs,
+        ),
+        ("tx.generate_mpx", lambda: tx._generate_mpx(l_up, r_up), n_mpx, tx.mpx_fs),
+        (
+            "tx.upsample_mpx_to_rf",
+            lambda: tx._upsample(mpx_tx, tx.mpx_fs, tx.rf_fs),
+            n_mpx,
+            tx.mpx_fs,
+        ),
+        ("tx.modulate", lambda: tx.modulate(audio), n_audio, tx.audio_fs),
+        (
+            "tx.modulate_reference",
+            lambda: tx.modulate_reference(audio),
+            n_audio,
+            tx.audio_fs,
+        ),
+        (
+            "channel.add_awgn",
+            lambda: add_awgn(rf, settings.DEFAULT_SNR_DB, seed=0),
+            n_rf,
+            tx.rf_fs,
+        ),
+        (front_name, front, n_rf, rx.rf_fs),
+        ("rx.demodulate", demodulate, len(baseband), demod_fs),
+        (
+            "rx.decimate",
+            lambda: rx._decimate(freq_dev, fs_from=demod_fs),
+            len(freq_dev),
+            demod_fs,
+        ),
+        ("rx.process", lambda: rx.process(noisy), n_rf, rx.rf_fs),
+        ("rx.pll", pll, len(mpx), rx.mpx_fs),
+        (
+            "rx.stereo_decode",
+            lambda: rx._stereo_decode(mpx, carrier),
+            len(mpx),
+            rx.mpx_fs,
+        ),
+        ("io.save_audio", save, len(decoded), rx.audio_fs),
+    ]
+
+
+def _measure(func: Callable, repeat: int) -> tuple[float, int]:
+    """(repeat 回の最小時間 [s], ピークメモリ [bytes]) を返す"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    # メモリは tracemalloc の計測で遅くなるので、時間とは別に1回だけ測る
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(times), peak
+
+
+def run_benchmarks(
+    durations=DEFAULT_DURATIONS,
+    repeat: int = 3,
+    stages: list[str] | None = None,
+    verbose: bool = True,
+    front_end: str | None = None,
+) -> dict:
+    """
+    各段を信号長ごとに計測する
+
+    Args:
+        durations: 信号の長さ (秒) のリスト
+        repeat: 時間計測の繰り返し回数 (最小値を採る)
+        stages: 計測する段の名前 (None なら全部)
+        verbose: 計測しながら結果を表示する
+        front_end: 受信機の前段 ("ddc" / "mixer")。None なら FmReceiver の既定
+
+    Returns:
+        dict: {"meta": 実行環境, "results": 段・信号長ごとの計測結果のリスト}
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix="sfumato-bench-") as tmp_dir:
+        for duration in durations:
+            for name, func, n_samples, fs in _stages(duration, tmp_dir, front_end):
+                if stages is not None and name not in stages:
+                    continue
+                seconds, peak = _measure(func, repeat)
+                result = {
+                    "stage": name,
+                    "duration_s": duration,
+                    "input_samples": n_samples,
+                    "input_fs": fs,
+                    "seconds": seconds,
+                    "samples_per_s": n_samples / seconds,
+                    "realtime_factor": (n_samples / fs) / seconds,
+                    "peak_memory_bytes": peak,
+                }
+                results.append(result)
+                if verbose:
+                    _print_result(result)
+
+    meta = _meta(repeat)
+    meta["front_end"] = front_end or FmReceiver().front_end
+    return {"meta": meta, "results": results}
+
+
+def run_discriminator_benchmark(
+    duration: float = 5.0,
+    snr_dbs=DISCRIMINATOR_SNR_DBS,
+    repeat: int = 3,
+    verbose: bool = True,
+) -> dict:
+    """
+    FM検波の方式ごとに、処理時間と復調音声の SN比を比べる
+
+    IQ (IQ_FS) の検波だけを計測し、SN比は雑音を加えた IQ を process_iq で
+    受信した音声を、雑音無しで "unwrap" で受信した音声と比べて求める。
+
+    Returns:
+        dict: run_benchmarks と同じ形 (段の名前は "rx.discriminator.<方式>"。
+            結果には SN比ごとの audio_snr_db も入る)
+    """
+    audio = AudioSource().stereo_sine_tone(440, 1000, duration)
+    iq = FmTransmitter().modulate_iq(audio)
+    reference = _receive(iq, {})
+    skip = int(0.25 * settings.AUDIO_FS)  # PLL の引き込みを除く
+    noisy = {snr: add_awgn(iq, snr, seed=0) for snr in snr_dbs}
+
+    results = []
+    for name in ("unwrap", *DISCRIMINATOR_METHODS):
+        rx = FmReceiver(discriminator=name)
+        rx._demodulate(iq[:1024])  # numba の JIT コンパイルを計測から外す
+        seconds, peak = _measure(lambda rx=rx: rx._demodulate(iq), repeat)
+        result = {
+            "stage": f"rx.discriminator.{name}",
+            "duration_s": duration,
+            "input_samples": len(iq),
+            "input_fs": settings.IQ_FS,
+            "seconds": seconds,
+            "samples_per_s": len(iq) / seconds,
+            "realtime_factor": (len(iq) / settings.IQ_FS) / seconds,
+            "peak_memory_bytes": peak,
+            "audio_snr_db": {
+                str(snr): audio_metrics(
+                    _receive(noisy[snr], {"discriminator": name}), reference, skip
+                )["audio_snr_db"]
+                for snr in snr_dbs
+            },
+        }
+        results.append(result)
+        if verbose:
+            _print_result(result)
+            print(
+                "    audio SNR: "
+                + "  ".join(
+                    f"{snr:g} dB -> {value:6.2f} dB"
+                    for snr, value in zip(snr_dbs, result["audio_snr_db"].values())
+                )
+            )
+
+    return {"meta": _meta(repeat), "results": results}
+
+
+def save_results(report: dict, output: str | None = None) -> str:
+    """
+    計測結果を JSON に保存する (output が None なら DEFAULT_OUTPUT_DIR にコミット名で保存)
+    """
+    if output is None:
+        commit = report["meta"].get("git_commit") or "nogit"
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(DEFAULT_OUTPUT_DIR, f"bench-{commit[:10]}-{stamp}.json")
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+def compare_results(old: dict, new: dict) -> list[dict]:
+    """
+    2つの計測結果を比べる (speedup > 1 なら new の方が速い)
+    """
+    old_index = {(r["stage"], r["duration_s"]): r for r in old["results"]}
+    rows = []
+    for r in new["results"]:
+        base = old_index.get((r["stage"], r["duration_s"]))
+        if base is None:
+            continue
+        rows.append(
+            {
+                "stage": r["stage"],
+                "duration_s": r["duration_s"],
+                "old_seconds": base["seconds"],
+                "new_seconds": r["seconds"],
+                "speedup": base["seconds"] / r["seconds"],
+                "memory_ratio": r["peak_memory_bytes"]
+                / max(base["peak_memory_bytes"], 1),
+            }
+        )
+    return rows
+
+
+def _meta(repeat: int) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "git_commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "precision": settings.PRECISION,
+        "repeat": repeat,
+    }
+
+
+def _print_result(r: dict):
+    print(
+        f"{r['stage']:<26} {r['duration_s']:6.1f}s  {r['seconds'] * 1e3:9.1f} ms  "
+        f"{r['samples_per_s'] / 1e6:8.2f} MS/s  x{r['realtime_factor']:8.1f}  "
+        f"{r['peak_memory_bytes'] / 2**20:8.1f} MiB"
+    )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="sfumato bench", description="Sfumato per-stage benchmark"
+    )
+    parser.add_argument("--durations", type=float, nargs="+", default=DEFAULT_DURATIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", default=None)
+    parser.add_argument(
+        "--output",
+        default=None,
+        help=f"JSON file to write (default: a new file in {DEFAULT_OUTPUT_DIR})",
+    )
+    parser.add_argument(
+        "--front-end",
+        choices=("ddc", "mixer"),
+        default=None,
+        help="receiver front end to time (default: FmReceiver's default)",
+    )
+    parser.add_argument(
+        "--discriminators",
+        action="store_true",
+        help="compare FM discriminators (speed and audio SNR)",
+    )
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two JSON files"
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        for row in compare_results(old, new):
+            print(
+                f"{row['stage']:<26} {row['duration_s']:6.1f}s  "
+                f"x{row['speedup']:6.2f} speed  x{row['memory_ratio']:6.2f} memory"
+            )
+        return
+
+    if args.discriminators:
+        report = run_discriminator_benchmark(args.durations[0], repeat=args.repeat)
+    else:
+        report = run_benchmarks(
+            args.durations, args.repeat, args.stages, front_end=args.front_end
+        )
+    print(f"Saved benchmark results to: {save_results(report, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
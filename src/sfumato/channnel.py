@@ -1,25 +1,202 @@
 import numpy as np
 
+from sfumato import settings
 
-def add_awgn(signal: np.ndarray, snr_db: float) -> np.ndarray:
+# 雑音を作る単位 (サンプル数)。チャンク k の雑音は seed とチャンク番号 k だけで決まる
+NOISE_CHUNK_SIZE = 1 << 16
+
+
+def signal_power(signal: np.ndarray) -> float:
+    """
+    信号の平均電力 mean(|x|^2) (一時配列を作らずに1回の走査で計算する)
+    """
+    x = np.asarray(signal)
+    if x.size == 0:
+        return 0.0
+    return float(np.vdot(x, x).real) / x.size
+
+
+class AwgnChannel:
+    """
+    白色ガウス雑音(AWGN)の通信路
+
+    雑音は numpy.random.Generator で float32 のまま作り、信号に直接足す。
+    信号全体の長さの雑音配列は作らず、NOISE_CHUNK_SIZE ごとに生成して足していく。
+
+    チャンク k の雑音は SeedSequence(seed).spawn() の k 番目の子
+    (spawn_key の末尾が k の SeedSequence) から作るので、信号の中の位置だけで決まる。
+    そのため、同じ seed と電力なら、全体を一度に処理しても、ブロックに分けても、
+    範囲を分けて並列に処理しても (apply(block, start=...)) 同じ結果になる。
+
+    電力は signal_power で固定するか、None なら
+        - apply: 渡した信号全体の平均電力
+        - process (ブロック処理): それまでに受け取った全サンプルの平均電力 (逐次推定)
+    を使う。逐次推定では、結果はブロックの分け方に依存する。
+
+    SN比は実数RF信号 (rf_fs, 雑音は 0〜rf_fs/2 に広がる) に対して定義する。
+    複素ベースバンド (iq_fs) の信号には、RF を受信機でミキシングしたときと
+    帯域内の雑音密度 (搬送波電力との比) が同じになる雑音を加える。
+    RF では信号の電力 Ps = A^2/2 に対して雑音 Pn = Ps / SNR が rf_fs の帯域に広がり、
+    ミキシング後の信号成分の電力は A^2/4 になる。複素ベースバンドでは Ps = A^2 なので、
+    同じ密度にするには I/Q それぞれの分散を Ps / SNR * iq_fs / rf_fs にすればよい。
+    """
+
+    def __init__(
+        self,
+        snr_db: float,
+        seed: int | np.random.SeedSequence | None = None,
+        signal_power: float | None = None,
+        chunk_size: int = NOISE_CHUNK_SIZE,
+        iq_fs: float = settings.IQ_FS,
+        rf_fs: float = settings.RF_FS,
+    ):
+        """
+        Args:
+            snr_db: 信号対雑音比 (dB)。実数RF信号 (rf_fs) での値
+            seed: 乱数のシード (None なら毎回異なる雑音。ただしこのオブジェクトの中では固定)
+            signal_power: 信号の電力 (None なら信号から求める)
+            chunk_size: 雑音を生成する単位 (サンプル数)。結果はこの値にも依存する
+            iq_fs: 複素ベースバンド信号のサンプリング周波数
+            rf_fs: SN比の基準にする実数RF信号のサンプリング周波数
+        """
+        self.snr_db = snr_db
+        self.signal_power = signal_power
+        self.chunk_size = int(chunk_size)
+        self.iq_fs = iq_fs
+        self.rf_fs = rf_fs
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.reset()
+
+    def reset(self):
+        """ブロック処理の状態 (位置と電力の推定値) を初期化する"""
+        self._position = 0
+        self._power_sum = 0.0
+        self._power_count = 0
+        self._cache = (None, None, None)  # (チャンク番号, 複素数か, 標準正規雑音)
+
+    def spawn(self, n: int) -> list["AwgnChannel"]:
+        """
+        互いに独立な雑音を持つ通信路を n 個作る (SNR などの設定は同じ)
+        """
+        return [
+            AwgnChannel(
+                self.snr_db,
+                seq,
+                self.signal_power,
+                self.chunk_size,
+                self.iq_fs,
+                self.rf_fs,
+            )
+            for seq in self.seed_sequence.spawn(n)
+        ]
+
+    def noise_std(self, power: float, complex_signal: bool) -> float:
+        """電力 power の信号に対する雑音の標準偏差 (複素なら I/Q それぞれの値)"""
+        # dBをリニアな倍率に変換: SNR = Ps / Pn
+        # 10^(SNR/10) = Ps / Pn  =>  Pn = Ps / 10^(SNR/10)
+        noise_power = power / (10 ** (self.snr_db / 10))
+        if complex_signal:
+            # RF をミキシングしたときと帯域内の雑音密度を揃える (クラスの説明を参照)
+            return float(np.sqrt(noise_power * self.iq_fs / self.rf_fs))
+        return float(np.sqrt(noise_power))
+
+    def _chunk_noise(self, k: int, complex_signal: bool) -> np.ndarray:
+        # チャンク k の標準正規雑音 (float32 / complex64)
+        if self._cache[:2] == (k, complex_signal):
+            return self._cache[2]
+        seq = np.random.SeedSequence(
+            self.seed_sequence.entropy,
+            spawn_key=(*self.seed_sequence.spawn_key, k),
+        )
+        rng = np.random.default_rng(seq)
+        if complex_signal:
+            # I, Q を交互に並べて complex64 として見る
+            noise = rng.standard_normal(2 * self.chunk_size, dtype=np.float32)
+            noise = noise.view(np.complex64)
+        else:
+            noise = rng.standard_normal(self.chunk_size, dtype=np.float32)
+        self._cache = (k, complex_signal, noise)
+        return noise
+
+    def _add_noise(self, out: np.ndarray, start: int, std: float):
+        # out (位置 start から) に std 倍した雑音を足す
+        complex_signal = np.iscomplexobj(out)
+        n = len(out)
+        pos = 0
+        while pos < n:
+            k, offset = divmod(start + pos, self.chunk_size)
+            m = min(self.chunk_size - offset, n - pos)
+            noise = self._chunk_noise(k, complex_signal)[offset : offset + m]
+            out[pos : pos + m] += noise * np.float32(std)
+            pos += m
+
+    def apply(
+        self, signal: np.ndarray, start: int = 0, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        信号に雑音を加える
+
+        Args:
+            signal: 入力信号 (複素数または実数)
+            start: signal の先頭の位置 (サンプル)。信号を範囲に分けて並列に処理するときに使う
+            out: 出力先 (out=signal なら入力をそのまま書き換える)
+
+        Returns:
+            np.ndarray: 雑音を加えた信号 (float32 / complex64 の入力ならその dtype のまま)
+        """
+        signal = np.asarray(signal)
+        power = self.signal_power
+        if power is None:
+            power = signal_power(signal)
+        return self._noisy(signal, start, power, out)
+
+    def process(self, block: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        ブロックを1つ受け取り、雑音を加えて返す (位置は続きから数える)
+
+        signal_power が None なら、このブロックまでの平均電力を使う
+        """
+        block = np.asarray(block)
+        power = self.signal_power
+        if power is None:
+            self._power_sum += signal_power(block) * len(block)
+            self._power_count += len(block)
+            power = self._power_sum / max(self._power_count, 1)
+
+        out = self._noisy(block, self._position, power, out)
+        self._position += len(block)
+        return out
+
+    def _noisy(self, signal, start, power, out):
+        if out is None:
+            out = np.array(signal, dtype=np.result_type(signal, np.float32))
+        elif out is not signal:
+            out[...] = signal
+        self._add_noise(out, start, self.noise_std(power, np.iscomplexobj(out)))
+        return out
+
+
+def add_awgn(
+    signal: np.ndarray,
+    snr_db: float,
+    seed: int | None = None,
+    iq_fs: float = settings.IQ_FS,
+    rf_fs: float = settings.RF_FS,
+) -> np.ndarray:
     """
     信号に白色ガウス雑音(AWGN)を加える
 
     Args:
         signal: 入力信号（複素数または実数）
-        snr_db: 信号対雑音比 (dB)
+        snr_db: 信号対雑音比 (dB)。実数RF信号での値 (AwgnChannel を参照)
+        seed: 乱数のシード (None なら毎回異なる雑音)
+        iq_fs: 複素ベースバンド信号のサンプリング周波数
+        rf_fs: SN比の基準にする実数RF信号のサンプリング周波数
 
     Returns:
         noisy_signal: ノイズが付加された信号
     """
-    sig_power = np.mean(np.abs(signal) ** 2)
-
-    # dBをリニアな倍率に変換: SNR = Ps / Pn
-    # 10^(SNR/10) = Ps / Pn  =>  Pn = Ps / 10^(SNR/10)
-    noise_power = sig_power / (10 ** (snr_db / 10))
-
-    # ノイズ生成（実数信号）
-    noise_std = np.sqrt(noise_power)
-    noise = np.random.normal(0, noise_std, len(signal))
-
-    return signal + noise
+    return AwgnChannel(snr_db, seed=seed, iq_fs=iq_fs, rf_fs=rf_fs).apply(signal)
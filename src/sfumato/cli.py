@@ -0,0 +1,208 @@
+# コマンドライン (pip install 後は `sfumato <サブコマンド>` で使える)
+#
+#   sfumato tx input.wav outputs/capture --format cs16    # 音声 -> RF/IQファイル
+#   sfumato rx outputs/capture outputs/restored.wav      # RF/IQファイル -> 音声
+#   sfumato sim input.wav --snr 30 --trace trace.json    # 送信 -> AWGN -> 受信
+#   sfumato bench --durations 1 5                        # sfumato.bench と同じ引数
+#   sfumato plot input.wav outputs/restored.wav          # 入出力の比較グラフ
+#
+# 起動を軽くするため、このモジュールでは標準ライブラリと settings (定数だけ) 以外を
+# 読み込まない。numpy / scipy.signal / matplotlib などは、サブコマンドの中で
+# 必要になってから読み込む (plot 以外は matplotlib を読み込まない)。
+import argparse
+import sys
+
+from sfumato import settings
+
+
+def _cmd_tx(args):
+    from sfumato.transmitter import FmTransmitter
+    from sfumato.utils.iq_file import IqWriter, write_iq
+    from sfumato.utils.load_and_preprocess_wav import (
+        load_and_preprocess_wav,
+        stream_wav,
+    )
+
+    tx = FmTransmitter(precision=args.precision)
+
+    if args.iq:
+        # 複素ベースバンドにはブロック版が無いので一括で変調する
+        audio = load_and_preprocess_wav(args.input, settings.AUDIO_FS)
+        path = write_iq(
+            args.output,
+            tx.modulate_iq(audio),
+            tx.iq_fs,
+            fmt=args.format or "cf32",
+            center_freq=tx.fc,
+            scale=1.0,
+            description=f"sfumato tx (IQ) from {args.input}",
+        )
+    else:
+        # WAV を読みながら変調する (ファイル全体をメモリに載せない)
+        blocks = stream_wav(
+            args.input,
+            settings.AUDIO_FS,
+            normalize=args.normalize,
+            block_size=args.block_size,
+        )
+        with IqWriter(
+            args.output,
+            tx.rf_fs,
+            fmt=args.format or "rf32",
+            scale=1.0,
+            description=f"sfumato tx (RF) from {args.input}",
+        ) as writer:
+            for rf_block in tx.modulate_blocks(blocks):
+                writer.write(rf_block)
+        path = writer.data_path
+    print(f"Saved modulated signal to: {path}")
+
+
+def _cmd_rx(args):
+    from sfumato.receiver import FmReceiver
+    from sfumato.utils.iq_file import IqFile
+    from sfumato.utils.output_audio import AudioWriter
+
+    capture = IqFile(args.input)
+    rx = FmReceiver(
+        front_end=args.front_end,
+        precision=args.precision,
+        discriminator=args.discriminator,
+    )
+
+    # 複素なら IQ_FS のベースバンド、実数なら RF_FS のRF信号として受信する
+    expected_fs = rx.iq_fs if capture.is_complex else rx.rf_fs
+    if capture.fs != expected_fs:
+        sys.exit(
+            f"error: {args.input} is sampled at {capture.fs:g} Hz, "
+            f"expected {expected_fs:g} Hz"
+        )
+
+    # 受信しながら書き出す (ピークは1パスの PeakNormalizer で 0.9 に合わせる)
+    stream = rx.stream_iq if capture.is_complex else rx.stream
+    with AudioWriter(
+        args.output, rx.audio_fs, fmt=args.format, normalize_peak=0.9
+    ) as writer:
+        for audio_block in stream(capture.blocks(args.block_size)):
+            writer.write(audio_block)
+    print(f"Saved audio to: {args.output} ({args.format})")
+
+
+def _cmd_sim(args):
+    from sfumato.main import main as run_simulation
+
+    run_simulation(
+        headless=not args.ui,
+        trace_file=args.trace,
+        profile=args.profile,
+        show_graph=args.show,
+        input_file=args.input,
+        output_file=args.output,
+        snr_db=args.snr,
+        seed=args.seed,
+        plot=args.plot or args.show,
+    )
+
+
+def _cmd_bench(args, rest):
+    from sfumato.bench import main as run_bench
+
+    run_bench(rest)
+
+
+def _cmd_plot(args):
+    from sfumato.utils.load_and_preprocess_wav import load_and_preprocess_wav
+    from sfumato.utils.visualizer import plot_stereo_comparison
+
+    input_audio = load_and_preprocess_wav(args.input, settings.AUDIO_FS)
+    output_audio = load_and_preprocess_wav(args.restored, settings.AUDIO_FS)
+    plot_stereo_comparison(
+        input_audio,
+        output_audio,
+        settings.AUDIO_FS,
+        filename=args.output,
+        show=args.show,
+    )
+    if args.output is not None:
+        print(f"Saved graph to: {args.output}")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="sfumato", description="Sfumato FM stereo simulator"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    precisions = ("float64", "float32")
+
+    p = sub.add_parser("tx", help="modulate a WAV file to an RF/IQ capture")
+    p.add_argument("input", help="input WAV file")
+    p.add_argument("output", help="output capture (.sigmf-data/.sigmf-meta)")
+    p.add_argument("--iq", action="store_true", help="write complex baseband IQ")
+    p.add_argument(
+        "--format", default=None, help="cu8/cs16/cf32 (IQ) or ru8/rs16/rf32 (RF)"
+    )
+    p.add_argument("--block-size", type=int, default=4800, help="audio samples")
+    p.add_argument(
+        "--normalize",
+        choices=("scan", "limiter"),
+        default="scan",
+        help="peak normalization: two-pass scan or one-pass limiter (RF only)",
+    )
+    p.add_argument("--precision", choices=precisions, default=settings.PRECISION)
+    p.set_defaults(func=_cmd_tx)
+
+    p = sub.add_parser("rx", help="demodulate an RF/IQ capture to a WAV file")
+    p.add_argument("input", help="input capture (.sigmf-data/.sigmf-meta)")
+    p.add_argument("output", help="output WAV file")
+    p.add_argument("--block-size", type=int, default=65536, help="capture samples")
+    p.add_argument("--format", choices=("int16", "int24", "float32"), default="int16")
+    p.add_argument("--front-end", choices=("ddc", "mixer"), default="ddc")
+    p.add_argument(
+        "--discriminator",
+        choices=("unwrap", "conjugate", "fast"),
+        default=settings.DISCRIMINATOR,
+    )
+    p.add_argument("--precision", choices=precisions, default=settings.PRECISION)
+    p.set_defaults(func=_cmd_rx)
+
+    p = sub.add_parser("sim", help="run TX -> AWGN -> RX on a WAV file")
+    p.add_argument("input", nargs="?", default=None, help="input WAV file")
+    p.add_argument("-o", "--output", default=None, help="output WAV file")
+    p.add_argument("--snr", type=float, default=None, help="channel SNR [dB]")
+    p.add_argument("--seed", type=int, default=None, help="noise seed")
+    p.add_argument("--trace", default=None, help="JSON file for stage trace")
+    p.add_argument(
+        "--profile", action="store_true", help="add cProfile/tracemalloc per stage"
+    )
+    p.add_argument("--ui", action="store_true", help="show the animated radio UI")
+    p.add_argument("--plot", action="store_true", help="save the analysis graph")
+    p.add_argument("--show", action="store_true", help="show the analysis graph")
+    p.set_defaults(func=_cmd_sim)
+
+    # 引数は sfumato.bench にそのまま渡す (sfumato bench --help で一覧が出る)
+    p = sub.add_parser("bench", help="per-stage benchmark", add_help=False)
+    p.set_defaults(func=_cmd_bench)
+
+    p = sub.add_parser("plot", help="compare input and restored WAV files")
+    p.add_argument("input", help="original WAV file")
+    p.add_argument("restored", help="restored WAV file")
+    p.add_argument("-o", "--output", default=None, help="image file to write")
+    p.add_argument("--show", action="store_true", help="show the graph window")
+    p.set_defaults(func=_cmd_plot)
+
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    parser = _build_parser()
+    args, rest = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.func(args, rest)
+        return
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
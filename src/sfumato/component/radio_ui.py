@@ -7,6 +7,8 @@ import sys
 import time
 import random
 
+from sfumato.pipeline import PipelineHook
+
 
 class RadioUI:
     # ANSI Colors
@@ -144,3 +146,72 @@ ____) || |     | |__| || |  | |/ ____ \    | |   | |__| |
 
         print(f"\n{RadioUI.CYAN}╚{'═' * width}╝{RadioUI.RESET}")
         print(f"\n{RadioUI.DIM}   File saved to: {filename}{RadioUI.RESET}\n")
+
+
+# 段の名前 -> 開始時のログ (ステップ名, メッセージ, 色)
+_STAGE_MESSAGES = {
+    "io.generate_input": (
+        "SYSTEM",
+        "Input file missing. Generating Stereo Time Signal...",
+        RadioUI.YELLOW,
+    ),
+    "io.load_wav": ("PREPROCESS", "Loading '{file}'...", RadioUI.BLUE),
+    "tx.modulate": (
+        "MODULATION",
+        "FM Stereo Modulation in progress...",
+        RadioUI.BLUE,
+    ),
+    "channel.awgn": (
+        "CHANNEL",
+        "Applying AWGN (SNR={snr_db}dB)...",
+        RadioUI.YELLOW,
+    ),
+    "rx.demodulate": (
+        "DEMODULATION",
+        "Quadrature Demodulation to MPX...",
+        RadioUI.CYAN,
+    ),
+    "rx.recover_carrier": (
+        "STEREO",
+        "Recovering 38kHz Sub-carrier...",
+        RadioUI.CYAN,
+    ),
+    "rx.stereo_decode": ("STEREO", "Decoding L/R Channels...", RadioUI.CYAN),
+    "io.save_audio": ("IO", "Saving audio to {path}", RadioUI.GREEN),
+}
+
+# 段の名前 -> その段の前に表示する見出し
+_STAGE_SECTIONS = {
+    "io.load_wav": "--- [1] Transmitter Station ---",
+    "channel.awgn": "--- [2] Wireless Channel ---",
+    "rx.demodulate": "--- [3] Receiver Device ---",
+    "io.save_audio": "--- [4] Output ---",
+}
+
+
+class RadioUIObserver(PipelineHook):
+    """
+    FmPipeline の各段に合わせて RadioUI の演出を表示するフック
+
+    演出の待ち時間 (sleep) は段の計測の外側で行われるので、記録には含まれない。
+    """
+
+    def on_stage_start(self, pipeline, record):
+        stage = record["stage"]
+        if stage in _STAGE_SECTIONS:
+            newline = "" if stage == "channel.awgn" else "\n"
+            print(f"{newline}{RadioUI.BOLD}{_STAGE_SECTIONS[stage]}{RadioUI.RESET}")
+        if stage == "rx.demodulate":
+            RadioUI.tuning_animation()
+        if stage in _STAGE_MESSAGES:
+            step, message, color = _STAGE_MESSAGES[stage]
+            RadioUI.log(step, message.format(**record), color)
+
+    def on_stage_end(self, pipeline, record):
+        stage = record["stage"]
+        if stage == "tx.modulate":
+            RadioUI.on_air_animation(duration=2)
+        elif stage == "channel.awgn":
+            time.sleep(1)
+        elif stage == "io.save_audio":
+            RadioUI.reception_success(record["path"])
@@ -0,0 +1,167 @@
+import numpy as np
+
+from sfumato.dsp.filters import design_fir
+
+
+def prototype_filter(
+    num_channels: int, taps_per_channel: int = 16, window=("kaiser", 7.0)
+) -> np.ndarray:
+    """
+    フィルタバンクのプロトタイプ LPF (カットオフ = チャンネル間隔の半分)
+
+    チャンネル間隔を fs/M とすると、通過域 ±fs/(3M)・阻止域 ±2fs/(3M) 以上を
+    満たすように、長さ M * taps_per_channel の FIR を窓関数法で設計する。
+    (FM局の帯域 256kHz をチャンネル間隔 384kHz に収める場合、隣のチャンネルからの
+    折り返しは ±128kHz の外側に落ちる)
+
+    Args:
+        num_channels: チャンネル数 M
+        taps_per_channel: ポリフェーズの各枝のタップ数
+        window: 窓関数
+
+    Returns:
+        np.ndarray: FIR係数 (長さ M * taps_per_channel, DCゲイン 1)。読み取り専用
+    """
+    M = int(num_channels)
+    return design_fir(M * int(taps_per_channel), 1.0 / M, window=window)
+
+
+class PolyphaseChannelizer:
+    """
+    ポリフェーズ・フィルタバンク (FFT) によるチャンネライザ (臨界サンプリング)
+
+    入力 (サンプリング周波数 fs) を M 本のチャンネル (中心 k*fs/M, 帯域 fs/M) に
+    分け、それぞれを 0Hz に移して fs/M に間引いた複素ベースバンド信号を返す。
+        y_k[m] = Σ_n h[n] x[mM - n] exp(-j2πk(mM - n)/M)
+               = Σ_r exp(j2πkr/M) Σ_p h[pM + r] x[(m - p)M - r]
+    と分解すると、M 本の短いFIR (各 taps_per_channel タップ) と M点IFFT だけで
+    全チャンネルを同時に求められる。チャンネルを1本ずつミキシング・間引きする
+    場合と違い、演算量はチャンネル (局) の数によらない。
+
+    因果的なFIRなので flush は不要 (群遅延は (M*taps_per_channel - 1)/2 入力サンプル)。
+    """
+
+    def __init__(
+        self, num_channels: int, taps_per_channel: int = 16, window=("kaiser", 7.0)
+    ):
+        """
+        Args:
+            num_channels (int): チャンネル数 M (= 間引き率)
+            taps_per_channel (int): ポリフェーズの各枝のタップ数
+            window: プロトタイプ LPF の窓関数
+        """
+        self.num_channels = int(num_channels)
+        self.taps_per_channel = int(taps_per_channel)
+        self.h = prototype_filter(self.num_channels, self.taps_per_channel, window)
+
+        # branches[r, p] = h[pM + r]
+        self._branches = self.h.reshape(self.taps_per_channel, self.num_channels).T
+
+        self.reset()
+
+    def reset(self):
+        """内部状態 (入力の端数と枝フィルタの履歴) を初期化する"""
+        self._pending = None
+        self._history = None
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        入力ブロックを追加し、計算できたフレームを返す
+
+        Returns:
+            np.ndarray: (n_frames, M) の複素配列。列 k がチャンネル k (中心 k*fs/M,
+                k >= M/2 は負の周波数 (k-M)*fs/M) のベースバンド信号 [fs/M]
+        """
+        M = self.num_channels
+        P = self.taps_per_channel
+        block = np.asarray(block)
+        if self._pending is None:
+            # 先頭より前はゼロ (フレーム m は x[mM - M + 1] 〜 x[mM] を使う)
+            dtype = block.dtype if np.issubdtype(block.dtype, np.inexact) else float
+            self._pending = np.zeros(M - 1, dtype=dtype)
+            self._history = np.zeros((M, P - 1), dtype=dtype)
+            # 係数は入力の精度に合わせる (float32 / complex64 の入力なら complex64 で出す)
+            self._taps = self._branches.astype(np.zeros(0, dtype).real.dtype)
+
+        xp = np.concatenate([self._pending, block])
+        n_frames = len(xp) // M
+        self._pending = xp[n_frames * M :]
+
+        # 枝ごとに並べ替える: frames[r, m] = x[mM - r] (枝ごとに連続したメモリにする)
+        frames = xp[: n_frames * M].reshape(n_frames, M).T[::-1]
+        frames = np.concatenate([self._history, frames], axis=1)
+        self._history = frames[:, n_frames:]
+
+        # 各枝の FIR: v[r, m] = Σ_p h[pM + r] * frames[r, m - p]
+        v = np.empty((M, n_frames), dtype=np.result_type(frames, self._taps, 1j))
+        for r in range(M):
+            v[r] = np.convolve(frames[r], self._taps[r], mode="valid")
+
+        # チャンネル方向の IFFT: y_k = Σ_r v_r exp(j2πkr/M)
+        return (np.fft.ifft(v, axis=0) * M).T
+
+
+class PolyphaseSynthesizer:
+    """
+    ポリフェーズ・フィルタバンクによる合成器 (PolyphaseChannelizer の逆)
+
+    M 本のチャンネルのベースバンド信号 [fs/M] を、それぞれ中心 k*fs/M に移して
+    足し合わせた広帯域信号 [fs] を作る。
+        x[qM + r] = Σ_p g[pM + r] u_r[q - p],  u_r[q] = Σ_k y_k[q] exp(j2πkr/M)
+    (g = M * h は補間フィルタ) なので、フレームごとに M点IFFT と M 本の短いFIR を
+    計算するだけでよく、演算量は局の数によらない。
+    """
+
+    def __init__(
+        self, num_channels: int, taps_per_channel: int = 16, window=("kaiser", 7.0)
+    ):
+        """
+        Args:
+            num_channels (int): チャンネル数 M (= 補間率)
+            taps_per_channel (int): ポリフェーズの各枝のタップ数
+            window: プロトタイプ LPF の窓関数
+        """
+        self.num_channels = int(num_channels)
+        self.taps_per_channel = int(taps_per_channel)
+        self.h = prototype_filter(self.num_channels, self.taps_per_channel, window)
+
+        # branches[r, p] = M * h[pM + r] (補間でゼロを挟んだ分のゲインを戻す)
+        M = self.num_channels
+        self._branches = self.h.reshape(self.taps_per_channel, M).T * M
+
+        self.reset()
+
+    def reset(self):
+        """内部状態 (枝フィルタの履歴) を初期化する"""
+        self._history = None
+
+    def process(self, frames: np.ndarray) -> np.ndarray:
+        """
+        チャンネル信号のフレームを入力し、広帯域信号を返す
+
+        Args:
+            frames: (n_frames, M) の複素配列。列 k がチャンネル k の信号 [fs/M]
+
+        Returns:
+            np.ndarray: 広帯域の複素信号 (n_frames * M,) [fs]
+        """
+        M = self.num_channels
+        P = self.taps_per_channel
+        frames = np.asarray(frames)
+        if self._history is None:
+            dtype = np.result_type(frames, np.complex64)
+            self._history = np.zeros((M, P - 1), dtype=dtype)
+            self._taps = self._branches.astype(np.zeros(0, dtype).real.dtype)
+
+        # チャンネル方向の IFFT: u[r, q] = Σ_k y_k[q] exp(j2πkr/M)
+        n_frames = len(frames)
+        u = (np.fft.ifft(frames, axis=1) * M).T.astype(self._history.dtype)
+        u = np.concatenate([self._history, u], axis=1)
+        self._history = u[:, n_frames:]
+
+        # 各枝の FIR: x[qM + r] = Σ_p g[pM + r] * u[r, q - p]
+        x = np.empty((n_frames, M), dtype=u.dtype)
+        for r in range(M):
+            x[:, r] = np.convolve(u[r], self._taps[r], mode="valid")
+
+        return x.reshape(-1)
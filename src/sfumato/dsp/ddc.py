@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+
+from sfumato.dsp.filters import design_fir
+from sfumato.dsp.nco import Nco
+from sfumato.dsp.resampler import PolyphaseResampler
+
+
+class DigitalDownConverter:
+    """
+    デジタル・ダウンコンバータ (DDC): ミキシング + LPF + 間引き を1パスで行う
+
+    実数RF信号 x を LO exp(-jωn) で0Hzに移し、LPFをかけて q 分の1に間引く処理は
+        y[m] = Σ h[k] x[n-k] exp(-jω(n-k))            (n = m*q + half_len)
+             = exp(-jωn) * Σ (h[k] exp(jωk)) x[n-k]
+    と書き直せる。つまり「実数入力を複素係数 h[k]exp(jωk) でポリフェーズ間引き」
+    してから「出力レートで LO を掛ける」だけでよく、フルレートの t / LO / 複素配列を
+    作らずに、残す出力サンプルだけを計算できる。
+
+    fc/fs が有理数 (250k/2.304M = 125/1152) なので、出力レートの LO は
+    周期的になり、テーブルを1周期分だけ前計算しておけばよい。
+    """
+
+    def __init__(self, fc: float, fs: float, q: int, dtype=np.complex128):
+        """
+        Args:
+            fc (float): 搬送波周波数 (Hz)
+            fs (float): 入力 (RF) サンプリング周波数 (Hz)
+            q (int): 間引き率 (例: 2.304M -> 384k なら 6)
+            dtype: 係数・LOテーブル (と出力) の複素数 dtype
+        """
+        self.fc = fc
+        self.fs = fs
+        self.q = int(q)
+
+        # LPF: signal.decimate と同じ設計 (hamming窓, 次数 20q)
+        half_len = 10 * self.q
+        h = design_fir(2 * half_len + 1, 1.0 / self.q, window="hamming")
+
+        # fc/fs = p/r (既約分数) として、LOの位相は整数演算で求める (dsp.nco)
+        self.nco = Nco(fc, fs)
+
+        # 複素係数 g[k] = h[k] exp(jωk)
+        self.taps = (h * self.nco.exp(len(h), start=0)).astype(dtype)
+        self._resampler = PolyphaseResampler(1, self.q, window=self.taps)
+
+        # 出力レートの LO テーブル: exp(-jω(m*q + half_len)) は m について周期的
+        self.period = self.nco.r // math.gcd(self.nco.r, self.q)
+        self.lo_table = self.nco.exp(
+            self.period, start=half_len, step=self.q, sign=-1
+        ).astype(dtype)
+
+        self.reset()
+
+    def reset(self):
+        """内部状態 (フィルタ履歴と出力位置) を初期化する"""
+        self._resampler.reset()
+        self._m = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        RF信号ブロックを入力し、計算可能になったベースバンドIQ信号を返す
+        (ゼロ位相FIRのため half_len サンプル分遅れる。最後に flush() を呼ぶこと)
+        """
+        return self._rotate(self._resampler.process(block))
+
+    def flush(self) -> np.ndarray:
+        """残りの出力をすべて返す"""
+        out = self._rotate(self._resampler.flush())
+        self.reset()
+        return out
+
+    def _rotate(self, y: np.ndarray) -> np.ndarray:
+        idx = (self._m + np.arange(len(y))) % self.period
+        self._m += len(y)
+        lo = self.lo_table[idx]
+
+        # 複素乗算を実部・虚部に分けて書く (numpy の複素乗算は配列の長さや位置で
+        # SIMD/FMA の使い方が変わり、ブロック分割で最下位ビットがずれるため)
+        out = np.empty(len(y), dtype=np.result_type(y, lo))
+        out.real = y.real * lo.real - y.imag * lo.imag
+        out.imag = y.real * lo.imag + y.imag * lo.real
+        return out
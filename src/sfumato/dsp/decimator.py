@@ -0,0 +1,345 @@
+import math
+from functools import cache
+
+import numpy as np
+from scipy import signal
+
+from sfumato.dsp.filters import design_fir
+from sfumato.dsp.resampler import PolyphaseResampler
+
+
+class FirDecimator(PolyphaseResampler):
+    """
+    ブロック単位で入力できる FIR デシメータ (ゼロ位相)
+
+    signal.decimate(x, q, ftype="fir") と同じフィルタ・同じ出力位置で間引きを行う。
+    出力は half_len サンプル分遅れて出てくるので、最後に flush() を呼ぶこと。
+    """
+
+    def __init__(self, q: int, axis: int = 0):
+        """
+        Args:
+            q (int): 間引き率 (例: 12)
+            axis (int): 時間方向の軸
+        """
+        self.q = int(q)
+
+        # signal.decimate と同じ設計 (hamming窓, 次数 20q)
+        self.half_len = 10 * self.q
+        b = design_fir(2 * self.half_len + 1, 1.0 / self.q, window="hamming")
+
+        super().__init__(1, self.q, window=b, axis=axis)
+
+        # signal.decimate は係数を入力の dtype に合わせてから使う
+        self._match_dtype = True
+
+
+# ==========================================
+# 多段デシメーション (CIC -> Half-band -> 補償FIR)
+# ==========================================
+
+
+class CicDecimator:
+    """
+    CIC (Cascaded Integrator-Comb) デシメータ
+
+    積分器 N 段 -> R 分の1に間引き -> 櫛形フィルタ N 段。乗算器を使わない
+    (加算と遅延だけ) ので、FPGA の DDC の初段に使われる構成。
+    FPGA と同じく固定小数点 (int64) で計算し、積分器のオーバーフローは
+    2の補数の折り返しにまかせる (櫛形フィルタで打ち消されるので結果は正しい)。
+    """
+
+    def __init__(
+        self,
+        R: int,
+        order: int = 4,
+        delay: int = 1,
+        frac_bits: int = 30,
+        axis: int = 0,
+    ):
+        """
+        Args:
+            R (int): 間引き率
+            order (int): 段数 N
+            delay (int): 櫛形フィルタの遅延 M
+            frac_bits (int): 入力を固定小数点にするときの小数部のビット数
+            axis (int): 時間方向の軸 (他の軸の各列は独立に処理する)
+        """
+        self.name = f"CIC(R={R}, N={order})"
+        self.factor = int(R)
+        self.order = int(order)
+        self.delay = int(delay)
+        self.frac_bits = int(frac_bits)
+        self.axis = axis
+
+        # DCゲイン (R*M)^N を出力側で戻す
+        self.gain = (self.factor * self.delay) ** self.order
+
+        self.reset()
+
+    @property
+    def macs_per_output(self) -> float:
+        """出力1サンプルあたりの乗算回数 (CICは0)"""
+        return 0.0
+
+    @property
+    def adds_per_output(self) -> float:
+        """出力1サンプルあたりの加算回数 (積分器 N*R + 櫛形 N)"""
+        return float(self.order * (self.factor + 1))
+
+    def response(self, f: np.ndarray, fs: float) -> np.ndarray:
+        """入力レート fs での周波数 f [Hz] における振幅特性 (DCで1に正規化)"""
+        x = np.pi * np.asarray(f, dtype=float) / fs
+        rm = self.factor * self.delay
+        with np.errstate(invalid="ignore", divide="ignore"):
+            h = np.sin(rm * x) / (rm * np.sin(x))
+        h = np.where(x == 0, 1.0, h)
+        return np.abs(h) ** self.order
+
+    def reset(self):
+        """積分器・櫛形フィルタの状態と間引きの位相を初期化する"""
+        # 状態の形 (order, [delay,] 列...) は最初のブロックで決める
+        self._integrators = None
+        self._combs = None
+        self._skip = 0  # 次のブロックで最初に残すサンプルの位置
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """入力ブロックを処理して、間引き後のサンプルを返す (dtype は入力に合わせる)"""
+        # 時間軸を先頭 (0) に置いて扱う
+        block = np.moveaxis(np.asarray(block), self.axis, 0)
+        dtype = block.dtype if np.issubdtype(block.dtype, np.floating) else np.float64
+        x = np.round(np.asarray(block, dtype=float) * 2.0**self.frac_bits)
+        y = x.astype(np.int64)
+        if self._integrators is None:
+            columns = block.shape[1:]
+            self._integrators = np.zeros((self.order, *columns), dtype=np.int64)
+            self._combs = np.zeros((self.order, self.delay, *columns), dtype=np.int64)
+
+        # 積分器 (入力レート): 前回の積分値を引き継ぐ
+        for i in range(self.order):
+            y = np.cumsum(y, axis=0, dtype=np.int64)
+            y += self._integrators[i]
+            if len(y) > 0:
+                self._integrators[i] = y[-1]
+
+        # 間引き: 絶対番号が R の倍数のサンプルを残す (n = R-1, 2R-1, ... ではなく 0, R, ...)
+        y = y[self._skip :: self.factor]
+        self._skip = (self._skip - len(block)) % self.factor
+
+        # 櫛形フィルタ (出力レート): y[n] - y[n-M]
+        for i in range(self.order):
+            prev = np.concatenate([self._combs[i], y])
+            self._combs[i] = prev[len(prev) - self.delay :]
+            y = y - prev[: len(y)]
+
+        out = y * (1.0 / (self.gain * 2.0**self.frac_bits))
+        return np.moveaxis(out.astype(dtype, copy=False), 0, self.axis)
+
+    def flush(self) -> np.ndarray:
+        """因果的なので残りは無い (FirDecimator とインターフェースを揃えるため)"""
+        self.reset()
+        return np.zeros(0)
+
+
+class FirDecimationStage(PolyphaseResampler):
+    """
+    因果的な FIR デシメーション段 (Half-band や CIC 補償FIR に使う)
+    """
+
+    def __init__(self, taps: np.ndarray, factor: int, name: str = "FIR", axis: int = 0):
+        self.name = f"{name}(x{factor}, {len(taps)} taps)"
+        self.factor = int(factor)
+        self.taps = np.asarray(taps, dtype=float)
+        super().__init__(1, self.factor, window=self.taps, causal=True, axis=axis)
+
+        # 係数を入力の dtype に合わせる (float32 の入力を float32 のまま処理する)
+        self._match_dtype = True
+
+    @property
+    def macs_per_output(self) -> float:
+        """出力1サンプルあたりの積和回数 (係数が 0 のタップは数えない)"""
+        return float(np.count_nonzero(self.taps))
+
+    @property
+    def adds_per_output(self) -> float:
+        return max(self.macs_per_output - 1.0, 0.0)
+
+
+class DecimationChain:
+    """
+    デシメーション段を直列につないだもの
+
+    各段は状態を持つので、ブロックごとに process() を呼んでも連続した出力になる。
+    """
+
+    def __init__(self, stages: list):
+        self.stages = list(stages)
+        self.factor = int(np.prod([stage.factor for stage in self.stages]))
+        self.name = " -> ".join(stage.name for stage in self.stages)
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        for stage in self.stages:
+            block = stage.process(block)
+        return block
+
+    def flush(self) -> np.ndarray:
+        """各段とも因果的なので、状態を初期化して空配列を返す"""
+        self.reset()
+        return np.zeros(0)
+
+    def cost_report(self) -> list[dict]:
+        """
+        各段の演算量を返す
+
+        macs_per_output は各段の出力1サンプルあたり、macs_per_chain_output は
+        チェーン全体の出力1サンプルあたり (後段の間引き率を掛けたもの)。
+        """
+        report = []
+        for i, stage in enumerate(self.stages):
+            ratio = int(np.prod([s.factor for s in self.stages[i + 1 :]]))
+            report.append(
+                {
+                    "stage": stage.name,
+                    "factor": stage.factor,
+                    "macs_per_output": stage.macs_per_output,
+                    "adds_per_output": stage.adds_per_output,
+                    "macs_per_chain_output": stage.macs_per_output * ratio,
+                    "adds_per_chain_output": stage.adds_per_output * ratio,
+                }
+            )
+        return report
+
+
+@cache
+def halfband_taps(numtaps: int = 19) -> np.ndarray:
+    """
+    Half-band FIR の係数 (numtaps = 4k+3)。中心以外の偶数オフセットは厳密に 0
+    """
+    if numtaps % 4 != 3:
+        raise ValueError("numtaps of a half-band filter must be 4k+3")
+    h = design_fir(numtaps, 0.5).copy()
+    center = numtaps // 2
+    offsets = np.arange(numtaps) - center
+    h[(offsets % 2 == 0) & (offsets != 0)] = 0.0
+    h.setflags(write=False)
+    return h
+
+
+@cache
+def compensation_taps(
+    numtaps: int,
+    factor: int,
+    passband: float,
+    cic_factor: int = 1,
+    cic_order: int = 0,
+    cic_rate: int = 1,
+) -> np.ndarray:
+    """
+    最終段の LPF 係数 (CIC の通過域の垂下を 1/H_cic で補償する)
+
+    Args:
+        numtaps: タップ数
+        factor: この段の間引き率
+        passband: 通過域の端 (出力ナイキストに対する比, 例: 0.8)
+        cic_factor, cic_order: 補償するCICの R と N (cic_order=0 なら補償しない)
+        cic_rate: CIC の入力レートがこの段の入力レートの何倍か
+    """
+    # 周波数はこの段の入力ナイキストで正規化 (出力ナイキスト = 1/factor)
+    f_pass = passband / factor
+    if factor > 1:
+        # 出力ナイキストより上を阻止域にする
+        f = np.concatenate([np.linspace(0.0, f_pass, 32), [1.0 / factor, 1.0]])
+        gain = np.concatenate([np.ones(32), [0.0, 0.0]])
+    else:
+        # 間引かない段 (q = 1) には阻止域の端が無い。通過域の補償だけ行い、
+        # その先はナイキストに向けてなだらかに落とす
+        f = np.concatenate([np.linspace(0.0, f_pass, 32), [1.0]])
+        gain = np.concatenate([np.ones(32), [0.0]])
+
+    if cic_order > 0:
+        cic = CicDecimator(cic_factor, order=cic_order)
+        # CIC入力レートで見た周波数 (入力ナイキスト=1 -> fs_cic = 2 * cic_rate)
+        droop = cic.response(f[:32], fs=2.0 * cic_rate)
+        gain[:32] = 1.0 / droop
+
+    h = signal.firwin2(numtaps, f, gain)
+    h.setflags(write=False)
+    return h
+
+
+def _smallest_prime_factor(q: int) -> int:
+    # q = 1 なら 1 (間引かない)
+    for p in range(2, math.isqrt(q) + 1):
+        if q % p == 0:
+            return p
+    return q
+
+
+def design_decimation_chain(
+    q: int,
+    passband: float = 0.8,
+    cic_order: int = 4,
+    max_halfbands: int = 2,
+    halfband_numtaps: int = 19,
+    final_numtaps: int = 63,
+    axis: int = 0,
+) -> DecimationChain:
+    """
+    間引き率 q の多段デシメーションチェーンを作る
+
+    q = R * 2^k * 2 と分解して
+        CIC (x R, 乗算なし) -> Half-band (x2) * k -> 補償FIR (x2)
+    の順に並べる (例: q=12 -> CIC x3 -> HB x2 -> CFIR x2, q=4 -> HB x2 -> FIR x2)。
+    q が奇数なら、最終段は q の最小の素因数 p で間引く FIR にする
+    (例: q=3 -> FIR x3, q=9 -> CIC x3 -> CFIR x3)。遷移域が 2/p 倍に狭くなる分、
+    最終段のタップ数を final_numtaps * p / 2 に増やす。
+    係数の設計はキャッシュされるので、同じ構成のチェーンを何度作っても設計は1回だけ。
+
+    Args:
+        q: 全体の間引き率
+        passband: 最終出力で守る通過域の端 (出力ナイキストに対する比)
+        cic_order: CIC の段数
+        max_halfbands: Half-band 段の最大数
+        halfband_numtaps: Half-band FIR のタップ数 (4k+3)
+        final_numtaps: 最終段 FIR のタップ数 (最終段が x2 のとき)
+        axis: 時間方向の軸 ((N, C) の各列をまとめて間引く)
+    """
+    q = int(q)
+    if q < 1:
+        raise ValueError(f"q must be >= 1: {q}")
+    final = _smallest_prime_factor(q)
+    rest = q // final
+    if final > 2:
+        final_numtaps = (final_numtaps * final // 2) | 1
+
+    n_halfbands = 0
+    while rest % 2 == 0 and n_halfbands < max_halfbands:
+        rest //= 2
+        n_halfbands += 1
+    cic_factor = rest
+
+    stages = []
+    if cic_factor > 1:
+        stages.append(CicDecimator(cic_factor, order=cic_order, axis=axis))
+    for _ in range(n_halfbands):
+        stages.append(
+            FirDecimationStage(halfband_taps(halfband_numtaps), 2, "HB", axis=axis)
+        )
+
+    # 最終段: CIC があればその垂下を補償する
+    taps = compensation_taps(
+        final_numtaps,
+        final,
+        passband,
+        cic_factor=cic_factor,
+        cic_order=cic_order if cic_factor > 1 else 0,
+        cic_rate=cic_factor * 2**n_halfbands if cic_factor > 1 else 1,
+    )
+    name = "CFIR" if cic_factor > 1 else "FIR"
+    stages.append(FirDecimationStage(taps, final, name, axis=axis))
+
+    return DecimationChain(stages)
@@ -0,0 +1,189 @@
+import math
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba は任意 (pip install sfumato-fm-radio-turner[fast])
+    numba = None
+
+# FmReceiver の discriminator に指定できる方式 ("unwrap" は FmReceiver 内の元の実装)
+DISCRIMINATOR_METHODS = ("conjugate", "fast")
+DISCRIMINATOR_BACKENDS = ("auto", "numba", "numpy")
+
+# atan(z) (0 <= z <= 1) の多項式近似の係数 (z の奇数次, 誤差 1e-5 rad 以下)
+_ATAN_COEFFS = (0.9998660, -0.3302995, 0.1801410, -0.0851330, 0.0208351)
+
+
+def _atan2_approx(y, x):
+    """
+    atan2(y, x) の近似 (逆三角関数を使わず、除算1回と多項式で求める)
+
+    |y|, |x| の小さい方を大きい方で割って z ∈ [0, 1] にし、atan(z) を多項式で
+    近似してから象限を戻す。numba でもそのままコンパイルできるようにスカラーで書く。
+    """
+    ay = abs(y)
+    ax = abs(x)
+    if ax >= ay:
+        if ax == 0.0:
+            return 0.0
+        z = ay / ax
+        swap = False
+    else:
+        z = ax / ay
+        swap = True
+
+    c0, c1, c2, c3, c4 = _ATAN_COEFFS
+    z2 = z * z
+    a = z * (c0 + z2 * (c1 + z2 * (c2 + z2 * (c3 + z2 * c4))))
+    if swap:
+        a = 0.5 * math.pi - a
+    if x < 0.0:
+        a = math.pi - a
+    if y < 0.0:
+        a = -a
+    return a
+
+
+def _conjugate_loop(x, out, last):
+    """
+    out[n] = angle(x[n] * conj(x[n-1])) を1パスで計算する (x: (N, C), last: (C,))
+    """
+    for j in range(x.shape[1]):
+        prev = last[j]
+        for i in range(x.shape[0]):
+            cur = x[i, j]
+            re = cur.real * prev.real + cur.imag * prev.imag
+            im = cur.imag * prev.real - cur.real * prev.imag
+            out[i, j] = math.atan2(im, re)
+            prev = cur
+        last[j] = prev
+
+
+def _fast_loop(x, out, last):
+    """_conjugate_loop の atan2 を _atan2_approx に置き換えたもの"""
+    for j in range(x.shape[1]):
+        prev = last[j]
+        for i in range(x.shape[0]):
+            cur = x[i, j]
+            re = cur.real * prev.real + cur.imag * prev.imag
+            im = cur.imag * prev.real - cur.real * prev.imag
+            out[i, j] = _atan2_approx(im, re)
+            prev = cur
+        last[j] = prev
+
+
+if numba is not None:
+    # _fast_loop から呼ぶ _atan2_approx も JIT 版にしておく (Python からも呼べる)
+    _atan2_approx = numba.njit(cache=True)(_atan2_approx)
+    _conjugate_loop_jit = numba.njit(cache=True)(_conjugate_loop)
+    _fast_loop_jit = numba.njit(cache=True)(_fast_loop)
+else:
+    _conjugate_loop_jit = None
+    _fast_loop_jit = None
+
+
+def _atan2_approx_numpy(y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """_atan2_approx の numpy 版 (numba が無いとき用)"""
+    ay = np.abs(y)
+    ax = np.abs(x)
+    swap = ay > ax
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(swap, ax / ay, ay / ax)
+    z = np.nan_to_num(z, copy=False)
+
+    z2 = z * z
+    a = np.full_like(z, _ATAN_COEFFS[-1])
+    for c in _ATAN_COEFFS[-2::-1]:
+        a *= z2
+        a += c
+    a *= z
+
+    a = np.where(swap, 0.5 * np.pi - a, a)
+    a = np.where(x < 0, np.pi - a, a)
+    return np.where(y < 0, -a, a).astype(z.dtype, copy=False)
+
+
+class FmDiscriminator:
+    """
+    状態を持つ FM 検波器 (1サンプル前との位相差 = 瞬時周波数 [rad/サンプル])
+
+    FmReceiver の既定の検波 (np.angle -> np.unwrap -> np.diff) は全長の配列を
+    3回作るが、位相差は隣り合うサンプルの共役積の偏角
+        Δφ[n] = angle(x[n] * conj(x[n-1]))
+    で直接求まる (アンラップ不要。|Δφ| < π なら同じ値)。
+        - "conjugate": 共役積の偏角を atan2 で求める
+        - "fast": atan2 の代わりに多項式近似 (誤差 1e-5 rad 以下) を使う
+    backend="numba" では、共役積と偏角の計算を1つのループ (1パス) で行う。
+
+    直前のブロックの最後のサンプルを持ち越すので、ブロックに分けて入力しても
+    一括処理と同じ結果になる。サンプリング周波数に依存しないので、
+    間引いた後のIQ (IQ_FS) にもRFレートのIQにも使える。
+    """
+
+    def __init__(self, method: str = "conjugate", backend: str = "auto"):
+        """
+        Args:
+            method: "conjugate" / "fast"
+            backend: ループの実行方法
+                - "auto": "fast" は numba があれば "numba"、それ以外は "numpy"
+                  ("conjugate" は numpy の atan2 (SIMD) の方がスカラーの
+                  math.atan2 のループより速いので numpy を使う)
+                - "numba": JITコンパイルした1パスのループ (numba が必要)
+                - "numpy": numpy の配列演算 (複数パス)
+        """
+        if method not in DISCRIMINATOR_METHODS:
+            raise ValueError(f"Unknown discriminator: {method}")
+        if backend not in DISCRIMINATOR_BACKENDS:
+            raise ValueError(f"Unknown discriminator backend: {backend}")
+        if backend == "numba" and numba is None:
+            raise ImportError("backend='numba' requires numba")
+        if backend == "auto":
+            backend = "numba" if method == "fast" and numba is not None else "numpy"
+
+        self.method = method
+        self.backend = backend
+        self.reset()
+
+    def reset(self):
+        """直前のサンプル (状態) を消す"""
+        self._last = None
+
+    def process(self, iq_block: np.ndarray) -> np.ndarray:
+        """
+        IQ ブロックの各サンプルの位相差を返す
+
+        Args:
+            iq_block: 複素IQ (N,) または (N, C) (列ごとに独立に検波する)
+
+        Returns:
+            np.ndarray: 位相差 [rad/サンプル] (入力と同じ形, 入力の精度の実数)。
+                最初のブロックの先頭は 0
+        """
+        iq_block = np.asarray(iq_block)
+        real_dtype = np.zeros(0, dtype=iq_block.dtype).real.dtype
+        if len(iq_block) == 0:
+            return np.zeros(iq_block.shape, dtype=real_dtype)
+        x = iq_block.reshape(len(iq_block), -1)
+
+        if self._last is None:
+            # 最初のサンプルは自分自身との位相差 (= 0) にする
+            self._last = x[0].copy()
+
+        if self.backend == "numba":
+            out = np.empty(x.shape, dtype=real_dtype)
+            loop = _conjugate_loop_jit if self.method == "conjugate" else _fast_loop_jit
+            loop(x, out, self._last)
+        else:
+            prev = np.concatenate([self._last[np.newaxis], x[:-1]])
+            # 共役積は実部・虚部に分けて書く (numpy の複素乗算は配列の長さや位置で
+            # SIMD/FMA の使い方が変わり、ブロック分割で最下位ビットがずれるため)
+            re = x.real * prev.real + x.imag * prev.imag
+            im = x.imag * prev.real - x.real * prev.imag
+            if self.method == "conjugate":
+                out = np.arctan2(im, re)
+            else:
+                out = _atan2_approx_numpy(im, re)
+            self._last = x[-1].copy()
+
+        return out.reshape(iq_block.shape)
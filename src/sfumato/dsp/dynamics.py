@@ -0,0 +1,179 @@
+import numpy as np
+
+
+class PeakNormalizer:
+    """
+    先読み付きのピーク正規化 (1パス用)
+
+    ファイル全体のピークがわからないまま、出力のピークを peak に合わせる。
+    これまでの最大値 M(t) (先読みの分を含む) から目標ゲイン g(t) = peak / M(t) を
+    求め、それを lookahead + 1 サンプルで移動平均したゲインを掛ける。
+    g(t) は増えない (M(t) は減らない) ので、移動平均 <= g(t) <= peak / |x(t)| となり、
+    出力は peak を超えない。新しいピークが来ると、ゲインは lookahead サンプルかけて
+    直線的に下がる (段差にならない)。
+
+    ピークが最初の方にある信号ならゲインはすぐに一定になり、2パスで正規化したものと
+    ほぼ同じになる。出力は lookahead サンプル遅れて出てくるので、最後に flush() を呼ぶ。
+    """
+
+    def __init__(
+        self, peak: float = 0.98, lookahead: int = 4800, max_gain: float = 10.0
+    ):
+        """
+        Args:
+            peak: 出力のピークの目標
+            lookahead: 先読みのサンプル数 (ゲインを下げるのにかける時間)
+            max_gain: ゲインの上限 (無音や小さい音を持ち上げすぎない)
+        """
+        if lookahead < 0:
+            raise ValueError(f"lookahead must be >= 0: {lookahead}")
+        self.peak = peak
+        self.lookahead = int(lookahead)
+        self.max_gain = max_gain
+        self.reset()
+
+    def reset(self):
+        self.max_abs = 0.0  # これまでの最大値
+        self._x = None  # まだ出力していないサンプル (..., C)
+        self._g = np.zeros(0)  # それらの目標ゲイン
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            block: 入力 (N,) または (N, C)。ピークは全チャンネルで共通
+
+        Returns:
+            np.ndarray: 出力 (lookahead サンプル遅れ、ブロックの長さは変わることがある)
+        """
+        block = np.asarray(block)
+        if self._x is None:
+            self._x = block[:0]
+        level = np.abs(block) if block.ndim == 1 else np.abs(block).max(axis=1)
+        running = np.maximum.accumulate(np.append(self.max_abs, level))[1:]
+        if len(running):
+            self.max_abs = float(running[-1])
+        with np.errstate(divide="ignore"):
+            gain = np.minimum(self.peak / running, self.max_gain)
+
+        x = np.concatenate([self._x, block])
+        g = np.concatenate([self._g, gain])
+        n_out = max(len(x) - self.lookahead, 0)
+
+        # 出力 i のゲイン = g[i : i + lookahead + 1] の平均
+        cs = np.concatenate([[0.0], np.cumsum(g)])
+        span = self.lookahead + 1
+        smooth = (cs[span : span + n_out] - cs[:n_out]) / span
+        # 累積和の丸め誤差で目標ゲインをわずかに超えないようにする
+        smooth = np.minimum(smooth, g[:n_out])
+        out = x[:n_out] * (smooth if x.ndim == 1 else smooth[:, np.newaxis]).astype(
+            x.dtype
+        )
+
+        self._x = x[n_out:]
+        self._g = g[n_out:]
+        return out
+
+    def flush(self) -> np.ndarray:
+        """残りのサンプルを出力する (終端の後は無音とみなす)"""
+        if self._x is None:
+            return np.zeros(0)
+        tail = self.process(
+            np.zeros((self.lookahead, *self._x.shape[1:]), self._x.dtype)
+        )
+        self.reset()
+        return tail
+
+
+class LookaheadLimiter:
+    """
+    先読み付きのピークリミッタ
+
+    |x| が ceiling を超えないのに必要なゲイン r(t) = min(1, ceiling / |x(t)|) から、
+      1. 前後 lookahead サンプルの最小値 -> lookahead + 1 サンプルの移動平均
+         (アタック: ピークの lookahead サンプル前から直線的に下げる)
+      2. ゲインの下げ幅 (1 - ゲイン) を時定数 release サンプルで指数的に戻す
+    の順でゲインを作る。どちらも必要なゲイン以下にしかならないので、出力は
+    ceiling を超えない。出力は lookahead サンプル遅れて出てくるので、最後に flush() を呼ぶ。
+    """
+
+    def __init__(self, ceiling: float = 0.99, lookahead: int = 48, release: int = 2400):
+        """
+        Args:
+            ceiling: 出力の最大値
+            lookahead: 先読みのサンプル数 (48 kHz で 48 なら 1 ms)
+            release: ゲインを戻す時定数 (サンプル)
+        """
+        if lookahead < 0:
+            raise ValueError(f"lookahead must be >= 0: {lookahead}")
+        self.ceiling = ceiling
+        self.lookahead = int(lookahead)
+        self.release = release
+        self._decay = np.exp(-1.0 / release)
+        # 1回に処理する長さ (decay ** -n が float64 であふれないように)
+        self._chunk = max(int(500 * release), 1)
+        self.reset()
+
+    def reset(self):
+        self.reduction = 0.0  # 直前のゲインの下げ幅 (1 - ゲイン)
+        self._x = None  # まだ出力していないサンプル
+        self._r = np.ones(self.lookahead)  # その前の lookahead サンプル分 + それらの r
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            block: 入力 (N,) または (N, C)。ゲインは全チャンネルで共通
+
+        Returns:
+            np.ndarray: 出力 (lookahead サンプル遅れ)
+        """
+        block = np.asarray(block)
+        if self._x is None:
+            self._x = block[:0]
+        level = np.abs(block) if block.ndim == 1 else np.abs(block).max(axis=1)
+        with np.errstate(divide="ignore"):
+            required = np.minimum(self.ceiling / level, 1.0)
+
+        x = np.concatenate([self._x, block])
+        r = np.concatenate([self._r, required])  # r[j] はサンプル j - lookahead の分
+        n_out = max(len(x) - self.lookahead, 0)
+        span = self.lookahead + 1
+        if n_out == 0:
+            self._x, self._r = x, r
+            return x[:0]
+
+        # サンプル i のゲイン = mean(k=0..L) min(r[i+k-L .. i+k])
+        windowed = np.lib.stride_tricks.sliding_window_view(r, span).min(axis=1)
+        cs = np.concatenate([[0.0], np.cumsum(windowed)])
+        gain = (cs[span : span + n_out] - cs[:n_out]) / span
+        gain = 1.0 - self._release(1.0 - gain)
+        # 累積和の丸め誤差で必要なゲインをわずかに超えないようにする
+        gain = np.minimum(gain, r[self.lookahead : self.lookahead + n_out])
+
+        out = x[:n_out] * (gain if x.ndim == 1 else gain[:, np.newaxis]).astype(x.dtype)
+        self._x = x[n_out:]
+        self._r = r[n_out:]
+        return out
+
+    def _release(self, target: np.ndarray) -> np.ndarray:
+        # h[n] = max(target[n], decay * h[n-1]) を、ブロック内では
+        # h[n] = decay^n * max(decay * h[-1], cummax(target[i] * decay^-i)) としてまとめて解く
+        out = np.empty_like(target)
+        for start in range(0, len(target), self._chunk):
+            t = target[start : start + self._chunk]
+            powers = self._decay ** np.arange(len(t))
+            held = np.maximum.accumulate(t / powers)
+            h = np.maximum(held, self._decay * self.reduction) * powers
+            out[start : start + len(t)] = h
+            if len(t):
+                self.reduction = float(h[-1])
+        return out
+
+    def flush(self) -> np.ndarray:
+        """残りのサンプルを出力する (終端の後は無音とみなす)"""
+        if self._x is None:
+            return np.zeros(0)
+        tail = self.process(
+            np.zeros((self.lookahead, *self._x.shape[1:]), self._x.dtype)
+        )
+        self.reset()
+        return tail
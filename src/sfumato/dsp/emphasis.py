@@ -1,6 +1,8 @@
 import numpy as np
 from scipy import signal
+
 from sfumato import settings
+from sfumato.dsp.filters import LinearFilter, emphasis_coeffs
 
 
 class EmphasisFilter:
@@ -13,63 +15,52 @@ class EmphasisFilter:
         self,
         fs: float = settings.AUDIO_FS,
         time_constant: float = settings.TIME_CONSTANT,
+        dtype=np.float64,
     ):
         """
         Args:
             fs (float): サンプリング周波数 (Hz)
             time_constant (float): 時定数 (秒). Default: 50e-6
+            dtype: 係数の dtype (float32 なら float32 の入力を float32 のまま処理する)
         """
         self.fs = fs
         self.tau = time_constant
+        self.dtype = np.dtype(dtype)
 
-        self.b_pre, self.a_pre = self._calc_coeffs(mode="pre")
-        self.b_de, self.a_de = self._calc_coeffs(mode="de")
+        b_pre, a_pre = self._calc_coeffs(mode="pre")
+        b_de, a_de = self._calc_coeffs(mode="de")
+        self.b_pre, self.a_pre = b_pre.astype(self.dtype), a_pre.astype(self.dtype)
+        self.b_de, self.a_de = b_de.astype(self.dtype), a_de.astype(self.dtype)
 
     def _calc_coeffs(self, mode: str):
         """
         デジタル・プリエンファシス/ディエンファシスの係数計算
+        (設計は dsp.filters のレジストリでメモ化される)
         """
-        fc = 1.0 / (2.0 * np.pi * self.tau)
-
-        if mode == "pre":
-            # --- Pre-emphasis (High-Shelf Filter) ---
-
-            # y[n] = x[n] + alpha * (x[n] - x[n-1])
-            # alpha = tau / T = tau * fs
-            # 1次微分 (High-pass) 成分を足し合わせる処理
-
-            alpha = self.tau * self.fs  # 例: 50e-6 * 48000 = 2.4
+        return emphasis_coeffs("pre" if mode == "pre" else "de", self.tau, self.fs)
 
-            # 係数: b0 = 1 + alpha, b1 = -alpha
-            # H(z) = (1+alpha) - alpha*z^-1
-            b = [1.0 + alpha, -alpha]
-            a = [1.0]
-
-            return b, a
-
-        else:
-            # --- De-emphasis (Low-Pass Filter) ---
-            # 標準的な IIR LPF
-            # y[n] = (1-p)*x[n] + p*y[n-1]  (p = exp(-1/(fs*tau)))
-
-            dt = 1.0 / self.fs
-            p = np.exp(-dt / self.tau)  # 減衰係数
+    def pre_emphasis(self, data: np.ndarray, axis: int = 0) -> np.ndarray:
+        """
+        [送信] 高域をブーストする (High-shelf)
 
-            # IIRフィルタ係数
-            # H(z) = (1-p) / (1 - p*z^-1)
-            b = [1.0 - p]
-            a = [1.0, -p]
+        (N, C) や (B, N) の入力は axis 方向にまとめて1回で処理する
+        """
+        return signal.lfilter(self.b_pre, self.a_pre, data, axis=axis)
 
-            return b, a
+    def de_emphasis(self, data: np.ndarray, axis: int = 0) -> np.ndarray:
+        """
+        [受信] 高域をカットしてノイズを除去する (Low-pass)
+        """
+        return signal.lfilter(self.b_de, self.a_de, data, axis=axis)
 
-    def pre_emphasis(self, data: np.ndarray) -> np.ndarray:
+    def pre_emphasis_filter(self, axis: int = 0) -> LinearFilter:
         """
-        [送信] 高域をブーストする (High-shelf)
+        [送信] 状態を持つプリエンファシスフィルタ (ブロック処理用)
         """
-        return signal.lfilter(self.b_pre, self.a_pre, data)
+        return LinearFilter(self.b_pre, self.a_pre, dtype=self.dtype, axis=axis)
 
-    def de_emphasis(self, data: np.ndarray) -> np.ndarray:
+    def de_emphasis_filter(self, axis: int = 0) -> LinearFilter:
         """
-        [受信] 高域をカットしてノイズを除去する (Low-pass)
+        [受信] 状態を持つディエンファシスフィルタ (ブロック処理用)
         """
-        return signal.lfilter(self.b_de, self.a_de, data)
+        return LinearFilter(self.b_de, self.a_de, dtype=self.dtype, axis=axis)
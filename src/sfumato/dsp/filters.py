@@ -1 +1,205 @@
 # 信号処理 (Filter, EQ, Comp)
+#
+# フィルタ設計のレジストリ。設計結果は (種類, 次数, 帯域端, fs) をキーにメモ化されるので、
+# 送信機・受信機を何度作り直しても butter / firwin は1回しか呼ばれない。
+# 状態 (zi) は設計とは別に、フィルタオブジェクトごとに持つ。
+from functools import cache
+
+import numpy as np
+from scipy import signal
+
+
+def _freeze(array: np.ndarray) -> np.ndarray:
+    # キャッシュした配列を呼び出し側で書き換えられないようにする
+    array = np.asarray(array)
+    array.setflags(write=False)
+    return array
+
+
+def _as_key(edges) -> float | tuple[float, ...]:
+    if np.ndim(edges) == 0:
+        return float(edges)
+    return tuple(float(e) for e in edges)
+
+
+def design_iir(order: int, edges, fs: float, btype: str = "low") -> np.ndarray:
+    """
+    Butterworth IIR を SOS (2次セクション) 形式で設計する
+
+    Args:
+        order: 次数
+        edges: カットオフ周波数 (Hz)。帯域通過なら (low, high)
+        fs: サンプリング周波数 (Hz)
+        btype: "low" / "high" / "band" / "bandstop"
+
+    Returns:
+        np.ndarray: SOS係数 (n_sections, 6)。読み取り専用
+    """
+    return _design_iir(int(order), _as_key(edges), float(fs), btype)
+
+
+@cache
+def _design_iir(order, edges, fs, btype):
+    return _freeze(signal.butter(order, edges, btype=btype, fs=fs, output="sos"))
+
+
+def design_fir(numtaps: int, cutoff, fs: float = 2.0, window="hamming") -> np.ndarray:
+    """
+    窓関数法で FIR (LPF) を設計する
+
+    Args:
+        numtaps: タップ数
+        cutoff: カットオフ周波数 (fs と同じ単位)
+        fs: サンプリング周波数。デフォルトの 2.0 ならナイキスト=1で正規化した値
+        window: 窓関数
+
+    Returns:
+        np.ndarray: FIR係数。読み取り専用
+    """
+    return _design_fir(int(numtaps), _as_key(cutoff), float(fs), window)
+
+
+@cache
+def _design_fir(numtaps, cutoff, fs, window):
+    return _freeze(signal.firwin(numtaps, cutoff, window=window, fs=fs))
+
+
+@cache
+def emphasis_coeffs(mode: str, time_constant: float, fs: float):
+    """
+    プリエンファシス/ディエンファシスの係数 (b, a) を返す (EmphasisFilter 用)
+    """
+    if mode == "pre":
+        # --- Pre-emphasis (High-Shelf Filter) ---
+
+        # y[n] = x[n] + alpha * (x[n] - x[n-1])
+        # alpha = tau / T = tau * fs
+        # 1次微分 (High-pass) 成分を足し合わせる処理
+
+        alpha = time_constant * fs  # 例: 50e-6 * 48000 = 2.4
+
+        # 係数: b0 = 1 + alpha, b1 = -alpha
+        # H(z) = (1+alpha) - alpha*z^-1
+        b = [1.0 + alpha, -alpha]
+        a = [1.0]
+
+    elif mode == "de":
+        # --- De-emphasis (Low-Pass Filter) ---
+        # 標準的な IIR LPF
+        # y[n] = (1-p)*x[n] + p*y[n-1]  (p = exp(-1/(fs*tau)))
+
+        dt = 1.0 / fs
+        p = np.exp(-dt / time_constant)  # 減衰係数
+
+        # IIRフィルタ係数
+        # H(z) = (1-p) / (1 - p*z^-1)
+        b = [1.0 - p]
+        a = [1.0, -p]
+
+    else:
+        raise ValueError(f"Unknown emphasis mode: {mode}")
+
+    return _freeze(np.array(b)), _freeze(np.array(a))
+
+
+@cache
+def dc_blocker_coeffs(cutoff: float, fs: float):
+    """
+    DC ブロッカ y[n] = x[n] - x[n-1] + r * y[n-1] の係数 (b, a) を返す
+
+    Args:
+        cutoff: -3dB になるおおよその周波数 (Hz)
+        fs: サンプリング周波数 (Hz)
+    """
+    r = np.exp(-2 * np.pi * cutoff / fs)
+    return _freeze(np.array([1.0, -1.0])), _freeze(np.array([1.0, -r]))
+
+
+class SosFilter:
+    """
+    状態 (zi) を持つ SOS 形式の IIR フィルタ
+
+    process() を続けて呼ぶと、前回の続きとして処理する (ブロック処理用)。
+    (N, C) や (B, N) の配列は axis 方向にまとめて1回でフィルタする
+    (状態の形は最初のブロックの形で決まる)。
+    """
+
+    def __init__(self, sos: np.ndarray, dtype=np.float64, axis: int = 0):
+        """
+        Args:
+            sos: SOS係数 (n_sections, 6)
+            dtype: 係数と状態の dtype (float32 にすると出力も float32 のまま)
+            axis: 時間方向の軸 ((N, C) なら 0, (B, N) なら -1)
+        """
+        # sosfilt は読み取り専用の配列を受け付けないのでコピーして持つ
+        self.sos = np.array(sos, dtype=dtype)
+        self.axis = axis
+        self.reset()
+
+    def reset(self):
+        """状態をゼロに戻す (次のブロックの形に合わせて作り直す)"""
+        self.zi = None
+
+    def process(self, data: np.ndarray) -> np.ndarray:
+        data = np.asarray(data)
+        if data.shape[self.axis] == 0:
+            # sosfilt は長さ0の入力を扱えない
+            return np.zeros(data.shape, dtype=np.result_type(data, self.sos))
+        if self.zi is None:
+            self.zi = np.zeros(
+                (self.sos.shape[0], *_state_shape(data, self.axis, 2)),
+                dtype=self.sos.dtype,
+            )
+        y, self.zi = signal.sosfilt(self.sos, data, axis=self.axis, zi=self.zi)
+        return y
+
+
+class LinearFilter:
+    """
+    状態 (zi) を持つ伝達関数 (b, a) 形式のフィルタ (FIR や1次IIR用)
+
+    SosFilter と同じく、多次元の入力は axis 方向にまとめてフィルタする。
+    """
+
+    def __init__(
+        self,
+        b: np.ndarray,
+        a: np.ndarray | float = 1.0,
+        dtype=np.float64,
+        axis: int = 0,
+    ):
+        self.b = np.atleast_1d(b).astype(dtype)
+        self.a = np.atleast_1d(a).astype(dtype)
+        self.axis = axis
+        self.reset()
+
+    def reset(self):
+        """状態をゼロに戻す (次のブロックの形に合わせて作り直す)"""
+        self.zi = None
+
+    def process(self, data: np.ndarray) -> np.ndarray:
+        data = np.asarray(data)
+        if self.zi is None:
+            order = max(len(self.a), len(self.b)) - 1
+            self.zi = np.zeros(_state_shape(data, self.axis, order), dtype=self.b.dtype)
+        y, self.zi = signal.lfilter(self.b, self.a, data, axis=self.axis, zi=self.zi)
+        return y
+
+
+def _state_shape(data: np.ndarray, axis: int, order: int) -> tuple[int, ...]:
+    # フィルタの状態の形: 入力の形の時間軸を次数に置き換えたもの
+    shape = list(data.shape)
+    shape[axis] = order
+    return tuple(shape)
+
+
+def iir_filter(
+    order: int,
+    edges,
+    fs: float,
+    btype: str = "low",
+    dtype=np.float64,
+    axis: int = 0,
+) -> SosFilter:
+    """レジストリの設計を使った、状態付きの Butterworth IIR フィルタを作る"""
+    return SosFilter(design_iir(order, edges, fs, btype), dtype=dtype, axis=axis)
@@ -0,0 +1,169 @@
+# 数値制御発振器 (NCO)
+#
+# 送信機のパイロット/サブキャリア/搬送波、受信機のミキサと DDC の LO、PLL の NCO で
+# 共通に使う。位相は float の t = n / fs からではなく、サンプル番号 n の整数演算で
+# 求めるので、何時間流しても位相の精度が落ちず、ブロックに分けても位相が連続する。
+#
+#   - 既定 (lut_bits=None): f/fs = p/r (既約分数) として、サンプル n の位相を
+#     (p n mod r) / r 周で求める。値は r サンプル周期なので1周期分の表を引くだけ
+#     (19k/192k は r = 192, 38k/192k は r = 96, 250k/2.304M は r = 1152)。
+#   - lut_bits を指定: FPGA の DDS と同じく、32bit の位相アキュムレータ
+#     (1サンプルの増分 = round(f/fs * 2^32)) の上位 lut_bits ビットで 2^lut_bits 個の
+#     正弦波テーブル (sine_lut) を引く。周波数は fs / 2^32 単位に丸められ、
+#     出力には位相の量子化誤差 (-6 dB/bit 程度のスプリアス) が乗る。
+from fractions import Fraction
+from functools import cache
+
+import numpy as np
+
+PHASE_BITS = 32  # 位相語のビット数 (1周 = 2^32)
+
+# 1周期分の表を持つ r の上限 (これより長い周期は表を作らずに計算する)
+_MAX_TABLE = 1 << 20
+
+
+def rational_ratio(freq: float, fs: float) -> tuple[int, int]:
+    """freq / fs を既約分数 p / r で返す"""
+    ratio = Fraction(freq).limit_denominator(10**9) / Fraction(fs).limit_denominator(
+        10**9
+    )
+    return ratio.numerator, ratio.denominator
+
+
+@cache
+def sine_lut(bits: int) -> np.ndarray:
+    """sin の1周期を 2^bits 点で量子化したテーブル (読み取り専用)"""
+    n = 1 << bits
+    table = np.sin(2 * np.pi * np.arange(n) / n)
+    table.setflags(write=False)
+    return table
+
+
+class Nco:
+    """
+    周波数 freq の発振器 (サンプル番号で位相が決まる)
+
+    どのメソッドも「start から step おきに n サンプル」の値を返す。start を省略すると
+    前回の続き (内部のサンプル番号) から出力して、その分だけ進める (ブロック出力)。
+    start を渡したときは内部の状態を変えない。
+
+    Usage:
+        pilot = Nco(19000, 192000)
+        block1 = pilot.sin(4800)  # サンプル 0..4799
+        block2 = pilot.sin(4800)  # サンプル 4800..9599 (位相は連続)
+        lo = Nco(250e3, 2.304e6).exp(1000, start=0, sign=-1)  # exp(-j 2π f n / fs)
+    """
+
+    def __init__(self, freq: float, fs: float, lut_bits: int | None = None):
+        """
+        Args:
+            freq: 周波数 (Hz)。負でもよい
+            fs: サンプリング周波数 (Hz)
+            lut_bits: None なら有理数の周期で厳密に求める。
+                整数なら 32bit アキュムレータ + 2^lut_bits 点の LUT (FPGA と同じ方式)
+        """
+        if lut_bits is not None and not 2 <= lut_bits <= PHASE_BITS:
+            raise ValueError(f"lut_bits must be in [2, {PHASE_BITS}]: {lut_bits}")
+        self.freq = freq
+        self.fs = fs
+        self.lut_bits = lut_bits
+
+        if lut_bits is None:
+            self.p, self.r = rational_ratio(freq, fs)
+            self.p %= self.r
+        else:
+            # 位相の増分を位相語に丸める (負の周波数は 2^32 で折り返す)
+            self.increment = round(freq / fs * 2**PHASE_BITS) % 2**PHASE_BITS
+            self._lut = sine_lut(lut_bits)
+        self._cycles = {}  # 1周期分の値 (サンプル番号 0..r-1 の順) の表
+        self.reset()
+
+    def reset(self):
+        """ブロック出力の位置をサンプル 0 に戻す"""
+        self.n = 0
+
+    def _indices(self, n: int, start: int | None, step: int) -> tuple[int, np.ndarray]:
+        if start is None:
+            start = self.n
+            self.n = start + n * step
+        return start, start + step * np.arange(n, dtype=np.int64)
+
+    def _cycle(self, kind: str) -> np.ndarray | None:
+        """有理数モードの1周期分の表 (周期が長すぎれば None)"""
+        if self.r > _MAX_TABLE:
+            return None
+        if kind not in self._cycles:
+            k = (self.p * np.arange(self.r, dtype=np.int64)) % self.r
+            self._cycles[kind] = self._from_index(k, kind)
+        return self._cycles[kind]
+
+    def _from_index(self, k: np.ndarray, kind: str) -> np.ndarray:
+        # 位相 k / r 周 (0 <= k < r) から値を求める
+        if kind == "words":
+            return (k * 2**PHASE_BITS // self.r).astype(np.uint32)
+        if kind == "phase":
+            return 2 * np.pi * k / self.r
+        return np.exp(1j * 2 * np.pi * k / self.r)
+
+    def _exact(self, kind: str, n: int, start: int | None, step: int) -> np.ndarray:
+        first, idx = self._indices(n, start, step)
+        cycle = self._cycle(kind)
+        if cycle is None:
+            return self._from_index((self.p * (idx % self.r)) % self.r, kind)
+        if step == 1:
+            # 連続した範囲は、1周期を回転して並べるだけ (剰余の計算が要らない)
+            return np.resize(np.roll(cycle, -(first % self.r)), n)
+        return cycle[idx % self.r]
+
+    def _words(self, n: int, start: int | None, step: int) -> np.ndarray:
+        # アキュムレータの値 = increment * サンプル番号 (mod 2^32)。
+        # uint64 の積は 2^64 で折り返すが、2^32 の剰余は変わらない
+        _, idx = self._indices(n, start, step)
+        words = idx.astype(np.uint64) * np.uint64(self.increment)
+        return (words & np.uint64(2**PHASE_BITS - 1)).astype(np.uint32)
+
+    def phase_words(
+        self, n: int, start: int | None = None, step: int = 1
+    ) -> np.ndarray:
+        """位相語 (uint32, 1周 = 2^32)"""
+        if self.lut_bits is None:
+            return self._exact("words", n, start, step)
+        return self._words(n, start, step)
+
+    def phase(self, n: int, start: int | None = None, step: int = 1) -> np.ndarray:
+        """位相 [rad] ([0, 2π))"""
+        if self.lut_bits is None:
+            return self._exact("phase", n, start, step)
+        return self._words(n, start, step) * (2 * np.pi / 2**PHASE_BITS)
+
+    def exp(
+        self, n: int, start: int | None = None, step: int = 1, sign: int = 1
+    ) -> np.ndarray:
+        """exp(sign * j * 位相) (complex128)"""
+        if self.lut_bits is None:
+            out = self._exact("exp", n, start, step)
+            return np.conj(out) if sign < 0 else out
+        cos, sin = self._lookup(self._words(n, start, step))
+        out = np.empty(n, dtype=np.complex128)
+        out.real = cos
+        out.imag = sin if sign > 0 else -sin
+        return out
+
+    def sin(self, n: int, start: int | None = None, step: int = 1) -> np.ndarray:
+        """sin(位相)"""
+        if self.lut_bits is None:
+            return self._exact("exp", n, start, step).imag.copy()
+        return self._lookup(self._words(n, start, step))[1]
+
+    def cos(self, n: int, start: int | None = None, step: int = 1) -> np.ndarray:
+        """cos(位相)"""
+        if self.lut_bits is None:
+            return self._exact("exp", n, start, step).real.copy()
+        return self._lookup(self._words(n, start, step))[0]
+
+    def _lookup(self, words: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # 位相語の上位 lut_bits ビットで LUT を引く (cos は 1/4 周ずらした位置)
+        size = 1 << self.lut_bits
+        idx = words >> np.uint32(PHASE_BITS - self.lut_bits)
+        cos = self._lut[(idx + size // 4) & (size - 1)]
+        return cos, self._lut[idx]
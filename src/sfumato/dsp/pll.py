@@ -1,6 +1,74 @@
+import math
+
 import numpy as np
 
 from sfumato import settings
+from sfumato.dsp.nco import sine_lut
+
+try:
+    import numba
+except ImportError:  # numba は任意 (pip install sfumato-fm-radio-turner[fast])
+    numba = None
+
+
+def _pll_loop(samples, carrier_38k, error_log, phase, integrator, alpha, beta, step):
+    """
+    PilotPLL.process_reference と同じ計算を行う高速版のループ本体
+
+    スカラーの np.cos / np.sin の代わりに math を使う。numba があれば
+    そのままJITコンパイルされ、無ければ list を渡してPythonで実行する。
+    """
+    two_pi = 2 * math.pi
+    for i in range(len(samples)):
+        error = samples[i] * math.cos(phase)
+        integrator += beta * error
+        control = integrator + alpha * error
+        phase += step + control
+        if phase > two_pi:
+            phase -= two_pi
+        elif phase < 0:
+            phase += two_pi
+        carrier_38k[i] = math.sin(2 * phase)
+        error_log[i] = error
+    return phase, integrator
+
+
+def _pll_loop_lut(
+    samples, carrier_38k, error_log, phase, integrator, alpha, beta, step, lut
+):
+    """
+    _pll_loop の NCO を正弦波 LUT (FPGA と同じ方式) にした版
+
+    位相 [0, 2π) の上位ビット (切り捨て) で len(lut) 点の sin の表を引く。
+    cos は 1/4 周ずらした位置、38kHz は位相を2倍した位置を引く。
+    """
+    size = len(lut)
+    mask = size - 1
+    quarter = size // 4
+    scale = size / (2 * math.pi)
+    two_pi = 2 * math.pi
+    for i in range(len(samples)):
+        index = int(phase * scale)
+        error = samples[i] * lut[(index + quarter) & mask]
+        integrator += beta * error
+        control = integrator + alpha * error
+        phase += step + control
+        if phase > two_pi:
+            phase -= two_pi
+        elif phase < 0:
+            phase += two_pi
+        carrier_38k[i] = lut[int(2 * phase * scale) & mask]
+        error_log[i] = error
+    return phase, integrator
+
+
+if numba is not None:
+    _pll_loop_jit = numba.njit(cache=True)(_pll_loop)
+    _pll_loop_lut_jit = numba.njit(cache=True)(_pll_loop_lut)
+else:
+    _pll_loop_jit = _pll_loop_lut_jit = None
+
+PLL_BACKENDS = ("auto", "numba", "python", "reference")
 
 
 class PilotPLL:
@@ -9,15 +77,39 @@ class PilotPLL:
         fs: float = settings.MPX_FS,
         center_freq: float = settings.PILOT_FREQ,
         bandwidth: float = settings.PLL_BANDWIDTH,
+        backend: str = "auto",
+        lut_bits: int | None = settings.NCO_LUT_BITS,
     ):
         """
         Args:
             fs: サンプリング周波数 (192000)
             center_freq: ロックする目標周波数 (19000)
             bandwidth: ループ帯域幅 (Hz)。ここが「反応速度」を決める。
+            backend: ループの実行方法
+                - "auto": numba があれば "numba"、無ければ "python"
+                - "numba": JITコンパイルしたループ (numba が必要)
+                - "python": math を使ったPythonループ
+                - "reference": 元の np.cos / np.sin によるループ (検証用)
+            lut_bits: None なら NCO の cos / sin を計算する。整数なら 2^lut_bits 点の
+                正弦波 LUT を引く (sfumato.dsp.nco と同じ表。"reference" では使えない)
         """
+        if backend not in PLL_BACKENDS:
+            raise ValueError(f"Unknown PLL backend: {backend}")
+        if backend == "numba" and numba is None:
+            raise ImportError("backend='numba' requires numba")
+        if backend == "auto":
+            backend = "numba" if numba is not None else "python"
+        if lut_bits is not None and backend == "reference":
+            raise ValueError("lut_bits is not supported by backend='reference'")
+        if lut_bits is not None and not 2 <= lut_bits <= 24:
+            raise ValueError(f"lut_bits must be in [2, 24]: {lut_bits}")
+
         self.fs = fs
         self.center_freq = center_freq
+        self.backend = backend
+        self.lut_bits = lut_bits
+        self._lut = sine_lut(lut_bits) if lut_bits is not None else None
+        self._lut_list = None  # backend="python" 用 (最初の process で作る)
 
         # --- 制御係数の計算 ---
         # アナログPLLの理論式からデジタル係数を導出
@@ -37,6 +129,53 @@ class PilotPLL:
         self.freq_integrator = 0.0  # 積分器 (蓄積された周波数のズレ)
 
     def process(self, signal_in: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        MPX信号を入力し、38kHz搬送波と位相誤差を返す
+
+        位相と積分器は呼び出し間で引き継がれる。どのバックエンドでも
+        process_reference と同じ計算順序で処理する。
+        """
+        if self.backend == "reference":
+            return self.process_reference(signal_in)
+
+        n_samples = len(signal_in)
+        center_phase_step = 2 * np.pi * self.center_freq / self.fs
+
+        if self.backend == "numba":
+            samples = np.ascontiguousarray(signal_in, dtype=np.float64)
+            carrier_38k = np.zeros(n_samples)
+            error_log = np.zeros(n_samples)
+            loop = _pll_loop_jit if self._lut is None else _pll_loop_lut_jit
+            lut = self._lut
+        else:
+            samples = np.asarray(signal_in, dtype=np.float64).tolist()
+            carrier_38k = [0.0] * n_samples
+            error_log = [0.0] * n_samples
+            loop = _pll_loop if self._lut is None else _pll_loop_lut
+            if self._lut is not None and self._lut_list is None:
+                self._lut_list = self._lut.tolist()
+            lut = self._lut_list
+
+        args = (
+            samples,
+            carrier_38k,
+            error_log,
+            float(self.phase),
+            float(self.freq_integrator),
+            self.alpha,
+            self.beta,
+            center_phase_step,
+        )
+        if lut is not None:
+            args += (lut,)
+        self.phase, self.freq_integrator = loop(*args)
+
+        return np.asarray(carrier_38k), np.asarray(error_log)
+
+    def process_reference(self, signal_in: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        1サンプルずつ np.cos / np.sin を呼ぶ元の実装 (高速版の検証用)
+        """
         n_samples = len(signal_in)
 
         # 出力用バッファ
@@ -0,0 +1,22 @@
+import numpy as np
+
+# 精度の設定名 -> (実数の dtype, 複素数の dtype)
+PRECISIONS = {
+    "float64": (np.dtype(np.float64), np.dtype(np.complex128)),
+    "float32": (np.dtype(np.float32), np.dtype(np.complex64)),
+}
+
+
+def precision_dtypes(precision: str) -> tuple[np.dtype, np.dtype]:
+    """
+    精度の設定名から、実数・複素数の dtype を返す
+
+    Args:
+        precision: "float64" (既定) または "float32"
+
+    Returns:
+        tuple[np.dtype, np.dtype]: (実数の dtype, 複素数の dtype)
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    return PRECISIONS[precision]
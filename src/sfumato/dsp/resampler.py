@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+from scipy import signal
+
+from sfumato.dsp.filters import design_fir
+
+
+class PolyphaseResampler:
+    """
+    ブロック単位で入力できるポリフェーズ・リサンプラ (ゼロ位相)
+
+    signal.resample_poly(x, up, down, window=...) と同じフィルタ・同じ出力位置で
+    レート変換を行う。ゼロ位相フィルタは未来のサンプルを必要とするため、出力は
+    フィルタ長の半分だけ遅れて出てくる。最後に flush() を呼ぶと、全体を一括で
+    処理した場合と同じ列になる。
+    (N, C) や (B, N) の入力は axis 方向にまとめて1回で処理する。
+    """
+
+    def __init__(
+        self,
+        up: int,
+        down: int,
+        window=("kaiser", 5.0),
+        causal: bool = False,
+        axis: int = 0,
+    ):
+        """
+        Args:
+            up (int): アップサンプリング率
+            down (int): ダウンサンプリング率
+            window: resample_poly の window と同じ (窓の指定、またはFIR係数の配列)
+                    係数の配列は複素数でもよい
+            causal (bool): True なら中央揃えをせず、通常の因果的FIRとして扱う
+                    (出力 m = Σ h[k] x[m*down - k]。先読みが不要になり flush は空を返す)
+            axis (int): 時間方向の軸 ((N, C) なら 0, (B, N) なら -1)
+        """
+        g = math.gcd(int(up), int(down))
+        self.up = int(up) // g
+        self.down = int(down) // g
+        self.axis = axis
+
+        # resample_poly と同じフィルタ設計
+        self._match_dtype = not isinstance(window, (list, np.ndarray))
+        if not self._match_dtype:
+            # FIR係数をそのまま使う (DDC用の複素係数も可)
+            h = np.array(window)
+            if not np.issubdtype(h.dtype, np.inexact):
+                h = h.astype(float)
+            half_len = (len(h) - 1) // 2
+        else:
+            max_rate = max(self.up, self.down)
+            half_len = 10 * max_rate
+            h = design_fir(2 * half_len + 1, 1.0 / max_rate, window=window)
+
+        # 出力サンプルが中央に来るように前側をゼロ詰め
+        if causal:
+            self.n_pre_pad = 0
+            self.n_pre_remove = 0
+        else:
+            self.n_pre_pad = self.down - half_len % self.down
+            self.n_pre_remove = (half_len + self.n_pre_pad) // self.down
+        self._h_design = h
+        self.h = self._scaled_taps(h)
+
+        self.reset()
+
+    def reset(self):
+        """内部状態 (入力履歴と出力位置) を初期化する"""
+        self._buf = None
+        self._buf_start = 0  # _buf[0] の絶対サンプル番号 (down の倍数, 負もあり得る)
+        self._n_in = 0  # これまでに受け取った入力サンプル数
+        self._m_next = 0  # 次に出力するサンプル番号
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        入力ブロックを追加し、計算可能になった出力サンプルを返す
+        """
+        # 内部では時間軸を先頭 (0) に置いて扱う
+        block = np.moveaxis(np.asarray(block), self.axis, 0)
+        if self._buf is None:
+            # 先頭より前はゼロ (resample_poly の padtype="constant" と同じ)
+            start = self._first_input(0)
+            self._buf = np.zeros((-start, *block.shape[1:]), dtype=block.dtype)
+            self._buf_start = start
+            if self._match_dtype and np.issubdtype(block.dtype, np.inexact):
+                # resample_poly は設計したフィルタを入力の dtype に合わせる
+                self.h = self._scaled_taps(self._h_design.astype(block.dtype))
+        self._buf = np.concatenate([self._buf, block])
+        self._n_in += len(block)
+
+        # 出力 m に必要な最後の入力 (_last_input(m)) が揃っている範囲まで出す
+        m_stop = (self._n_in * self.up + self.n_pre_pad - 1) // self.down
+        m_stop = m_stop - self.n_pre_remove + 1
+        return np.moveaxis(self._emit(m_stop), 0, self.axis)
+
+    def flush(self) -> np.ndarray:
+        """
+        入力の終端以降をゼロとみなして、残りの出力をすべて返す
+        """
+        n_out = self._n_in * self.up
+        n_out = n_out // self.down + bool(n_out % self.down)
+        if self._buf is None:
+            out = np.zeros(0)
+        else:
+            out = np.moveaxis(self._emit(n_out), 0, self.axis)
+        self.reset()
+        return out
+
+    def _scaled_taps(self, h: np.ndarray) -> np.ndarray:
+        return np.concatenate([np.zeros(self.n_pre_pad, dtype=h.dtype), h * self.up])
+
+    def _first_input(self, m: int) -> int:
+        """出力 m の計算に必要な最初の入力位置 (down の倍数に切り下げ)"""
+        k = (m + self.n_pre_remove) * self.down - (len(self.h) - 1)
+        lowest = -((-k) // self.up)  # ceil(k / up)
+        return (lowest // self.down) * self.down
+
+    def _emit(self, m_stop: int) -> np.ndarray:
+        m_start = self._m_next
+        if m_stop <= m_start:
+            return np.zeros(
+                (0, *self._buf.shape[1:]), dtype=np.result_type(self._buf, self.h)
+            )
+
+        # _buf_start が down の倍数なので、upfirdn の出力 j は全体処理での j + a に一致
+        a = self._buf_start * self.up // self.down
+        full = signal.upfirdn(self.h, self._buf, self.up, self.down, axis=0)
+        j0 = m_start + self.n_pre_remove - a
+        out = full[j0 : j0 + (m_stop - m_start)]
+
+        # 次回以降に不要な履歴を捨てる
+        self._m_next = m_stop
+        keep_from = self._first_input(m_stop)
+        if keep_from > self._buf_start:
+            self._buf = self._buf[keep_from - self._buf_start :]
+            self._buf_start = keep_from
+
+        return out
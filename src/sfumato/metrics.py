@@ -0,0 +1,301 @@
+# 受信音声の品質指標
+#
+#   - audio SNR: ノイズ無しで受信した音声 (reference) に対する SN比
+#   - THD+N: テストトーン (AudioSource.stereo_sine_tone) の基本波以外の成分の比
+#   - ステレオ分離度: 片方のチャンネルのトーンが、もう片方にどれだけ漏れたか
+#   - パイロット残留: 音声に残った 19 kHz パイロットの大きさ (基本波比)
+#   - 遅延を合わせた誤差: 送信前の音声 (source) を遅延・ゲインを合わせて比べた SN比
+#
+# どの指標も「和」(エネルギー, 内積) の形で積み上げるので、ブロックごとに
+# QualityMeter.process() に渡せば、出力全体を保存せずに長い実行の品質がわかる。
+# 信号は (..., N, C) で受け取り、先頭の次元 (SNR の点や信号の数など) はまとめて計算する。
+import numpy as np
+
+from sfumato import settings
+
+DEFAULT_TONE_FREQS = (440.0, 1000.0)  # stereo_sine_tone(440, 1000, ...) の L, R
+
+
+def _db(num, den) -> np.ndarray:
+    # 0 除算は inf / nan のままにする (誤差 0 なら inf dB)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 10 * np.log10(np.asarray(num, dtype=float) / den)
+
+
+class QualityMeter:
+    """
+    受信音声の品質指標を、ブロックごとに積み上げて計算する
+
+    テストトーンの指標は、直流・各トーン・パイロットの cos/sin を基底にした
+    最小二乗フィット (正規方程式の和を積み上げる) で求めるので、FFT の窓や
+    ビンの位置に左右されず、ブロックの分け方にもよらない。
+
+    Usage:
+        meter = QualityMeter(skip=12000)
+        for audio_block in rx.stream(rf_blocks):
+            meter.process(audio_block)
+        print(meter.result())
+    """
+
+    def __init__(
+        self,
+        fs: float = settings.AUDIO_FS,
+        tone_freqs=DEFAULT_TONE_FREQS,
+        pilot_freq: float = settings.PILOT_FREQ,
+        delay: int = 0,
+        skip: int = 0,
+    ):
+        """
+        Args:
+            fs: サンプリング周波数 [Hz]
+            tone_freqs: チャンネルごとのテストトーンの周波数 [Hz] (L, R)
+            pilot_freq: パイロットの周波数 [Hz]
+            delay: source に対する受信音声の遅れ (サンプル, estimate_delay で求める)
+            skip: 先頭から除外するサンプル数 (PLL の引き込みなど)
+        """
+        if delay < 0:
+            raise ValueError(f"delay must be >= 0: {delay}")
+        self.fs = fs
+        self.tone_freqs = tuple(float(f) for f in tone_freqs)
+        self.pilot_freq = float(pilot_freq)
+        self.delay = int(delay)
+        self.skip = int(skip)
+        self.reset()
+
+    def reset(self):
+        self.num_samples = 0  # 受け取ったサンプル数 (除外した分も含む)
+        self._shape = None  # (..., C)
+        self._gram = None  # 基底どうしの内積 (K, K)
+        self._proj = None  # 信号と基底の内積 (..., C, K)
+        self._energy = None  # 信号のエネルギー (..., C)
+        self._count = 0  # 積み上げたサンプル数
+        self._ref = None  # reference: [Σr², Σ(a-r)²]
+        self._src = None  # source: [Σs², Σa·s, Σa², サンプル数]
+        self._src_buf = None  # source の遅延線 (..., delay + α, C)
+
+    @property
+    def _freqs(self) -> np.ndarray:
+        return np.array([*self.tone_freqs, self.pilot_freq])
+
+    def _basis(self, start: int, n: int) -> np.ndarray:
+        """絶対サンプル番号 start から n 個分の基底 (n, K) [1, cos f1, sin f1, ...]"""
+        idx = np.arange(start, start + n)
+        # 位相は [0, 1) 周に折り返してから角度にする (長時間でも精度が落ちない)
+        cycles = np.mod(np.outer(idx, self._freqs / self.fs), 1.0)
+        angle = 2 * np.pi * cycles
+        basis = np.empty((n, 1 + 2 * len(self._freqs)))
+        basis[:, 0] = 1.0
+        basis[:, 1::2] = np.cos(angle)
+        basis[:, 2::2] = np.sin(angle)
+        return basis
+
+    def process(
+        self,
+        audio: np.ndarray,
+        reference: np.ndarray | None = None,
+        source: np.ndarray | None = None,
+    ):
+        """
+        ブロックを1つ積み上げる
+
+        Args:
+            audio: 受信音声 (..., N, C)
+            reference: 同じ時刻のノイズ無しの受信音声 (..., N, C) (audio SNR 用)
+            source: 同じ時刻の送信前の音声 (..., N, C)。内部で delay だけ遅らせて比べる
+        """
+        audio = np.asarray(audio, dtype=float)
+        n = audio.shape[-2]
+        start = self.num_samples
+        self.num_samples += n
+        if self._shape is None:
+            self._init_state(audio.shape[:-2] + audio.shape[-1:])
+
+        if source is not None:
+            source = self._delay_source(np.asarray(source, dtype=float))
+
+        # 除外する先頭の分を落とす
+        k0 = min(max(self.skip - start, 0), n)
+        audio = audio[..., k0:, :]
+        m = n - k0
+        if m == 0:
+            return
+
+        basis = self._basis(start + k0, m)
+        self._gram += basis.T @ basis
+        self._proj += np.einsum("...nc,nk->...ck", audio, basis)
+        self._energy += np.einsum("...nc,...nc->...c", audio, audio)
+        self._count += m
+
+        if reference is not None:
+            ref = np.asarray(reference, dtype=float)[..., k0:, :]
+            err = audio - ref
+            self._ref[0] += np.einsum("...nc,...nc->...c", ref, ref)
+            self._ref[1] += np.einsum("...nc,...nc->...c", err, err)
+
+        if source is not None:
+            # source[n - delay] が存在しない先頭 (n < delay) は比べない
+            j0 = min(max(self.delay - (start + k0), 0), m)
+            a = audio[..., j0:, :]
+            s = source[..., k0 + j0 :, :]
+            self._src[0] += np.einsum("...nc,...nc->...c", s, s)
+            self._src[1] += np.einsum("...nc,...nc->...c", a, s)
+            self._src[2] += np.einsum("...nc,...nc->...c", a, a)
+            self._src[3] += m - j0
+
+    def _init_state(self, shape: tuple):
+        k = 1 + 2 * len(self._freqs)
+        self._shape = shape
+        self._gram = np.zeros((k, k))
+        self._proj = np.zeros((*shape, k))
+        self._energy = np.zeros(shape)
+        self._ref = np.zeros((2, *shape))
+        self._src = np.zeros((4, *shape))
+        # 最初の delay サンプルは source が無い (0 で埋めて比べない)
+        self._src_buf = np.zeros((*shape[:-1], self.delay, shape[-1]))
+
+    def _delay_source(self, source: np.ndarray) -> np.ndarray:
+        # source を delay だけ遅らせ、audio と同じ長さの分を返す
+        buf = np.concatenate([self._src_buf, source], axis=-2)
+        n = source.shape[-2]
+        self._src_buf = buf[..., n:, :].copy()
+        return buf[..., :n, :]
+
+    def result(self) -> dict:
+        """
+        これまでに積み上げた分の指標
+
+        Returns:
+            dict: 値はチャンネルごとの配列 (..., C) (*_total は全チャンネル合計 (...))
+                audio_snr_db / audio_snr_db_total: reference に対する SN比
+                    (reference を渡していなければ nan)
+                thd_n_db: 基本波に対する THD+N (全帯域)
+                tone_amplitude: 基本波の振幅
+                separation_db: 自チャンネルのトーンと、それが他チャンネルに漏れた
+                    大きさの比 (L の値は L -> R への漏れ)
+                pilot_residual_db: 19 kHz 成分の基本波比 (dBc)
+                aligned_snr_db: 遅延とゲインを合わせた source に対する SN比
+                    (source を渡していなければ nan)
+                source_gain: source に掛かっていたゲイン
+        """
+        if self._shape is None or self._count == 0:
+            raise ValueError("no samples have been processed")
+        n_ch = self._shape[-1]
+        n_tones = len(self.tone_freqs)
+
+        # 正規方程式 G c = b をまとめて解く -> 係数 (..., C, K)
+        coef = np.linalg.solve(self._gram, self._proj[..., np.newaxis])[..., 0]
+        tone_power = (coef[..., 1::2] ** 2 + coef[..., 2::2] ** 2) / 2  # (..., C, F)
+        dc_energy = coef[..., 0] ** 2 * self._count
+
+        # 自チャンネルのトーン (tone_freqs[c]) の電力
+        own = np.arange(n_ch) % n_tones
+        fund = np.take_along_axis(
+            tone_power, own.reshape((1,) * (tone_power.ndim - 2) + (n_ch, 1)), axis=-1
+        )[..., 0]
+        rest = self._energy - dc_energy - fund * self._count
+        thd_n_db = _db(rest, fund * self._count)
+
+        # 分離度: トーン tone_freqs[c] の、チャンネル c とそれ以外の電力の比
+        separation_db = np.full(self._shape, np.nan)
+        if n_ch > 1 and len(set(self.tone_freqs)) == n_tones:
+            for c in range(n_ch):
+                f = own[c]
+                others = [d for d in range(n_ch) if d != c]
+                leak = tone_power[..., others, f].sum(axis=-1)
+                separation_db[..., c] = _db(tone_power[..., c, f], leak)
+
+        pilot_residual_db = _db(tone_power[..., -1], fund)
+
+        # reference / source を渡していなければ 0 / 0 = nan になる
+        snr = _db(self._ref[0], self._ref[1])
+        snr_total = _db(self._ref[0].sum(axis=-1), self._ref[1].sum(axis=-1))
+
+        ss, as_, aa, _ = self._src
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gain = as_ / ss
+            # gain * source で説明できない分が誤差
+            explained = as_**2 / ss
+        aligned = _db(explained, aa - explained)
+
+        return {
+            "audio_snr_db": snr,
+            "audio_snr_db_total": snr_total,
+            "thd_n_db": thd_n_db,
+            "tone_amplitude": np.sqrt(2 * fund),
+            "separation_db": separation_db,
+            "pilot_residual_db": pilot_residual_db,
+            "aligned_snr_db": aligned,
+            "source_gain": gain,
+        }
+
+
+def estimate_delay(
+    audio: np.ndarray, source: np.ndarray, max_lag: int | None = None
+) -> np.ndarray:
+    """
+    受信音声が source より何サンプル遅れているか (相互相関の最大, 全チャンネルの和)
+
+    Args:
+        audio: 受信音声 (..., N, C)
+        source: 送信前の音声 (..., M, C)
+        max_lag: 探す遅れの最大 (None なら N - 1)
+
+    Returns:
+        np.ndarray: 遅れ (サンプル, >= 0) (...)
+    """
+    audio = np.asarray(audio, dtype=float)
+    source = np.asarray(source, dtype=float)
+    n = audio.shape[-2] + source.shape[-2]
+    n_fft = 1 << (n - 1).bit_length()
+    spec = np.fft.rfft(audio, n_fft, axis=-2) * np.conj(
+        np.fft.rfft(source, n_fft, axis=-2)
+    )
+    corr = np.fft.irfft(spec.sum(axis=-1), n_fft, axis=-1)
+    if max_lag is None:
+        max_lag = audio.shape[-2] - 1
+    return np.argmax(corr[..., : max_lag + 1], axis=-1)
+
+
+def quality_metrics(
+    audio: np.ndarray,
+    fs: float = settings.AUDIO_FS,
+    reference: np.ndarray | None = None,
+    source: np.ndarray | None = None,
+    tone_freqs=DEFAULT_TONE_FREQS,
+    skip: int = 0,
+    delay: int | None = None,
+    max_lag: int | None = None,
+) -> dict:
+    """
+    音声全体の品質指標 (QualityMeter を1回で使う)
+
+    Args:
+        audio: 受信音声 (..., N, C)。先頭の次元 (SNR の点など) はまとめて計算する
+        fs: サンプリング周波数 [Hz]
+        reference: ノイズ無しの受信音声 (..., N, C) (audio SNR 用)
+        source: 送信前の音声 (N, C) または (..., N, C) (遅延を合わせた誤差用)
+        tone_freqs: チャンネルごとのテストトーンの周波数 [Hz]
+        skip: 先頭から除外するサンプル数
+        delay: source に対する遅れ。None なら estimate_delay で求める
+            (先頭の次元があるときは、最初の信号で求めた値を全部に使う)
+        max_lag: estimate_delay で探す遅れの最大
+
+    Returns:
+        dict: QualityMeter.result() と、使った遅れ (delay)
+    """
+    audio = np.asarray(audio)
+    if source is not None:
+        n = min(audio.shape[-2], np.shape(source)[-2])
+        audio = audio[..., :n, :]
+        source = np.broadcast_to(source[..., :n, :], audio.shape)
+        if reference is not None:
+            reference = np.asarray(reference)[..., :n, :]
+        if delay is None:
+            first = (0,) * (audio.ndim - 2)
+            delay = int(estimate_delay(audio[first], source[first], max_lag))
+
+    meter = QualityMeter(fs, tone_freqs, delay=delay or 0, skip=skip)
+    meter.process(audio, reference, source)
+    result = meter.result()
+    result["delay"] = delay
+    return result
@@ -0,0 +1,296 @@
+# 送信 -> 通信路 -> 受信 のパイプライン (UI無しで実行できる)
+#
+# 各段は FmPipeline.stage() で囲まれ、前後でフック (PipelineHook) が呼ばれる。
+# 計測 (StageTimer)・プロファイル (ProfileHook)・メモリの内訳 (TracemallocHook) や、
+# 画面の演出 (component.radio_ui.RadioUIObserver) はすべてフックとして後から付ける。
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+from sfumato import settings
+from sfumato.channnel import add_awgn
+from sfumato.receiver import FmReceiver
+from sfumato.transmitter import FmTransmitter
+
+
+class PipelineHook:
+    """
+    パイプラインの各段の前後で呼ばれるフック (必要なメソッドだけ上書きする)
+
+    record は段ごとの記録 (dict)。"stage" に段の名前が入っていて、フックは
+    計測結果などを書き足せる (JSON にできる値だけを入れること)。
+    開始は登録順、終了は逆順に呼ばれる (計測用のフックほど内側になる)。
+    """
+
+    def on_stage_start(self, pipeline: "FmPipeline", record: dict):
+        pass
+
+    def on_stage_end(self, pipeline: "FmPipeline", record: dict):
+        pass
+
+
+class StageTimer(PipelineHook):
+    """
+    各段の経過時間・CPU時間・確保したメモリを記録する
+
+    track_memory=True なら tracemalloc で、段の終了時に増えたメモリ (alloc_bytes) と
+    段の中でのピーク (alloc_peak_bytes) も記録する (計測のぶん少し遅くなる)。
+    """
+
+    def __init__(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        self._started_tracing = False
+
+    def on_stage_start(self, pipeline, record):
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            record["_alloc_start"] = tracemalloc.get_traced_memory()[0]
+
+        record["_wall_start"] = time.perf_counter()
+        record["_cpu_start"] = time.process_time()
+
+    def on_stage_end(self, pipeline, record):
+        record["wall_time_s"] = time.perf_counter() - record.pop("_wall_start")
+        record["cpu_time_s"] = time.process_time() - record.pop("_cpu_start")
+
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            start = record.pop("_alloc_start")
+            record["alloc_bytes"] = current - start
+            record["alloc_peak_bytes"] = peak - start
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+
+class ProfileHook(PipelineHook):
+    """
+    段ごとに cProfile を取り、上位の関数を記録する
+
+    output_dir を指定すると <段の名前>.prof も保存する (snakeviz などで見られる)。
+    """
+
+    def __init__(
+        self,
+        stages: list[str] | None = None,
+        top: int = 15,
+        output_dir: str | None = None,
+    ):
+        """
+        Args:
+            stages: プロファイルする段の名前 (None なら全部)
+            top: 記録する関数の数 (累積時間の順)
+            output_dir: .prof ファイルの保存先
+        """
+        self.stages = stages
+        self.top = top
+        self.output_dir = output_dir
+        self._profiles = {}
+
+    def on_stage_start(self, pipeline, record):
+        if self.stages is not None and record["stage"] not in self.stages:
+            return
+        profile = cProfile.Profile()
+        self._profiles[record["stage"]] = profile
+        profile.enable()
+
+    def on_stage_end(self, pipeline, record):
+        profile = self._profiles.pop(record["stage"], None)
+        if profile is None:
+            return
+        profile.disable()
+
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        stats.sort_stats("cumulative")
+        rows = []
+        for func in stats.fcn_list[: self.top]:
+            _, ncalls, tottime, cumtime, _ = stats.stats[func]
+            filename, line, name = func
+            rows.append(
+                {
+                    "function": f"{os.path.basename(filename)}:{line}({name})",
+                    "ncalls": ncalls,
+                    "tottime_s": tottime,
+                    "cumtime_s": cumtime,
+                }
+            )
+        record["profile"] = rows
+
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{record['stage']}.prof")
+            profile.dump_stats(path)
+            record["profile_file"] = path
+
+
+class TracemallocHook(PipelineHook):
+    """段の中でメモリを確保した場所 (ファイル:行) の上位を記録する"""
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self._snapshots = {}
+        self._started_tracing = False
+
+    def on_stage_start(self, pipeline, record):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._snapshots[record["stage"]] = tracemalloc.take_snapshot()
+
+    def on_stage_end(self, pipeline, record):
+        before = self._snapshots.pop(record["stage"])
+        after = tracemalloc.take_snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        stats = after.compare_to(before, "lineno")
+        record["allocations"] = [
+            {
+                "location": f"{os.path.basename(s.traceback[0].filename)}:"
+                f"{s.traceback[0].lineno}",
+                "size_diff_bytes": s.size_diff,
+                "count_diff": s.count_diff,
+            }
+            for s in stats[: self.top]
+        ]
+
+
+class FmPipeline:
+    def __init__(
+        self,
+        snr_db: float = settings.DEFAULT_SNR_DB,
+        baseband: bool = settings.BASEBAND_SIMULATION,
+        seed: int | None = None,
+        hooks: list[PipelineHook] | None = None,
+        track_memory: bool = True,
+        transmitter_kwargs: dict | None = None,
+        receiver_kwargs: dict | None = None,
+    ):
+        """
+        送信 -> 通信路 (AWGN) -> 受信 を UI 無しで実行するパイプライン
+
+        Args:
+            snr_db: 通信路の SN比 (dB)
+            baseband: True なら複素ベースバンド (modulate_iq / process_iq) で行う
+            seed: 雑音の乱数シード (None なら固定しない)
+            hooks: 各段の前後で呼ぶフック (RadioUIObserver など)。
+                段ごとの時間・メモリを測る StageTimer は常に一番内側に付く
+            track_memory: StageTimer でメモリも計測する
+            transmitter_kwargs: FmTransmitter に渡す引数
+            receiver_kwargs: FmReceiver に渡す引数
+        """
+        self.snr_db = snr_db
+        self.baseband = baseband
+        self.seed = seed
+        self.hooks = list(hooks or []) + [StageTimer(track_memory=track_memory)]
+
+        self.tx = FmTransmitter(**(transmitter_kwargs or {}))
+        self.rx = FmReceiver(**(receiver_kwargs or {}))
+
+        self.records = []  # 段ごとの記録
+        self.signals = {}  # 段ごとの出力 (フックやグラフ表示から参照する)
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        """
+        処理を1つの段として囲む (with pipeline.stage("io.save_audio", file=...): ...)
+
+        info は記録にそのまま残る (フックの表示にも使われる)
+        """
+        record = {"stage": name, **info}
+        for hook in self.hooks:
+            hook.on_stage_start(self, record)
+        try:
+            yield record
+        finally:
+            for hook in reversed(self.hooks):
+                hook.on_stage_end(self, record)
+            self.records.append(record)
+
+    def run(self, audio_data: np.ndarray) -> np.ndarray:
+        """
+        音声を送信 -> AWGN -> 受信 して、復調したステレオ音声を返す
+
+        Returns:
+            np.ndarray: ステレオ音声 (N, 2) [48 kHz]
+        """
+        mode = "iq" if self.baseband else "rf"
+
+        with self.stage("tx.modulate", mode=mode, samples=len(audio_data)):
+            if self.baseband:
+                rf_signal = self.tx.modulate_iq(audio_data)
+            else:
+                rf_signal = self.tx.modulate(audio_data)
+        self.signals["rf"] = rf_signal
+
+        with self.stage("channel.awgn", snr_db=self.snr_db, samples=len(rf_signal)):
+            noisy_rf_signal = add_awgn(
+                rf_signal,
+                self.snr_db,
+                seed=self.seed,
+                iq_fs=self.tx.iq_fs,
+                rf_fs=self.tx.rf_fs,
+            )
+        self.signals["noisy_rf"] = noisy_rf_signal
+
+        with self.stage("rx.demodulate", mode=mode, samples=len(noisy_rf_signal)):
+            if self.baseband:
+                mpx_signal = self.rx.process_iq(noisy_rf_signal)
+            else:
+                mpx_signal = self.rx.process(noisy_rf_signal)
+        self.signals["mpx"] = mpx_signal
+
+        with self.stage("rx.recover_carrier", samples=len(mpx_signal)):
+            carrier_38k = self.rx._recover_carrier(mpx_signal)
+        self.signals["carrier_38k"] = carrier_38k
+
+        with self.stage("rx.stereo_decode", samples=len(mpx_signal)):
+            demodulated_audio = self.rx._stereo_decode(mpx_signal, carrier_38k)
+        self.signals["audio"] = demodulated_audio
+
+        return demodulated_audio
+
+    def report(self) -> dict:
+        """
+        段ごとの記録を JSON にできる dict で返す
+        """
+        total = {
+            key: sum(r.get(key, 0) for r in self.records)
+            for key in ("wall_time_s", "cpu_time_s")
+        }
+        return {
+            "meta": {
+                "snr_db": self.snr_db,
+                "baseband": self.baseband,
+                "seed": self.seed,
+                "precision": self.tx.precision,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "stages": self.records,
+            "total": total,
+        }
+
+    def save_report(self, path: str) -> str:
+        """report() を JSON ファイルに保存する"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2, default=_to_json)
+        return path
+
+
+def _to_json(value):
+    # numpy のスカラーなど
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
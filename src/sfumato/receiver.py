@@ -1,9 +1,17 @@
+from collections.abc import Iterable, Iterator
+
 import numpy as np
 from scipy import signal
 
 from sfumato import settings
+from sfumato.dsp.ddc import DigitalDownConverter
+from sfumato.dsp.decimator import FirDecimator, design_decimation_chain
+from sfumato.dsp.discriminator import DISCRIMINATOR_METHODS, FmDiscriminator
 from sfumato.dsp.emphasis import EmphasisFilter
+from sfumato.dsp.filters import SosFilter, design_iir
+from sfumato.dsp.nco import Nco
 from sfumato.dsp.pll import PilotPLL
+from sfumato.dsp.precision import precision_dtypes
 
 
 class FmReceiver:
@@ -13,26 +21,93 @@ class FmReceiver:
         rf_fs: float = settings.RF_FS,
         mpx_fs: float = settings.MPX_FS,
         audio_fs: float = settings.AUDIO_FS,
+        iq_fs: float = settings.IQ_FS,
+        front_end: str = "ddc",
+        decimation: str = "fir",
+        precision: str = settings.PRECISION,
+        discriminator: str = settings.DISCRIMINATOR,
+        nco_lut_bits: int | None = settings.NCO_LUT_BITS,
     ):
+        """
+        Args:
+            front_end: RF -> MPX の前段の方式
+                - "ddc": ミキシング+LPF+間引き(RF -> IQ_FS)を1パスで行い、IQ_FS で復調する
+                - "mixer": RFレートのままミキシング・復調してから間引く (元の方式)
+            decimation: 間引きの方式
+                - "fir": signal.decimate と同じ1段のFIR (ゼロ位相)
+                - "multistage": CIC -> Half-band -> 補償FIR の多段構成 (因果的)
+            precision: 演算精度 "float64" / "float32"
+                float32 の場合、IQ は complex64、MPX・音声は float32 のまま処理し、
+                復調は位相差を [-π, π) に折り返して求める (アンラップ位相を累積しない)
+            discriminator: FM検波の方式
+                - "unwrap": np.angle -> np.unwrap -> np.diff (元の方式)
+                - "conjugate": 共役積の偏角 angle(x[n]·conj(x[n-1]))
+                - "fast": 共役積の偏角を多項式で近似 (atan2 を使わない)
+                "ddc" / process_iq では、検波は間引いた後のIQ (IQ_FS) で行われる
+            nco_lut_bits: "mixer" の LO とパイロットPLL の NCO の LUT のビット数
+                (None なら正確な値。sfumato.dsp.nco を参照。DDC の LO は常に正確な表)
+        """
+        if front_end not in ("ddc", "mixer"):
+            raise ValueError(f"Unknown front end: {front_end}")
+        if decimation not in ("fir", "multistage"):
+            raise ValueError(f"Unknown decimation: {decimation}")
+        if discriminator != "unwrap" and discriminator not in DISCRIMINATOR_METHODS:
+            raise ValueError(f"Unknown discriminator: {discriminator}")
+
         self.fc = fc
         self.rf_fs = rf_fs
         self.mpx_fs = mpx_fs
         self.audio_fs = audio_fs
-        self.pll = PilotPLL()
+        self.iq_fs = iq_fs
+        self.front_end = front_end
+        self.decimation = decimation
+        self.discriminator = discriminator
+        self.precision = precision
+        self.real_dtype, self.complex_dtype = precision_dtypes(precision)
+        self.nco_lut_bits = nco_lut_bits
+        self.pll = PilotPLL(fs=self.mpx_fs, lut_bits=nco_lut_bits)
+
+        # "mixer" 方式の LO (位相はサンプル番号から決まるので start を渡して使う)
+        self._lo_nco = Nco(self.fc, self.rf_fs, nco_lut_bits)
 
         # decimatoin ratio
         self.dec_factor = int(self.rf_fs / self.mpx_fs)
 
+        # DDC (RF 2.3M -> IQ 384k)
+        self.ddc_factor = int(self.rf_fs // self.iq_fs)
+        self.ddc = DigitalDownConverter(
+            self.fc, self.rf_fs, self.ddc_factor, dtype=self.complex_dtype
+        )
+
         self.emphasis = EmphasisFilter(
-            fs=self.audio_fs, time_constant=settings.TIME_CONSTANT
+            fs=self.audio_fs,
+            time_constant=settings.TIME_CONSTANT,
+            dtype=self.real_dtype,
         )
 
+        # ステレオ分離用フィルタ (15kHz LPF, 23k〜53k BPF)
+        # 5次のBPFは (b, a) 形式だと数値的に不安定なので SOS 形式で持つ
+        self.sos_main = design_iir(5, 15000, self.mpx_fs, btype="low")
+        self.sos_sub = design_iir(5, (23000, 53000), self.mpx_fs, btype="band")
+
+        self.reset_stream()
+
     def process(self, rf_signal: np.ndarray) -> np.ndarray:
         """
         RF信号 -> ベースバンドIQ -> FM復調(MPX) -> 間引き
         Returns:
             np.ndarray: MPX信号 [192 kHz sample rate]
         """
+        rf_signal = np.asarray(rf_signal, dtype=self.real_dtype)
+        if self.front_end == "ddc":
+            # 1. DDC (2.4MHz RF -> 384kHz IQ)
+            baseband_iq = np.concatenate(
+                [self.ddc.process(rf_signal), self.ddc.flush()]
+            )
+
+            # 2〜3. Demodulate & Decimation (384kHz IQ -> 192kHz MPX)
+            return self.process_iq(baseband_iq)
+
         # 1. Mixing (2.4MHz) -> 0Hz中心のIQ信号へ
         baseband_iq = self._mix_to_baseband(rf_signal)
 
@@ -44,74 +119,384 @@ class FmReceiver:
 
         return mpx_signal
 
-    def _mix_to_baseband(self, rf_signal: np.ndarray) -> np.ndarray:
-        t = np.arange(len(rf_signal)) / self.rf_fs
-        lo = np.exp(-1j * 2 * np.pi * self.fc * t)
+    def process_iq(self, iq_signal: np.ndarray) -> np.ndarray:
+        """
+        複素ベースバンド(IQ)信号 -> FM復調(MPX) -> 間引き
+
+        FmTransmitter.modulate_iq の出力を直接受け取る (ミキシング不要)。
+        (N, C) を渡すと、C 本の独立なIQ信号 (複数の局など) をまとめて1回で処理する。
+        Returns:
+            np.ndarray: MPX信号 [192 kHz sample rate]。入力が (N, C) なら (M, C)
+        """
+        # 1. Demodulate (384kHz IQ -> 384kHz MPX)
+        iq_signal = np.asarray(iq_signal, dtype=self.complex_dtype)
+        freq_dev = self._demodulate(iq_signal)
+
+        # RF経路と同じスケール (rad / RFサンプル) に揃える
+        # (MPXの振幅が変わるとPLLのループ利得も変わってしまうため)
+        freq_dev = freq_dev * (self.iq_fs / self.rf_fs)
+
+        # 2. Decimation (384kHz MPX -> 192kHz MPX)
+        return self._decimate(freq_dev, fs_from=self.iq_fs)
+
+    def _mix_to_baseband(self, rf_signal: np.ndarray, start: int = 0) -> np.ndarray:
+        # start: 先頭サンプルの絶対番号 (ブロック処理でLOの位相を連続させる)
+        lo = self._lo_nco.exp(len(rf_signal), start=start, sign=-1).astype(
+            self.complex_dtype, copy=False
+        )
         return rf_signal * lo
 
     def _demodulate(self, iq_signal: np.ndarray) -> np.ndarray:
+        # 時間方向は axis=0 ((N, C) なら列ごとに独立に復調する)
+        if self.discriminator != "unwrap":
+            return FmDiscriminator(self.discriminator).process(iq_signal)
+
         # 1. 角度 (-π ~ +π)
         phase = np.angle(iq_signal)
+        if self.real_dtype != np.float64:
+            # float32 ではアンラップ位相が大きくなると桁落ちするので、位相差を直接折り返す
+            return self._wrap_phase_diff(np.diff(phase, axis=0, prepend=phase[:1]))
         # 2. 連続化 (Unwrap)
-        unwrapped_phase = np.unwrap(phase)
+        unwrapped_phase = np.unwrap(phase, axis=0)
         # 3. 微分 (周波数 = dφ/dt)
-        freq_dev = np.diff(unwrapped_phase, prepend=unwrapped_phase[0])
+        freq_dev = np.diff(unwrapped_phase, axis=0, prepend=unwrapped_phase[:1])
         return freq_dev
 
-    def _decimate(self, signal_data: np.ndarray) -> np.ndarray:
-        down_factor = int(self.rf_fs // self.mpx_fs)
-        return signal.decimate(signal_data, down_factor, ftype="fir")
+    @staticmethod
+    def _wrap_phase_diff(dd: np.ndarray) -> np.ndarray:
+        """位相差を [-π, π) に折り返す (= アンラップしてから差分を取るのと同じ)"""
+        return np.mod(dd + np.pi, 2 * np.pi) - np.pi
+
+    def _decimate(
+        self,
+        signal_data: np.ndarray,
+        fs_from: float | None = None,
+        fs_to: float | None = None,
+        axis: int = 0,
+    ) -> np.ndarray:
+        # 多次元の入力は axis 方向にまとめて1回で間引く
+        fs_from = self.rf_fs if fs_from is None else fs_from
+        fs_to = self.mpx_fs if fs_to is None else fs_to
+        down_factor = int(fs_from // fs_to)
+        if down_factor == 1:
+            return signal_data
+        if self.decimation == "multistage":
+            return self._make_decimator(down_factor, axis=axis).process(signal_data)
+        return signal.decimate(signal_data, down_factor, ftype="fir", axis=axis)
+
+    def _make_decimator(self, q: int, axis: int = 0):
+        """
+        ブロック処理用のデシメータ (process / flush を持つ) を作る
+        """
+        if self.decimation == "multistage":
+            return design_decimation_chain(q, axis=axis)
+        return FirDecimator(q, axis=axis)
+
+    def decimation_cost(self) -> dict[str, list[dict]]:
+        """
+        各デシメーション段の演算量 (出力1サンプルあたりの積和回数) を返す
+        """
+        rf_q = self.dec_factor
+        if self.front_end == "ddc":
+            rf_q = int(self.iq_fs // self.mpx_fs)
+        audio_q = int(self.mpx_fs // self.audio_fs)
+
+        report = {}
+        for key, q in (("rf_to_mpx", rf_q), ("mpx_to_audio", audio_q)):
+            decimator = self._make_decimator(q)
+            if isinstance(decimator, FirDecimator):
+                taps = len(decimator.h) - decimator.n_pre_pad
+                report[key] = [
+                    {
+                        "stage": f"FIR(x{q}, {taps} taps)",
+                        "factor": q,
+                        "macs_per_output": float(taps),
+                        "adds_per_output": float(taps - 1),
+                        "macs_per_chain_output": float(taps),
+                        "adds_per_chain_output": float(taps - 1),
+                    }
+                ]
+            else:
+                report[key] = decimator.cost_report()
+        return report
 
     def _recover_carrier(self, mpx_signal: np.ndarray) -> np.ndarray:
         """
         MPX信号から19kHzパイロットを抽出し、38kHz搬送波を再生する
         """
+        # NCO出力は sin(2φ) なので振幅は既に 1.0
+        # (全体の最大値で割る正規化は、ブロック処理では未来を参照してしまうため行わない)
         carrier_38k, _ = self.pll.process(mpx_signal)
 
-        # 正規化 (振幅を1.0に揃える)
-        if np.max(np.abs(carrier_38k)) > 0:
-            carrier_38k = carrier_38k / np.max(np.abs(carrier_38k))
-
-        return carrier_38k
+        # PLL のループ自体は float64 のスカラーで回し、出力だけ MPX の精度に揃える
+        return carrier_38k.astype(self.real_dtype, copy=False)
 
     def _stereo_decode(self, mpx_signal: np.ndarray, carrier_38k: np.ndarray):
         """
         MPX信号と再生キャリア(38k)を使って、L/Rを分離する
         """
-        nyquist = self.mpx_fs / 2
+        # L/R はチャンネルごとに連続した (2, N) にまとめて、各段を1回ずつ通す
+        stereo = self._stereo_matrix(mpx_signal, carrier_38k)
+
+        # --- 4. ダウンサンプリング (192k -> 48k) ---
+        stereo = self._decimate(
+            stereo, fs_from=self.mpx_fs, fs_to=self.audio_fs, axis=-1
+        )
+
+        # --- 5. De Emphasis ---
+        stereo = self.emphasis.de_emphasis(stereo, axis=-1)
+
+        return np.ascontiguousarray(stereo.T)
+
+    def _stereo_matrix(
+        self,
+        mpx_signal: np.ndarray,
+        carrier_38k: np.ndarray,
+        filters: dict[str, SosFilter] | None = None,
+    ) -> np.ndarray:
+        """
+        MPX信号から L/R (192kHz) を取り出す
 
-        # --- 1. Main (L+R) の抽出 ---
-        # 15kHz LPF
-        cutoff_main = 15000
-        b_main, a_main = signal.butter(N=5, Wn=cutoff_main / nyquist, btype="low")
-        main_signal = signal.lfilter(b_main, a_main, mpx_signal)
+        filters に状態付きフィルタの辞書 (_stereo_filters) を渡すと、その状態の
+        続きとして処理する (ブロック処理用)。None の場合は初期状態ゼロで処理する。
+
+        Returns:
+            np.ndarray: L/R (2, N) [192 kHz]
+        """
+        if filters is None:
+            filters = self._stereo_filters()
 
-        # --- 2. Sub (L-R) の抽出と復調 ---
+        # --- 1. Sub (L-R) の抽出と復調 ---
         # A: 23k〜53k BPF
-        low_edge = 23000
-        high_edge = 53000
-        b_sub, a_sub = signal.butter(
-            N=5, Wn=[low_edge / nyquist, high_edge / nyquist], btype="band"
-        )
-        sub_modulated = signal.lfilter(b_sub, a_sub, mpx_signal)
+        sub_modulated = filters["sub_bpf"].process(mpx_signal)
 
         # B: 復調 (検波) ※振幅補償 2.0倍
         demodulated_raw = sub_modulated * carrier_38k * 2.0
 
-        # C: 不要成分カット (再度15kHz LPFを使用)
-        sub_signal = signal.lfilter(b_main, a_main, demodulated_raw)
+        # --- 2. Main (L+R) の抽出と Sub の不要成分カット ---
+        # どちらも同じ 15kHz LPF なので、(main, sub) の2行にまとめて1回でかける
+        lowpassed = filters["lpf"].process(np.stack([mpx_signal, demodulated_raw]))
+        main_signal, sub_signal = lowpassed
 
         # --- 3. マトリックス回路 (分離) ---
-        left_ch = main_signal + sub_signal
-        right_ch = main_signal - sub_signal
+        stereo = np.empty_like(lowpassed)
+        np.add(main_signal, sub_signal, out=stereo[0])
+        np.subtract(main_signal, sub_signal, out=stereo[1])
 
-        # --- 4. ダウンサンプリング (192k -> 48k) ---
-        q = int(self.mpx_fs // self.audio_fs)  # 4
-        left_out = signal.decimate(left_ch, q, ftype="fir")
-        right_out = signal.decimate(right_ch, q, ftype="fir")
+        return stereo
 
-        # --- 5. De Emphasis ---
-        left_final = self.emphasis.de_emphasis(left_out)
-        right_final = self.emphasis.de_emphasis(right_out)
+    def _stereo_filters(self) -> dict[str, SosFilter]:
+        return {
+            "sub_bpf": SosFilter(self.sos_sub, dtype=self.real_dtype),
+            "lpf": SosFilter(self.sos_main, dtype=self.real_dtype, axis=-1),
+        }
+
+    # ==========================================
+    # ブロック (ストリーミング) 処理
+    # ==========================================
+
+    def reset_stream(self):
+        """
+        ブロック処理の内部状態を初期化する (新しいキャプチャを流す前に呼ぶ)
+        """
+        # 一括処理用の self.pll とは別に、ブロック処理専用のPLLを持つ
+        self._stream_pll = PilotPLL(fs=self.mpx_fs, lut_bits=self.nco_lut_bits)
 
-        return np.stack([left_final, right_final], axis=1)
+        # RF段: DDC, LOの時間基準, 位相アンラップの状態
+        self._stream_ddc = DigitalDownConverter(
+            self.fc, self.rf_fs, self.ddc_factor, dtype=self.complex_dtype
+        )
+        self._n_rf = 0
+        self._last_phase = None  # 直前ブロック最後の角度
+        self._phase_correct = 0.0  # アンラップ補正量の累積
+        self._last_unwrapped = 0.0  # 直前ブロック最後のアンラップ済み位相
+        if self.discriminator != "unwrap":
+            self._discriminator = FmDiscriminator(self.discriminator)
+
+        # IQ -> MPX と RF -> MPX (DDC方式では RF も DDC で IQ にしてから同じ経路を通る)
+        self._iq_decimator = self._make_decimator(int(self.iq_fs // self.mpx_fs))
+        if self.front_end == "ddc":
+            self._rf_decimator = self._iq_decimator
+        else:
+            self._rf_decimator = self._make_decimator(self.dec_factor)
+
+        # ステレオ分離フィルタ (状態付き)
+        self._filters = self._stereo_filters()
+
+        # MPX -> Audio とディエンファシス (L/R (2, N) をまとめて処理する)
+        q = int(self.mpx_fs // self.audio_fs)
+        self._audio_decimator = self._make_decimator(q, axis=-1)
+        self._de_filter = self.emphasis.de_emphasis_filter(axis=-1)
+
+    def process_block(self, rf_block: np.ndarray) -> np.ndarray:
+        """
+        RF信号のブロックを1つ受け取り、その時点で確定したステレオ音声を返す
+
+        LO位相・アンラップ位相・フィルタ状態・PLL・ディエンファシスの状態を
+        ブロック間で引き継ぐため、全ブロックの出力と flush() を連結すると
+        process() -> _recover_carrier() -> _stereo_decode() の一括処理と一致する。
+        デシメータはゼロ位相FIRのため、出力は入力より遅れて出てくる。
+
+        Returns:
+            np.ndarray: ステレオ音声 (M, 2) [48 kHz]。M は 0 のこともある。
+        """
+        return self.mpx_to_audio_block(self.rf_to_mpx_block(rf_block))
+
+    def process_iq_block(self, iq_block: np.ndarray) -> np.ndarray:
+        """
+        複素ベースバンド(IQ)信号 [IQ_FS] のブロック版 (process_iq に対応)
+
+        IQファイル (utils.iq_file) などから読んだIQ信号をブロック単位で受け取り、
+        その時点で確定したステレオ音声を返す。process_block と同じストリームに
+        混ぜて使うことはできない (どちらか一方だけを使う)。
+        """
+        return self.mpx_to_audio_block(self.iq_to_mpx_block(iq_block))
+
+    def flush(self) -> np.ndarray:
+        """
+        デシメータに残っているサンプルを吐き出し、残りのステレオ音声を返す
+        """
+        audio = self.mpx_to_audio_block(self.flush_mpx())
+        tail = self.flush_audio()
+
+        self.reset_stream()
+        return np.concatenate([audio, tail])
+
+    # process_block / process_iq_block / flush を MPX の前後で2つに分けたもの。
+    # 前半 (RF/IQ -> MPX) と後半 (MPX -> Audio) は別の状態を使うので、
+    # 別々のスレッドで並行に動かせる (sfumato.streaming)。
+
+    def rf_to_mpx_block(self, rf_block: np.ndarray) -> np.ndarray:
+        """
+        RFブロック -> ベースバンド -> FM検波 -> 間引き -> MPX [192 kHz]
+        """
+        rf_block = np.asarray(rf_block, dtype=self.real_dtype)
+        if self.front_end == "ddc":
+            baseband_iq = self._stream_ddc.process(rf_block)
+        else:
+            baseband_iq = self._mix_to_baseband(rf_block, start=self._n_rf)
+        self._n_rf += len(rf_block)
+
+        freq_dev = self._demodulate_stream(baseband_iq)
+        return self._rf_decimator.process(freq_dev)
+
+    def iq_to_mpx_block(self, iq_block: np.ndarray) -> np.ndarray:
+        """
+        IQブロック [IQ_FS] -> FM検波 -> 間引き -> MPX [192 kHz]
+        """
+        iq_block = np.asarray(iq_block, dtype=self.complex_dtype)
+        freq_dev = self._demodulate_block(iq_block) * (self.iq_fs / self.rf_fs)
+        return self._iq_decimator.process(freq_dev)
+
+    def flush_mpx(self) -> np.ndarray:
+        """
+        RF/IQ -> MPX のデシメータに残っているサンプルを吐き出し、残りのMPXを返す
+        """
+        mpx_tail = np.zeros(0, dtype=self.real_dtype)
+        if self.front_end == "ddc":
+            # DDCの残り -> 復調 -> デシメータ の順に吐き出す
+            freq_dev = self._demodulate_stream(self._stream_ddc.flush())
+            mpx_tail = self._rf_decimator.process(freq_dev)
+        else:
+            # IQ入力 (process_iq_block) 側のデシメータの残り
+            mpx_tail = self._iq_decimator.flush()
+        mpx_tail = np.concatenate([mpx_tail, self._rf_decimator.flush()])
+        return mpx_tail.astype(self.real_dtype, copy=False)
+
+    def mpx_to_audio_block(self, mpx_block: np.ndarray) -> np.ndarray:
+        """
+        MPXブロック -> PLL -> ステレオ分離 -> 間引き -> ディエンファシス
+
+        Returns:
+            np.ndarray: ステレオ音声 (M, 2) [48 kHz]
+        """
+        carrier_38k, _ = self._stream_pll.process(mpx_block)
+        carrier_38k = carrier_38k.astype(self.real_dtype, copy=False)
+        stereo = self._stereo_matrix(mpx_block, carrier_38k, filters=self._filters)
+
+        audio = self._audio_decimator.process(stereo)
+        return np.ascontiguousarray(self._de_filter.process(audio).T)
+
+    def flush_audio(self) -> np.ndarray:
+        """
+        MPX -> Audio のデシメータに残っているサンプルを吐き出し、残りの音声を返す
+        """
+        # 多段デシメータの flush は (0,) を返すので (2, 0) に揃える
+        tail = self._audio_decimator.flush().astype(self.real_dtype, copy=False)
+        return self._de_filter.process(tail.reshape(2, -1)).T
+
+    def stream(self, rf_blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        RF信号ブロックの列を受け取り、ステレオ音声ブロックを順に返すジェネレータ
+        """
+        self.reset_stream()
+        for rf_block in rf_blocks:
+            audio = self.process_block(rf_block)
+            if len(audio) > 0:
+                yield audio
+
+        audio = self.flush()
+        if len(audio) > 0:
+            yield audio
+
+    def stream_iq(self, iq_blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        複素IQ信号ブロックの列を受け取り、ステレオ音声ブロックを順に返すジェネレータ
+        """
+        self.reset_stream()
+        for iq_block in iq_blocks:
+            audio = self.process_iq_block(iq_block)
+            if len(audio) > 0:
+                yield audio
+
+        audio = self.flush()
+        if len(audio) > 0:
+            yield audio
+
+    def _demodulate_stream(self, iq_block: np.ndarray) -> np.ndarray:
+        freq_dev = self._demodulate_block(iq_block)
+        if self.front_end == "ddc":
+            # process_iq と同じく RF経路のスケールに揃える
+            freq_dev = freq_dev * (self.iq_fs / self.rf_fs)
+        return freq_dev
+
+    def _demodulate_block(self, iq_block: np.ndarray) -> np.ndarray:
+        """
+        _demodulate のブロック版 (np.unwrap と同じ計算を状態付きで行う)
+        """
+        if self.discriminator != "unwrap":
+            return self._discriminator.process(iq_block)
+
+        phase = np.angle(iq_block)
+        if len(phase) == 0:
+            return np.zeros(0, dtype=self.real_dtype)
+
+        if self._last_phase is None:
+            # 最初のブロック: prepend=先頭 と同じ扱い
+            self._last_phase = phase[0]
+            self._last_unwrapped = phase[0]
+
+        if self.real_dtype != np.float64:
+            # _demodulate と同じく、位相差を直接折り返す
+            freq_dev = self._wrap_phase_diff(np.diff(phase, prepend=self._last_phase))
+            self._last_phase = phase[-1]
+            return freq_dev
+
+        # np.unwrap と同じ補正量の計算
+        dd = np.diff(phase, prepend=self._last_phase)
+        ddmod = np.mod(dd + np.pi, 2 * np.pi) - np.pi
+        np.copyto(ddmod, np.pi, where=(ddmod == -np.pi) & (dd > 0))
+        ph_correct = ddmod - dd
+        np.copyto(ph_correct, 0, where=np.abs(dd) < np.pi)
+
+        # 累積補正量を引き継いで連続化
+        correct = np.cumsum(np.concatenate([[self._phase_correct], ph_correct]))[1:]
+        unwrapped_phase = phase + correct
+
+        freq_dev = np.diff(unwrapped_phase, prepend=self._last_unwrapped)
+
+        self._last_phase = phase[-1]
+        self._phase_correct = correct[-1]
+        self._last_unwrapped = unwrapped_phase[-1]
+
+        return freq_dev
@@ -20,6 +20,14 @@ SUB_FREQ = 38_000  # 38 kHz (19k * 2)
 # --- RF帯域 (Radio Frequency) ---
 RF_FS = 2_304_000  # 2.3MHz = MPX(192k) * 12
 
+# 複素ベースバンド (IQ) シミュレーション用のレート
+# 搬送波を作らずに exp(j*phi) を直接扱う。カーソン帯域 2*(75k+53k)=256kHz を収める
+IQ_FS = 384_000  # 384 kHz = MPX(192k) * 2
+
+# 複数局シミュレーション (band.py) のチャンネル数
+# チャンネル間隔 = IQ_FS (384kHz) なので、帯域全体は 8 * 384k = 3.072 MHz
+BAND_CHANNELS = 8
+
 
 # --- FM放送規格 (FM Standards) ---
 
@@ -59,5 +67,21 @@ RF_NYQUIST = RF_FS / 2
 # デフォルトのSN比 (シミュレーション用)
 DEFAULT_SNR_DB = 40.0
 
+# Trueなら搬送波(RF)を省略して、複素ベースバンド(IQ)で送受信をシミュレーションする
+BASEBAND_SIMULATION = False
+
+# FM検波の方式: "unwrap" (既定) / "conjugate" (共役積) / "fast" (atan2 を使わない近似)
+DISCRIMINATOR = "unwrap"
+
+# 演算精度: "float64" (既定) / "float32"
+# float32 にすると RFレートの配列が float32 / complex64 になり、メモリ転送量がほぼ半分になる
+PRECISION = "float64"
+
+# 発振器 (NCO: パイロット/サブキャリア/搬送波/ミキサの LO/PLL) の方式
+# None (既定): f/fs の有理数の周期で正確な値の表を引く
+# 整数: FPGA と同じく 32bit 位相アキュムレータ + 2^NCO_LUT_BITS 点の正弦波 LUT
+# (位相の量子化によるスプリアスを含めて再現する。例: 10)
+NCO_LUT_BITS = None
+
 # シミュレーション入力音源
 INPUT_FILE = "first_ancem92.wav"
@@ -0,0 +1,418 @@
+# 段ごとにスレッドを分けたブロック処理のパイプライン
+#
+# 各段 (StreamStage) は自分のスレッドで動き、段と段の間は固定数のスロットを持つ
+# リングバッファ (BlockRing) でつなぐ。リングが一杯なら前の段は空くまで待つ
+# (バックプレッシャー) ので、遅い段があってもメモリは depth ブロック分しか増えない。
+# numpy / scipy の重い処理は GIL を離すので、段どうしが複数のコアで重なって動く。
+#
+#   pipeline = fm_stream_pipeline(snr_db=30, seed=0)
+#   audio = np.concatenate(list(pipeline.run(np.array_split(audio_data, 50))))
+#   print(pipeline.report())   # 段ごとの処理時間・待ち時間とキューの深さ
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+import numpy as np
+
+from sfumato import settings
+from sfumato.channnel import AwgnChannel
+from sfumato.receiver import FmReceiver
+from sfumato.transmitter import FmTransmitter
+
+DEFAULT_DEPTH = 4  # 段と段の間に置けるブロックの数
+
+
+class PipelineAborted(Exception):
+    """他の段でエラーが起きて、パイプラインが止められた"""
+
+
+class BlockRing:
+    """
+    スレッド間でブロックを受け渡す、容量 depth のリングバッファ
+
+    スロット (配列) は使い回す。put() はブロックを空いているスロットにコピーし、
+    get() はスロットのビューを返す。受け取った側は使い終わったら release() で
+    スロットを返す (それまでは同じスロットに書き込まれない)。
+    スロットの大きさは最初のブロックで決まり、それより長いブロックが来たときだけ
+    確保し直す。
+    """
+
+    def __init__(self, depth: int = DEFAULT_DEPTH, name: str = ""):
+        """
+        Args:
+            depth: スロットの数 (1 以上)
+            name: 統計に付ける名前
+        """
+        if depth < 1:
+            raise ValueError(f"depth must be >= 1: {depth}")
+        self.depth = depth
+        self.name = name
+
+        self._slots = [None] * depth
+        self._lengths = [0] * depth
+        self._head = 0  # 次に書き込むスロット
+        self._tail = 0  # 次に読み出すスロット
+        self._count = 0  # 書き込み済みで、まだ release されていないスロットの数
+        self._closed = False
+        self._aborted = False
+        self._cond = threading.Condition()
+
+        # 統計
+        self.blocks = 0
+        self.samples = 0
+        self.allocations = 0
+        self.max_fill = 0
+        self._fill_sum = 0
+        self.put_wait_s = 0.0  # 満杯で待った時間 (バックプレッシャー)
+        self.get_wait_s = 0.0  # 空で待った時間
+
+    def put(self, block: np.ndarray):
+        """
+        ブロックをコピーして追加する (満杯なら空くまで待つ)
+        """
+        block = np.asarray(block)
+        with self._cond:
+            start = time.perf_counter()
+            while self._count == self.depth and not self._aborted:
+                self._cond.wait()
+            self.put_wait_s += time.perf_counter() - start
+            if self._aborted:
+                raise PipelineAborted(self.name)
+
+            slot = self._slots[self._head]
+
+        # コピーはロックの外で行う (このスロットはまだ読み出されない)
+        if (
+            slot is None
+            or len(slot) < len(block)
+            or slot.shape[1:] != block.shape[1:]
+            or slot.dtype != block.dtype
+        ):
+            slot = np.empty_like(block)
+            self._slots[self._head] = slot
+            self.allocations += 1
+        slot[: len(block)] = block
+
+        with self._cond:
+            self._lengths[self._head] = len(block)
+            self._head = (self._head + 1) % self.depth
+            self._count += 1
+            self.blocks += 1
+            self.samples += len(block)
+            self.max_fill = max(self.max_fill, self._count)
+            self._fill_sum += self._count
+            self._cond.notify_all()
+
+    def get(self) -> np.ndarray | None:
+        """
+        一番古いブロックのビューを返す (空なら待つ)。終端 (close 済み) なら None
+
+        返したビューは release() を呼ぶまで有効
+        """
+        with self._cond:
+            start = time.perf_counter()
+            while self._count == 0 and not self._closed and not self._aborted:
+                self._cond.wait()
+            self.get_wait_s += time.perf_counter() - start
+            if self._aborted:
+                raise PipelineAborted(self.name)
+            if self._count == 0:
+                return None
+            return self._slots[self._tail][: self._lengths[self._tail]]
+
+    def release(self):
+        """get() で受け取ったスロットを返す"""
+        with self._cond:
+            self._tail = (self._tail + 1) % self.depth
+            self._count -= 1
+            self._cond.notify_all()
+
+    def close(self):
+        """これ以上ブロックが来ないことを知らせる (残りのブロックは読み出せる)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abort(self):
+        """待っている put / get をすべて PipelineAborted で抜けさせる"""
+        with self._cond:
+            self._aborted = True
+            self._cond.notify_all()
+
+    def fill(self) -> int:
+        """いま入っているブロックの数"""
+        with self._cond:
+            return self._count
+
+    def stats(self) -> dict:
+        return {
+            "queue": self.name,
+            "depth": self.depth,
+            "blocks": self.blocks,
+            "samples": self.samples,
+            "max_fill": self.max_fill,
+            "mean_fill": self._fill_sum / max(self.blocks, 1),
+            "allocations": self.allocations,
+            "put_wait_s": self.put_wait_s,
+            "get_wait_s": self.get_wait_s,
+        }
+
+
+class StreamStage:
+    """
+    パイプラインの1段 (process をブロックごとに呼び、最後に flush を1回呼ぶ)
+
+    process は受け取ったブロック (リングのスロットのビュー) を書き換えてもよいが、
+    呼び出しの後まで参照を持ち続けてはいけない (スロットは使い回される)。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[np.ndarray], np.ndarray],
+        flush: Callable[[], np.ndarray] | None = None,
+        reset: Callable[[], None] | None = None,
+    ):
+        """
+        Args:
+            name: 段の名前 (統計に使う)
+            process: ブロック -> 出力ブロック (長さ 0 でもよい)
+            flush: 入力の終端で残りの出力を返す関数 (None なら何も出さない)
+            reset: run() の開始時に (スレッドを起動する前に) 呼ぶ関数
+        """
+        self.name = name
+        self.process = process
+        self.flush = flush
+        self.reset = reset
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.blocks = 0
+        self.busy_s = 0.0  # process / flush にかかった時間
+        self.cpu_s = 0.0  # そのうちこのスレッドが使ったCPU時間
+
+    def stats(self) -> dict:
+        return {
+            "stage": self.name,
+            "blocks": self.blocks,
+            "busy_s": self.busy_s,
+            "cpu_s": self.cpu_s,
+        }
+
+
+class StreamPipeline:
+    """
+    StreamStage を1段1スレッドで並行に動かすパイプライン
+
+    入力ブロックの列は別のスレッドで読み出し (読み出し自体が重い処理、例えば
+    ファイルの読み込みでもよい)、最後の段の出力を run() が順に返す。
+    段の間の各リングには depth 個までブロックが溜まる。
+    """
+
+    def __init__(self, stages: list[StreamStage], depth: int = DEFAULT_DEPTH):
+        """
+        Args:
+            stages: 段のリスト (前から順に処理する)
+            depth: 段と段の間に置けるブロックの数
+        """
+        if not stages:
+            raise ValueError("stages must not be empty")
+        self.stages = list(stages)
+        self.depth = depth
+        self.rings = []
+        self.wall_time_s = 0.0
+        self._errors = []
+
+    def run(self, blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        入力ブロックの列を流し、最後の段の出力ブロックを順に返すジェネレータ
+
+        返すブロックはコピーなので、そのまま持っていてよい。
+        途中でどれかの段が例外を出したら、全段を止めてその例外を送出する。
+        """
+        names = ["source", *(stage.name for stage in self.stages)]
+        self.rings = [
+            BlockRing(self.depth, f"{a} -> {b}")
+            for a, b in zip(names, [*names[1:], "sink"])
+        ]
+        self._errors = []
+        for stage in self.stages:
+            stage.reset_stats()
+            if stage.reset is not None:
+                stage.reset()
+
+        threads = [
+            threading.Thread(
+                target=self._feed, args=(blocks, self.rings[0]), name="source"
+            )
+        ]
+        for stage, src, dst in zip(self.stages, self.rings[:-1], self.rings[1:]):
+            threads.append(
+                threading.Thread(
+                    target=self._work, args=(stage, src, dst), name=stage.name
+                )
+            )
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        sink = self.rings[-1]
+        finished = False
+        try:
+            while True:
+                try:
+                    block = sink.get()
+                except PipelineAborted:
+                    break
+                if block is None:
+                    finished = True
+                    break
+                out = block.copy()
+                sink.release()
+                yield out
+        finally:
+            # 途中で止められた (ジェネレータが閉じられた) ときも全スレッドを止める
+            if not finished:
+                self._abort()
+            for thread in threads:
+                thread.join()
+            self.wall_time_s = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+
+    def _feed(self, blocks: Iterable[np.ndarray], dst: BlockRing):
+        try:
+            for block in blocks:
+                if len(block) > 0:
+                    dst.put(block)
+            dst.close()
+        except PipelineAborted:
+            pass
+        except Exception as e:  # noqa: BLE001 (run() で送出し直す)
+            self._fail(e)
+
+    def _work(self, stage: StreamStage, src: BlockRing, dst: BlockRing):
+        try:
+            while True:
+                block = src.get()
+                if block is None:
+                    break
+                out = self._call(stage, stage.process, block)
+                if len(out) > 0:
+                    dst.put(out)
+                src.release()
+
+            if stage.flush is not None:
+                out = self._call(stage, stage.flush)
+                if len(out) > 0:
+                    dst.put(out)
+            dst.close()
+        except PipelineAborted:
+            pass
+        except Exception as e:  # noqa: BLE001 (run() で送出し直す)
+            self._fail(e)
+
+    @staticmethod
+    def _call(stage: StreamStage, func: Callable, *args) -> np.ndarray:
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        out = np.asarray(func(*args))
+        stage.busy_s += time.perf_counter() - wall
+        stage.cpu_s += time.thread_time() - cpu
+        stage.blocks += 1
+        return out
+
+    def _fail(self, error: Exception):
+        self._errors.append(error)
+        self._abort()
+
+    def _abort(self):
+        for ring in self.rings:
+            ring.abort()
+
+    def report(self) -> dict:
+        """
+        直前の run() の段ごと・キューごとの統計を JSON にできる dict で返す
+
+        stages:
+            busy_s: 段の処理時間 / cpu_s: そのCPU時間
+            in_wait_s: 入力が来るのを待った時間 (前の段が遅い)
+            out_wait_s: 出力先が空くのを待った時間 (後ろの段が遅い = バックプレッシャー)
+        queues:
+            max_fill / mean_fill: 溜まったブロック数の最大 / 平均 (put した時点)
+        """
+        stages = []
+        for stage, src, dst in zip(self.stages, self.rings[:-1], self.rings[1:]):
+            stages.append(
+                {
+                    **stage.stats(),
+                    "in_wait_s": src.get_wait_s,
+                    "out_wait_s": dst.put_wait_s,
+                    "utilization": stage.busy_s / max(self.wall_time_s, 1e-12),
+                }
+            )
+        return {
+            "meta": {"depth": self.depth, "threads": len(self.stages) + 1},
+            "stages": stages,
+            "queues": [ring.stats() for ring in self.rings],
+            "total": {"wall_time_s": self.wall_time_s},
+        }
+
+    def save_report(self, path: str) -> str:
+        """report() を JSON ファイルに保存する"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+def fm_stream_pipeline(
+    snr_db: float = settings.DEFAULT_SNR_DB,
+    seed: int | None = None,
+    signal_power: float | None = None,
+    depth: int = DEFAULT_DEPTH,
+    transmitter_kwargs: dict | None = None,
+    receiver_kwargs: dict | None = None,
+) -> StreamPipeline:
+    """
+    音声ブロック -> 送信 -> AWGN -> 受信 -> ステレオ音声ブロック のパイプラインを作る
+
+    段は tx.mpx (Audio -> MPX), tx.rf (MPX -> RF), channel.awgn,
+    rx.mpx (RF -> MPX), rx.audio (MPX -> Audio) の5つ。
+    送受信の結果は modulate_blocks / stream と同じになる (雑音は AwgnChannel.process
+    と同じく、signal_power が None ならそれまでの平均電力の逐次推定を使う)。
+
+    Args:
+        snr_db: 通信路の SN比 (dB)
+        seed: 雑音の乱数シード
+        signal_power: 雑音の基準にする信号電力 (None なら逐次推定)
+        depth: 段と段の間に置けるブロックの数
+        transmitter_kwargs: FmTransmitter に渡す引数
+        receiver_kwargs: FmReceiver に渡す引数
+    """
+    tx = FmTransmitter(**(transmitter_kwargs or {}))
+    rx = FmReceiver(**(receiver_kwargs or {}))
+    channel = AwgnChannel(
+        snr_db, seed=seed, signal_power=signal_power, iq_fs=tx.iq_fs, rf_fs=tx.rf_fs
+    )
+
+    def add_noise(block):
+        # スロットは受け取った段のものなので、そのまま書き換える
+        return channel.process(block, out=block)
+
+    return StreamPipeline(
+        [
+            # 送受信機の状態は前半の段でまとめて初期化する
+            StreamStage("tx.mpx", tx.audio_to_mpx_block, tx.flush_mpx, tx.reset_stream),
+            StreamStage("tx.rf", tx.mpx_to_rf_block, tx.flush_rf),
+            StreamStage("channel.awgn", add_noise, reset=channel.reset),
+            StreamStage("rx.mpx", rx.rf_to_mpx_block, rx.flush_mpx, rx.reset_stream),
+            StreamStage("rx.audio", rx.mpx_to_audio_block, rx.flush_audio),
+        ],
+        depth=depth,
+    )
@@ -0,0 +1,200 @@
+# SN比スイープ (並列実行)
+#
+# 変調は1回だけ行い、RF (または IQ) 信号を一時ファイルの memmap (.npy) に置いて
+# プロセスプールの各ワーカーから共有する (コピーしない)。各ワーカーは
+# (SNR, seed) の点ごとに AWGN の付加と受信処理を行い、指標 (dict) だけを返す。
+import os
+import tempfile
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sfumato import settings
+from sfumato.channnel import AwgnChannel, signal_power
+from sfumato.metrics import quality_metrics
+from sfumato.receiver import FmReceiver
+from sfumato.transmitter import FmTransmitter
+
+# ワーカープロセス内で共有する状態 (_init_worker で設定)
+_worker = {}
+
+
+def _init_worker(
+    signal_path: str,
+    reference: np.ndarray,
+    receiver_kwargs: dict,
+    tone_freqs: tuple | None = None,
+    channel_kwargs: dict | None = None,
+):
+    # memmap を ndarray として見る (ファイルのページを共有し、コピーしない)
+    _worker["signal"] = np.asarray(np.load(signal_path, mmap_mode="r"))
+    # 信号の電力は全点で同じなので、ワーカーごとに1回だけ求める
+    _worker["power"] = signal_power(_worker["signal"])
+    _worker["reference"] = reference
+    _worker["receiver_kwargs"] = receiver_kwargs
+    _worker["tone_freqs"] = tone_freqs
+    # 雑音の基準にするサンプリング周波数 (AwgnChannel の iq_fs / rf_fs)
+    _worker["channel_kwargs"] = channel_kwargs or {}
+
+
+def _receive(signal_data: np.ndarray, receiver_kwargs: dict) -> np.ndarray:
+    """main.py と同じ受信処理 (RFなら process、IQなら process_iq)"""
+    # PLL の状態を点ごとに持ち越さないよう、受信機は毎回作る
+    rx = FmReceiver(**receiver_kwargs)
+    if np.iscomplexobj(signal_data):
+        mpx_signal = rx.process_iq(signal_data)
+    else:
+        mpx_signal = rx.process(signal_data)
+    carrier_38k = rx._recover_carrier(mpx_signal)
+    return rx._stereo_decode(mpx_signal, carrier_38k)
+
+
+def _run_point(point: tuple[float, int, int]) -> dict:
+    snr_db, seed, skip = point
+    start = time.perf_counter()
+
+    channel = AwgnChannel(
+        snr_db, seed=seed, signal_power=_worker["power"], **_worker["channel_kwargs"]
+    )
+    noisy = channel.apply(_worker["signal"])
+    audio = _receive(noisy, _worker["receiver_kwargs"])
+
+    metrics = {"snr_db": snr_db, "seed": seed}
+    metrics.update(audio_metrics(audio, _worker["reference"], skip))
+    if _worker["tone_freqs"] is not None:
+        metrics.update(tone_metrics(audio, _worker["tone_freqs"], skip))
+    metrics["elapsed_s"] = time.perf_counter() - start
+    return metrics
+
+
+def audio_metrics(audio: np.ndarray, reference: np.ndarray, skip: int = 0) -> dict:
+    """
+    ノイズ無しで受信した音声 (reference) に対する、受信音声の SN比
+
+    Args:
+        audio: 受信音声 (N, 2)
+        reference: ノイズ無しの受信音声 (N, 2)
+        skip: 先頭から除外するサンプル数 (PLL の引き込みなど)
+
+    Returns:
+        dict: audio_snr_db (L/R合計), audio_snr_db_left, audio_snr_db_right
+    """
+    n = min(len(audio), len(reference))
+    signal_part = np.asarray(reference[skip:n], dtype=float)
+    error = np.asarray(audio[skip:n], dtype=float) - signal_part
+
+    def snr(sig, err):
+        err_power = np.sum(err**2)
+        if err_power == 0:
+            return float("inf")
+        return float(10 * np.log10(np.sum(sig**2) / err_power))
+
+    return {
+        "audio_snr_db": snr(signal_part, error),
+        "audio_snr_db_left": snr(signal_part[:, 0], error[:, 0]),
+        "audio_snr_db_right": snr(signal_part[:, 1], error[:, 1]),
+    }
+
+
+def tone_metrics(audio: np.ndarray, tone_freqs: tuple, skip: int = 0) -> dict:
+    """
+    テストトーン (L, R で周波数が違う) を受信した音声の指標 (sfumato.metrics)
+
+    Returns:
+        dict: thd_n_db_*, separation_db_*, pilot_residual_db_* (* は left, right)
+    """
+    result = quality_metrics(audio, tone_freqs=tone_freqs, skip=skip)
+    metrics = {}
+    for key in ("thd_n_db", "separation_db", "pilot_residual_db"):
+        metrics[f"{key}_left"] = float(result[key][0])
+        metrics[f"{key}_right"] = float(result[key][1])
+    return metrics
+
+
+def run_snr_sweep(
+    audio_data: np.ndarray,
+    snr_dbs: Iterable[float],
+    seeds: Iterable[int] = (0,),
+    baseband: bool = settings.BASEBAND_SIMULATION,
+    max_workers: int | None = None,
+    skip_seconds: float = 0.25,
+    receiver_kwargs: dict | None = None,
+    transmitter_kwargs: dict | None = None,
+    tone_freqs: tuple | None = None,
+) -> list[dict]:
+    """
+    (SNR, seed) の全組み合わせについて、AWGN付加 -> 受信 を並列に実行する
+
+    変調は1回だけ行い、信号はプロセス間で memmap として共有する。
+    同じ (SNR, seed) なら、何回実行しても (ワーカー数によらず) 同じ結果になる。
+
+    Args:
+        audio_data: 送信する音声 (N,) または (N, 2) [48kHz]
+        snr_dbs: SN比 (dB) のリスト
+        seeds: 雑音の乱数シードのリスト
+        baseband: True なら複素ベースバンド (modulate_iq / process_iq) で行う
+        max_workers: プロセス数 (None なら CPU数)
+        skip_seconds: 指標の計算から除外する先頭の長さ (秒)
+        receiver_kwargs: FmReceiver に渡す引数
+        transmitter_kwargs: FmTransmitter に渡す引数
+        tone_freqs: audio_data が L, R で周波数の違うテストトーンなら、その周波数。
+            指定すると tone_metrics (THD+N, 分離度, パイロット残留) も求める
+
+    Returns:
+        list[dict]: 点ごとの指標 (snr_db, seed, audio_snr_db, ..., elapsed_s)。
+            (snr_dbs, seeds) の順に並ぶ
+    """
+    receiver_kwargs = receiver_kwargs or {}
+    tx = FmTransmitter(**(transmitter_kwargs or {}))
+    signal_data = tx.modulate_iq(audio_data) if baseband else tx.modulate(audio_data)
+
+    # 基準: ノイズ無しで受信した音声
+    reference = _receive(signal_data, receiver_kwargs)
+    skip = int(skip_seconds * settings.AUDIO_FS)
+
+    points = [(float(snr), int(seed), skip) for snr in snr_dbs for seed in seeds]
+
+    with tempfile.TemporaryDirectory(prefix="sfumato-sweep-") as tmp:
+        signal_path = os.path.join(tmp, "signal.npy")
+        np.save(signal_path, signal_data)
+        del signal_data
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(
+                signal_path,
+                reference,
+                receiver_kwargs,
+                tone_freqs,
+                {"iq_fs": tx.iq_fs, "rf_fs": tx.rf_fs},
+            ),
+        ) as pool:
+            return list(pool.map(_run_point, points))
+
+
+if __name__ == "__main__":
+    from sfumato.utils.audio_source import AudioSource
+
+    source = AudioSource()
+    audio = source.stereo_sine_tone(440, 1000, 1.0)
+
+    start = time.perf_counter()
+    results = run_snr_sweep(
+        audio, snr_dbs=range(0, 45, 5), seeds=range(4), tone_freqs=(440, 1000)
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{'SNR[dB]':>8} {'seed':>5} {'audio SNR[dB]':>14} "
+        f"{'THD+N L[dB]':>12} {'sep L[dB]':>10} {'time[s]':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['snr_db']:8.1f} {r['seed']:5d} {r['audio_snr_db']:14.2f} "
+            f"{r['thd_n_db_left']:12.2f} {r['separation_db_left']:10.2f} "
+            f"{r['elapsed_s']:8.2f}"
+        )
+    print(f"{len(results)} points in {elapsed:.1f} s")
@@ -1,8 +1,14 @@
 # generated by Gemini 3 Pro
+from collections.abc import Callable, Iterator
+
 import numpy as np
 import soundfile as sf
 from scipy import signal
 
+# ピンクノイズ (1/f) を白色雑音から作る IIR フィルタ (Paul Kellet の近似)
+_PINK_B = np.array([0.049922035, -0.095993537, 0.050612699, -0.004408786])
+_PINK_A = np.array([1.0, -2.494956002, 2.017265875, -0.522189400])
+
 
 class AudioSource:
     """
@@ -119,3 +125,330 @@ class AudioSource:
 
         # ステレオ結合 (N, 2)
         return np.stack([l_melody, r_melody], axis=1).astype(np.float32)
+
+    # ------------------------------------------------------------------
+    # ブロック単位の生成 (長時間の負荷試験用)
+    #
+    # どれも block_size サンプルずつの float32 の配列を返すイテレータで、
+    # duration=None なら止まらない。各サンプルは先頭からのサンプル番号だけで
+    # 決まる (ノイズは乱数とフィルタの状態を持ち越す) ので、ブロックの境界で
+    # 位相が飛ばず、長さによらずメモリは一定。
+    # トーンと時報は、つなげると上の一括生成版と同じ値になる
+    # (time_tone だけは時間軸の作り方の違いで、丸め誤差程度ずれる)。
+    # ------------------------------------------------------------------
+
+    def _blocks(
+        self,
+        render: Callable[[np.ndarray], np.ndarray],
+        duration: float | None,
+        block_size: int,
+    ) -> Iterator[np.ndarray]:
+        """サンプル番号の配列 -> 信号 の render を、ブロックごとに呼ぶイテレータを返す"""
+        # ジェネレータの中で調べると最初の next() まで例外が出ないので、ここで調べる
+        if block_size <= 0:
+            raise ValueError(f"block_size must be positive: {block_size}")
+        total = None if duration is None else int(self.fs * duration)
+        return self._iter_blocks(render, total, block_size)
+
+    def _iter_blocks(
+        self,
+        render: Callable[[np.ndarray], np.ndarray],
+        total: int | None,
+        block_size: int,
+    ) -> Iterator[np.ndarray]:
+        start = 0
+        while total is None or start < total:
+            n = block_size if total is None else min(block_size, total - start)
+            yield render(np.arange(start, start + n)).astype(np.float32)
+            start += n
+
+    def _channels(self, wave: np.ndarray, channels: int) -> np.ndarray:
+        # channels=2 なら同じ信号を L, R に入れる
+        if channels == 1:
+            return wave
+        return np.repeat(wave[:, np.newaxis], channels, axis=1)
+
+    def sine_tone_blocks(
+        self,
+        frequency: float,
+        duration: float | None = None,
+        amplitude: float = 0.8,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        [モノラル] sine_tone のブロック版です。
+
+        Args:
+            frequency: 周波数 (Hz)
+            duration: 長さ (秒)。None なら止まりません
+            amplitude: 振幅 (0.0 ~ 1.0)
+            block_size: 1ブロックのサンプル数 (最後のブロックだけ短くなります)
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size,)
+        """
+        return self._blocks(
+            lambda idx: amplitude * np.sin(2 * np.pi * frequency * (idx / self.fs)),
+            duration,
+            block_size,
+        )
+
+    def stereo_sine_tone_blocks(
+        self,
+        freq_l: float,
+        freq_r: float,
+        duration: float | None = None,
+        amplitude: float = 0.5,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        [ステレオ] stereo_sine_tone のブロック版です。
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size, 2)
+        """
+
+        def render(idx):
+            t = idx / self.fs
+            return np.stack(
+                [
+                    amplitude * np.sin(2 * np.pi * freq_l * t),
+                    amplitude * np.sin(2 * np.pi * freq_r * t),
+                ],
+                axis=1,
+            )
+
+        return self._blocks(render, duration, block_size)
+
+    def _time_signal(
+        self, idx: np.ndarray, freq_short: float, freq_long: float
+    ) -> np.ndarray:
+        # 時報 (ピッ x3 + ポーン, 5秒) を繰り返したときの、サンプル番号 idx の値
+        fs = self.fs
+        n_short = int(0.1 * fs)
+        n_unit = n_short + int(0.9 * fs)
+        n_long = int(2.0 * fs)
+        pos = idx % (3 * n_unit + n_long)
+
+        in_unit = pos % n_unit
+        short = (pos < 3 * n_unit) & (in_unit < n_short)
+        long = pos >= 3 * n_unit
+        wave = np.zeros(len(idx))
+        wave[short] = 0.5 * np.sin(2 * np.pi * freq_short * (in_unit[short] / fs))
+        wave[long] = 0.5 * np.sin(
+            2 * np.pi * freq_long * ((pos[long] - 3 * n_unit) / fs)
+        )
+        return wave
+
+    def time_tone_blocks(
+        self, duration: float | None = None, block_size: int = 4800
+    ) -> Iterator[np.ndarray]:
+        """
+        [モノラル] time_tone (5秒) を繰り返すブロック版です。
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size,)
+        """
+        return self._blocks(
+            lambda idx: self._time_signal(idx, 440.0, 880.0), duration, block_size
+        )
+
+    def stereo_time_tone_blocks(
+        self,
+        duration: float | None = None,
+        freq_l_short: float = 440.0,
+        freq_l_long: float = 880.0,
+        freq_r_short: float = 660.0,
+        freq_r_long: float = 1320.0,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        [ステレオ] stereo_time_tone (5秒) を繰り返すブロック版です。
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size, 2)
+        """
+        return self._blocks(
+            lambda idx: np.stack(
+                [
+                    self._time_signal(idx, freq_l_short, freq_l_long),
+                    self._time_signal(idx, freq_r_short, freq_r_long),
+                ],
+                axis=1,
+            ),
+            duration,
+            block_size,
+        )
+
+    def multitone_blocks(
+        self,
+        freqs,
+        duration: float | None = None,
+        amplitude: float = 0.8,
+        channels: int = 1,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        複数の正弦波を足した信号 (マルチトーン) を生成します。
+
+        ピークが下がるよう Schroeder 位相で足し、各トーンの振幅は
+        amplitude / len(freqs) です (合計のピークは amplitude 以下)。
+
+        Args:
+            freqs: 周波数 (Hz) のリスト
+            duration: 長さ (秒)。None なら止まりません
+            amplitude: 全体の振幅
+            channels: 1 なら (N,)、2 なら L, R に同じ信号を入れた (N, 2)
+            block_size: 1ブロックのサンプル数
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size,) または (block_size, 2)
+        """
+        freqs = np.asarray(freqs, dtype=float)
+        k = np.arange(1, len(freqs) + 1)
+        phases = -np.pi * k * (k - 1) / len(freqs)
+        tone_amplitude = amplitude / len(freqs)
+
+        def render(idx):
+            # (n, トーン) の行列を作らないよう、トーンごとに足す
+            t = idx / self.fs
+            wave = np.zeros(len(idx))
+            for f, phase in zip(freqs, phases, strict=True):
+                wave += np.sin(2 * np.pi * f * t + phase)
+            return self._channels(tone_amplitude * wave, channels)
+
+        return self._blocks(render, duration, block_size)
+
+    def log_chirp_blocks(
+        self,
+        f_start: float = 20.0,
+        f_end: float = 15000.0,
+        sweep_time: float = 10.0,
+        duration: float | None = None,
+        amplitude: float = 0.5,
+        channels: int = 1,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        周波数が f_start から f_end まで対数的に上がるチャープを、
+        sweep_time 秒ごとに繰り返して生成します。
+
+        Args:
+            f_start: 開始周波数 (Hz)
+            f_end: 終了周波数 (Hz)
+            sweep_time: 1回のスイープの長さ (秒)
+            duration: 長さ (秒)。None なら止まりません
+            amplitude: 振幅
+            channels: 1 なら (N,)、2 なら L, R に同じ信号を入れた (N, 2)
+            block_size: 1ブロックのサンプル数
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size,) または (block_size, 2)
+        """
+        n_sweep = int(sweep_time * self.fs)
+        rate = np.log(f_end / f_start) / sweep_time
+
+        def render(idx):
+            # 瞬時周波数 f_start * exp(rate * t) を積分した位相
+            t = (idx % n_sweep) / self.fs
+            phase = 2 * np.pi * f_start * np.expm1(rate * t) / rate
+            return self._channels(amplitude * np.sin(phase), channels)
+
+        return self._blocks(render, duration, block_size)
+
+    def white_noise_blocks(
+        self,
+        duration: float | None = None,
+        rms: float = 0.1,
+        channels: int = 1,
+        seed: int | None = None,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        白色雑音 (正規分布) を生成します。
+
+        Args:
+            duration: 長さ (秒)。None なら止まりません
+            rms: 実効値
+            channels: チャンネル数 (チャンネルごとに独立な雑音)
+            seed: 乱数のシード (同じシード・同じ block_size なら同じ信号)
+            block_size: 1ブロックのサンプル数
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size,) または (block_size, channels)
+        """
+        rng = np.random.default_rng(seed)
+        shape = () if channels == 1 else (channels,)
+        return self._blocks(
+            lambda idx: rms * rng.standard_normal((len(idx), *shape)),
+            duration,
+            block_size,
+        )
+
+    def pink_noise_blocks(
+        self,
+        duration: float | None = None,
+        rms: float = 0.1,
+        channels: int = 1,
+        seed: int | None = None,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        ピンクノイズ (1/f) を生成します。フィルタの状態をブロック間で持ち越します。
+
+        Args:
+            duration: 長さ (秒)。None なら止まりません
+            rms: 実効値 (おおよそ)
+            channels: チャンネル数 (チャンネルごとに独立な雑音)
+            seed: 乱数のシード
+            block_size: 1ブロックのサンプル数
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size,) または (block_size, channels)
+        """
+        rng = np.random.default_rng(seed)
+        # 白色雑音 (分散 1) を通したときの出力の分散で割って rms に合わせる
+        impulse = signal.lfilter(_PINK_B, _PINK_A, np.eye(1, 1 << 16)[0])
+        gain = rms / np.sqrt(np.sum(impulse**2))
+        zi = np.zeros((max(len(_PINK_A), len(_PINK_B)) - 1, channels))
+
+        def render(idx):
+            nonlocal zi
+            white = rng.standard_normal((len(idx), channels))
+            pink, zi = signal.lfilter(_PINK_B, _PINK_A, white, axis=0, zi=zi)
+            pink *= gain
+            return pink[:, 0] if channels == 1 else pink
+
+        return self._blocks(render, duration, block_size)
+
+    def separation_test_blocks(
+        self,
+        frequency: float = 1000.0,
+        channel: str = "left",
+        duration: float | None = None,
+        amplitude: float = 0.5,
+        block_size: int = 4800,
+    ) -> Iterator[np.ndarray]:
+        """
+        [ステレオ] 片方のチャンネルだけに正弦波を入れた、分離度の測定用の信号を生成します。
+
+        Args:
+            frequency: 周波数 (Hz)
+            channel: 音を入れるチャンネル ("left" または "right")
+            duration: 長さ (秒)。None なら止まりません
+            amplitude: 振幅
+            block_size: 1ブロックのサンプル数
+
+        Yields:
+            np.ndarray: 音声データ配列 (block_size, 2) (もう片方は 0)
+        """
+        if channel not in ("left", "right"):
+            raise ValueError(f"channel must be 'left' or 'right': {channel}")
+        col = 0 if channel == "left" else 1
+
+        def render(idx):
+            wave = np.zeros((len(idx), 2))
+            wave[:, col] = amplitude * np.sin(2 * np.pi * frequency * (idx / self.fs))
+            return wave
+
+        return self._blocks(render, duration, block_size)
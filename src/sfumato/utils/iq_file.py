@@ -0,0 +1,280 @@
+# IQファイル (SDRの生データ) の読み書き
+#
+# データ本体 (<name>.sigmf-data) はヘッダの無いサンプル列で、形式は SDR でよく使われる
+#   cu8  : 符号なし8bit I/Q 交互 (rtl_sdr の出力)
+#   cs16 : 符号付き16bit I/Q 交互 (HackRF, USRP など)
+#   cf32 : float32 I/Q 交互 (= complex64 と同じ並び)
+# の3種類 (実数信号用の ru8 / rs16 / rf32 も同じ並びで I だけ)。
+# サンプリング周波数などは SigMF 形式の JSON (<name>.sigmf-meta) に書く。
+# 読み込みは np.memmap なので、ファイル全体をメモリに載せずにブロック単位で処理できる。
+import json
+import os
+from collections.abc import Iterator
+
+import numpy as np
+
+# 形式名 -> (格納する dtype, SigMF の datatype 名 (複素 / 実数))
+IQ_FORMATS = {
+    "u8": (np.dtype(np.uint8), "cu8", "ru8"),
+    "s16": (np.dtype("<i2"), "ci16_le", "ri16_le"),
+    "f32": (np.dtype("<f4"), "cf32_le", "rf32_le"),
+}
+
+# 整数形式のフルスケール (u8 は 127.5 を中心とした ±127.5)
+_INT_FULL_SCALE = {"u8": 127.5, "s16": 32767.0}
+
+# 一括変換するときのブロック長 (サンプル)
+_CHUNK = 1 << 20
+
+
+def _split_format(fmt: str) -> tuple[bool, str]:
+    """'cu8' -> (True, 'u8'), 'rf32' -> (False, 'f32')"""
+    if len(fmt) < 3 or fmt[0] not in "cr" or fmt[1:] not in IQ_FORMATS:
+        raise ValueError(f"Unknown IQ format: {fmt}")
+    return fmt[0] == "c", fmt[1:]
+
+
+def _paths(path: str) -> tuple[str, str]:
+    """拡張子の有無にかかわらず、(データ, メタデータ) のパスを返す"""
+    base, ext = os.path.splitext(path)
+    if ext not in (".sigmf-data", ".sigmf-meta"):
+        base = path
+    return base + ".sigmf-data", base + ".sigmf-meta"
+
+
+class IqWriter:
+    """
+    IQ信号 (または実数のRF信号) をブロック単位でファイルに追記するライタ
+
+    FmTransmitter.modulate_blocks() の出力のような、メモリに載せきれない
+    長さの信号を少しずつ書き出せる。close() でメタデータを書く。
+
+    Usage:
+        with IqWriter("outputs/capture", fs=384000, fmt="cs16") as w:
+            for block in blocks:
+                w.write(block)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fs: float,
+        fmt: str = "cf32",
+        center_freq: float = 0.0,
+        scale: float = 1.0,
+        description: str = "",
+    ):
+        """
+        Args:
+            path: 保存先 (拡張子 .sigmf-data / .sigmf-meta は自動で付く)
+            fs: サンプリング周波数 (Hz)
+            fmt: "cu8" / "cs16" / "cf32" (複素) または "ru8" / "rs16" / "rf32" (実数)
+            center_freq: 中心周波数 (Hz)。複素ベースバンドなら搬送波周波数
+            scale: 整数形式のフルスケールに対応する振幅 (これを超える値はクリップ)
+            description: メタデータに残す説明
+        """
+        self.is_complex, self.sample_format = _split_format(fmt)
+        self.fmt = fmt
+        self.fs = fs
+        self.center_freq = center_freq
+        self.scale = float(scale)
+        self.description = description
+        self.data_path, self.meta_path = _paths(path)
+
+        os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
+        self._file = open(self.data_path, "wb")  # noqa: SIM115 (close() で閉じる)
+        self.num_samples = 0
+
+    def write(self, block: np.ndarray):
+        """信号ブロックを変換して追記する"""
+        block = np.asarray(block)
+        if np.iscomplexobj(block) != self.is_complex:
+            kind = "complex" if self.is_complex else "real"
+            raise ValueError(f"format '{self.fmt}' expects {kind} samples")
+
+        for i in range(0, len(block), _CHUNK):
+            self._encode(block[i : i + _CHUNK]).tofile(self._file)
+        self.num_samples += len(block)
+
+    def close(self):
+        """データファイルを閉じ、メタデータ (SigMF) を書き出す"""
+        if self._file.closed:
+            return
+        self._file.close()
+
+        _, complex_name, real_name = IQ_FORMATS[self.sample_format]
+        meta = {
+            "global": {
+                "core:datatype": complex_name if self.is_complex else real_name,
+                "core:sample_rate": self.fs,
+                "core:version": "1.0.0",
+                "core:description": self.description,
+                "sfumato:scale": self.scale,
+            },
+            "captures": [{"core:sample_start": 0, "core:frequency": self.center_freq}],
+            "annotations": [],
+        }
+        with open(self.meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _encode(self, block: np.ndarray) -> np.ndarray:
+        dtype = IQ_FORMATS[self.sample_format][0]
+        if self.is_complex:
+            # complex -> [I0, Q0, I1, Q1, ...]
+            block = np.stack([block.real, block.imag], axis=-1).ravel()
+
+        if self.sample_format == "f32":
+            return block.astype(dtype)
+
+        full_scale = _INT_FULL_SCALE[self.sample_format]
+        offset = full_scale if self.sample_format == "u8" else 0.0
+        info = np.iinfo(dtype)
+        q = np.rint(block * (full_scale / self.scale) + offset)
+        return np.clip(q, info.min, info.max).astype(dtype)
+
+
+def write_iq(
+    path: str,
+    data: np.ndarray,
+    fs: float,
+    fmt: str | None = None,
+    center_freq: float = 0.0,
+    scale: float | None = None,
+    description: str = "",
+) -> str:
+    """
+    信号全体を1回で IQファイルに書き出す
+
+    Args:
+        path: 保存先 (拡張子は自動で付く)
+        data: 複素IQ信号、または実数のRF信号
+        fs: サンプリング周波数 (Hz)
+        fmt: 形式。None なら複素は "cf32"、実数は "rf32"
+        center_freq: 中心周波数 (Hz)
+        scale: 整数形式のフルスケール振幅。None ならピーク値 (クリップしない)
+        description: メタデータに残す説明
+
+    Returns:
+        str: データファイルのパス
+    """
+    if fmt is None:
+        fmt = "cf32" if np.iscomplexobj(data) else "rf32"
+    if scale is None:
+        peak = float(np.max(np.abs(data))) if len(data) > 0 else 0.0
+        scale = peak if peak > 0 else 1.0
+
+    with IqWriter(path, fs, fmt, center_freq, scale, description) as writer:
+        writer.write(data)
+    return writer.data_path
+
+
+class IqFile:
+    """
+    IQファイルを np.memmap で開くリーダ
+
+    ファイル全体は読み込まず、read() / blocks() で要求された範囲だけを変換する。
+    cf32 / rf32 は変換が不要なので、memmap をそのまま (コピー無しで) 返す。
+
+    Usage:
+        capture = IqFile("outputs/capture")
+        for audio in FmReceiver().stream(capture.blocks(65536)):
+            ...
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: IQファイルのパス (拡張子はあってもなくてもよい)
+        """
+        self.data_path, self.meta_path = _paths(path)
+        with open(self.meta_path) as f:
+            self.meta = json.load(f)
+
+        meta_global = self.meta["global"]
+        self.datatype = meta_global["core:datatype"]
+        self.fs = meta_global["core:sample_rate"]
+        self.scale = float(meta_global.get("sfumato:scale", 1.0))
+        captures = self.meta.get("captures") or [{}]
+        self.center_freq = captures[0].get("core:frequency", 0.0)
+
+        for name, (_, complex_name, real_name) in IQ_FORMATS.items():
+            if self.datatype in (complex_name, real_name):
+                self.sample_format = name
+                self.is_complex = self.datatype == complex_name
+                break
+        else:
+            raise ValueError(f"Unsupported datatype: {self.datatype}")
+
+        dtype = IQ_FORMATS[self.sample_format][0]
+        width = 2 if self.is_complex else 1
+        if self.sample_format == "f32" and self.is_complex:
+            # float32 の I/Q 交互は complex64 と同じ並びなので、そのまま見る
+            dtype, width = np.dtype("<c8"), 1
+
+        n_items = os.path.getsize(self.data_path) // dtype.itemsize
+        shape = (n_items // width, width) if width > 1 else (n_items,)
+        if n_items == 0:
+            # 長さ 0 のファイルは mmap できない
+            self.raw = np.zeros(shape, dtype=dtype)
+        else:
+            self.raw = np.memmap(self.data_path, dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    @property
+    def duration(self) -> float:
+        """長さ (秒)"""
+        return len(self) / self.fs
+
+    def read(self, start: int = 0, count: int | None = None) -> np.ndarray:
+        """
+        サンプル start から count 個を float32 / complex64 で返す
+
+        Args:
+            start: 先頭のサンプル番号
+            count: サンプル数。None なら最後まで
+
+        Returns:
+            np.ndarray: 信号 (cf32 / rf32 の場合は memmap のビュー)
+        """
+        stop = len(self) if count is None else min(start + count, len(self))
+        raw = self.raw[start:stop]
+        if self.sample_format == "f32":
+            return raw
+
+        full_scale = _INT_FULL_SCALE[self.sample_format]
+        offset = full_scale if self.sample_format == "u8" else 0.0
+        data = (raw.astype(np.float32) - np.float32(offset)) * np.float32(
+            self.scale / full_scale
+        )
+        if self.is_complex:
+            # [I, Q] の組 -> complex64
+            data = data.view(np.complex64)[:, 0]
+        return data
+
+    def blocks(self, block_size: int = 65536) -> Iterator[np.ndarray]:
+        """
+        ファイル全体を block_size サンプルずつ返すジェネレータ
+        (FmReceiver.stream / stream_iq にそのまま渡せる)
+        """
+        for start in range(0, len(self), block_size):
+            yield self.read(start, block_size)
+
+
+def read_iq(path: str) -> tuple[np.ndarray, float]:
+    """
+    IQファイル全体を読み込む
+
+    Returns:
+        tuple[np.ndarray, float]: (信号, サンプリング周波数)。
+            cf32 / rf32 の場合、信号は memmap (必要な部分だけ読み込まれる)
+    """
+    capture = IqFile(path)
+    return capture.read(), capture.fs
@@ -1,9 +1,106 @@
 # generated by Gemini 3 Pro
-import os
 import math
+import os
+from collections.abc import Iterator
+
 import numpy as np
 import soundfile as sf
-from scipy import signal
+
+from sfumato.dsp.dynamics import PeakNormalizer
+from sfumato.dsp.resampler import PolyphaseResampler
+
+
+def _check_exists(filename):
+    if isinstance(filename, (str, os.PathLike)) and not os.path.exists(filename):
+        raise FileNotFoundError(f"File not found: {filename}")
+
+
+def _raw_blocks(f: sf.SoundFile, target_fs: int, to_mono: bool, block_size: int):
+    """
+    開いたファイルを block_size フレームずつ読み、チャンネルをそろえて target_fs にした
+    float32 のブロックを返す (正規化はしない)
+    """
+    fs = f.samplerate
+    resampler = None
+    if fs != target_fs:
+        gcd = math.gcd(target_fs, fs)
+        # resample_poly と同じフィルタ・同じ出力になる
+        resampler = PolyphaseResampler(target_fs // gcd, fs // gcd)
+
+    for block in f.blocks(blocksize=block_size, always_2d=True):
+        if to_mono:
+            block = block.mean(axis=1)
+        elif block.shape[1] == 1:
+            block = np.repeat(block, 2, axis=1)
+        if resampler is not None:
+            block = resampler.process(block)
+        if len(block):
+            yield block.astype(np.float32)
+    if resampler is not None:
+        tail = resampler.flush()
+        if len(tail):
+            yield tail.astype(np.float32)
+
+
+def stream_wav(
+    filename,
+    target_fs: int,
+    to_mono: bool = False,
+    normalize_peak: float = 0.98,
+    normalize: str | None = "scan",
+    block_size: int = 65536,
+    lookahead: int = 4800,
+) -> Iterator[np.ndarray]:
+    """
+    WAVファイルをブロックずつ読み込み、リサンプリング・正規化して返す。
+    ファイル全体をメモリに載せないので、長い録音でもメモリは一定で、
+    最初のブロックからすぐに処理を始められる。
+
+    Args:
+        filename: ファイルパス (normalize="limiter" か None ならファイルオブジェクトも可)
+        target_fs: 目標サンプリング周波数
+        to_mono: Trueなら強制的にモノラル化、Falseならステレオ (N, 2) にそろえる
+        normalize_peak: 正規化後のピーク
+        normalize: 正規化の方法
+            "scan": 1回目の読み込みでピークを求めてから、2回目で正規化して返す。
+                    load_and_preprocess_wav と同じ値になる
+                    (fs が同じなら1回目は読むだけ、違えばリサンプリングも行う)
+            "limiter": 1回だけ読み、PeakNormalizer (先読み lookahead サンプル) で合わせる
+            None: 正規化しない
+        block_size: 1回に読むフレーム数 (出力ブロックの長さはリサンプリングで変わる)
+        lookahead: normalize="limiter" の先読みのサンプル数 (target_fs で)
+
+    Yields:
+        np.ndarray: float32 の音声データ (n,) または (n, 2)
+    """
+    if normalize not in ("scan", "limiter", None):
+        raise ValueError(f"Unknown normalize mode: {normalize}")
+    _check_exists(filename)
+
+    if normalize == "scan":
+        max_val = np.float32(0.0)
+        with sf.SoundFile(filename) as f:
+            for block in _raw_blocks(f, target_fs, to_mono, block_size):
+                max_val = max(max_val, np.max(np.abs(block)))
+        scale = normalize_peak / max_val if max_val > 0 else None
+        with sf.SoundFile(filename) as f:
+            for block in _raw_blocks(f, target_fs, to_mono, block_size):
+                yield block if scale is None else block * scale
+        return
+
+    with sf.SoundFile(filename) as f:
+        blocks = _raw_blocks(f, target_fs, to_mono, block_size)
+        if normalize is None:
+            yield from blocks
+            return
+        normalizer = PeakNormalizer(normalize_peak, lookahead)
+        for block in blocks:
+            out = normalizer.process(block)
+            if len(out):
+                yield out
+        tail = normalizer.flush()
+        if len(tail):
+            yield tail
 
 
 def load_and_preprocess_wav(
@@ -15,36 +112,31 @@ def load_and_preprocess_wav(
     """
     WAVファイルを読み込み、リサンプリング・正規化を行う。
 
+    stream_wav のブロックを、あらかじめ確保した出力に詰めてからその場で正規化する
+    (全体の配列は出力の1つだけ。値は stream_wav(normalize="scan") と同じ)。
+
     Args:
         filename: ファイルパス
         target_fs: 目標サンプリング周波数
-        mono: Trueなら強制的にモノラル化、Falseなら元のチャンネル数を維持
+        to_mono: Trueなら強制的にモノラル化、Falseなら元のチャンネル数を維持
 
     Returns:
         np.ndarray: 音声データ (N,) または (N, 2)
     """
-    if not os.path.exists(filename):
-        raise FileNotFoundError(f"File not found: {filename}")
-
-    data, fs = sf.read(filename)
-
-    if to_mono:
-        if data.ndim > 1:
-            data = data.mean(axis=1)
-    else:
-        if data.ndim == 1:
-            data = np.column_stack([data, data])
+    _check_exists(filename)
+    info = sf.info(filename)
+    # リサンプリング後の長さ (resample_poly と同じ ceil(frames * up / down))
+    n_out = -(-info.frames * target_fs // info.samplerate)
+    data = np.empty((n_out,) if to_mono else (n_out, 2), dtype=np.float32)
 
-    if fs != target_fs:
-        gcd = math.gcd(target_fs, fs)
-        up = target_fs // gcd
-        down = fs // gcd
-        data = signal.resample_poly(data, up, down)
+    pos = 0
+    for block in stream_wav(filename, target_fs, to_mono, normalize=None):
+        data[pos : pos + len(block)] = block
+        pos += len(block)
+    data = data[:pos]
 
-    data = data.astype(np.float32)
-
-    max_val = np.max(np.abs(data))
+    # np.abs(data) の一時配列を作らずに最大値を求める
+    max_val = max(data.max(initial=0.0), -data.min(initial=0.0))
     if max_val > 0:
-        data = data * (normalize_peak / max_val)
-
+        data *= normalize_peak / max_val
     return data
@@ -1,8 +1,12 @@
 # generated by Gemini 3 Pro
 import numpy as np
 import scipy.io.wavfile as wav
+import soundfile as sf
 import os
 
+from sfumato.dsp.dynamics import LookaheadLimiter, PeakNormalizer
+from sfumato.dsp.filters import LinearFilter, dc_blocker_coeffs
+
 
 def save_audio(
     signal: np.ndarray,
@@ -55,3 +59,112 @@ def save_audio(
     )
     wav.write(filename, int(fs), audio_int16)
     print(f"Saved [{mode_str}] audio to: {filename} (Gain: {gain})")
+
+
+# AudioWriter の format -> soundfile の subtype
+WAV_FORMATS = {"int16": "PCM_16", "int24": "PCM_24", "float32": "FLOAT"}
+
+
+class AudioWriter:
+    """
+    音声をブロック単位で WAV ファイルに追記するライタ
+
+    save_audio と違い、全体の平均やピークを使わずに
+        DC ブロッカ (状態を持つ1次 IIR) -> 固定ゲイン (または PeakNormalizer)
+        -> LookaheadLimiter -> 書き込み
+    の順にブロックごとに処理するので、受信しながら書き出せる。
+    リミッタと PeakNormalizer の分だけ出力は遅れるので、close() で残りを書き出す。
+
+    Usage:
+        with AudioWriter("outputs/restored.wav", 48000, fmt="int24") as w:
+            for block in rx.stream(rf_blocks):
+                w.write(block)
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        fs: int,
+        fmt: str = "int16",
+        gain: float = 1.0,
+        normalize_peak: float | None = None,
+        dc_block: bool = True,
+        dc_cutoff: float = 5.0,
+        limiter: bool = True,
+        ceiling: float = 0.99,
+    ):
+        """
+        Args:
+            filename: 保存先のパス
+            fs: サンプリング周波数
+            fmt: "int16" / "int24" / "float32"
+            gain: 固定ゲイン
+            normalize_peak: 指定するとピークをこの値に合わせる (1パスの PeakNormalizer)
+            dc_block: True なら DC ブロッカを通す
+            dc_cutoff: DC ブロッカのカットオフ (Hz)
+            limiter: True なら ceiling を超えないよう先読みリミッタを通す
+                (False で整数形式なら、±1 を超えた分はクリップされる)
+            ceiling: リミッタの最大値
+        """
+        if fmt not in WAV_FORMATS:
+            raise ValueError(
+                f"Unknown WAV format: {fmt} (choose from {list(WAV_FORMATS)})"
+            )
+        self.filename = filename
+        self.fs = int(fs)
+        self.fmt = fmt
+        self.gain = gain
+        self.num_samples = 0
+
+        self._dc = LinearFilter(*dc_blocker_coeffs(dc_cutoff, fs)) if dc_block else None
+        self._normalizer = PeakNormalizer(normalize_peak) if normalize_peak else None
+        self._limiter = LookaheadLimiter(ceiling) if limiter else None
+        self._file = None  # チャンネル数がわかる最初のブロックで開く
+
+    def write(self, block: np.ndarray):
+        """音声ブロック (N,) または (N, C) を処理して追記する"""
+        block = np.asarray(block, dtype=np.float64)
+        if self._dc is not None:
+            block = self._dc.process(block)
+        block = block * self.gain
+        if self._normalizer is not None:
+            block = self._normalizer.process(block)
+        if self._limiter is not None:
+            block = self._limiter.process(block)
+        self._write(block, channels=1 if block.ndim == 1 else block.shape[1])
+
+    def _write(self, block: np.ndarray, channels: int):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+            self._file = sf.SoundFile(
+                self.filename,
+                "w",
+                samplerate=self.fs,
+                channels=channels,
+                subtype=WAV_FORMATS[self.fmt],
+                format="WAV",
+            )
+        if len(block):
+            self._file.write(block if self.fmt == "float32" else np.clip(block, -1, 1))
+            self.num_samples += len(block)
+
+    def close(self):
+        """遅れて残っている分を書き出してファイルを閉じる"""
+        if self._file is None or self._file.closed:
+            return
+        channels = self._file.channels
+        for stage in (self._normalizer, self._limiter):
+            if stage is None:
+                continue
+            # 前の段の残りを後ろの段に通してから、後ろの段の残りを出す
+            tail = stage.flush()
+            if stage is self._normalizer and self._limiter is not None:
+                tail = self._limiter.process(tail)
+            self._write(tail, channels)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,291 @@
+# 長い信号 (RFのキャプチャなど) をブロック単位で受け取り、
+#   - Welch 法の平均 PSD (StreamingSpectrum.psd)
+#   - ウォーターフォール (短時間 PSD の履歴, StreamingSpectrum.waterfall)
+#   - 時間波形の最小/最大の包絡線 (MinMaxEnvelope)
+# を少しずつ更新する。どれも信号の長さによらず一定のメモリで済むので、
+# 数百万サンプルの信号でも描画 (utils.visualizer) の時間とメモリは一定になる。
+# matplotlib は使わない (グラフを描かない処理からも使える)。
+import numpy as np
+from scipy import fft, signal
+
+
+class MinMaxEnvelope:
+    """
+    信号の最小/最大の包絡線を、max_points 個以下の区間で持つ
+
+    区間の幅は最初 1 サンプルで、区間の数が 2 * max_points に達するたびに
+    隣どうしをまとめて幅を2倍にする。描画すると、どの区間も縦線
+    (最小 - 最大) になるので、元の信号を全部描いたときと同じ見た目になる。
+    """
+
+    def __init__(self, max_points: int = 2048):
+        """
+        Args:
+            max_points: 区間の数の目安 (実際は max_points 以上 2 * max_points 未満)
+        """
+        self.max_points = max_points
+        self._capacity = 2 * max_points
+        self._min = np.empty(self._capacity)
+        self._max = np.empty(self._capacity)
+        self.reset()
+
+    def reset(self):
+        self.bin_size = 1  # 1区間のサンプル数
+        self.num_samples = 0
+        self._n_bins = 0
+        self._pending = 0  # 埋まりかけの区間に入っているサンプル数
+        self._pending_min = np.inf
+        self._pending_max = -np.inf
+
+    def process(self, block: np.ndarray):
+        """実数のブロックを追加する"""
+        x = np.asarray(block, dtype=float).ravel()
+        self.num_samples += len(x)
+
+        while len(x) > 0:
+            if self._pending > 0 or len(x) < self.bin_size:
+                # 埋まりかけの区間を先に埋める
+                m = min(self.bin_size - self._pending, len(x))
+                self._pending_min = min(self._pending_min, x[:m].min())
+                self._pending_max = max(self._pending_max, x[:m].max())
+                self._pending += m
+                x = x[m:]
+                if self._pending == self.bin_size:
+                    self._push(
+                        np.array([self._pending_min]), np.array([self._pending_max])
+                    )
+                    self._pending = 0
+                    self._pending_min, self._pending_max = np.inf, -np.inf
+                continue
+
+            # 区間をまとめて追加する (区間の数の上限まで)
+            # (_push で区間の幅が変わることがあるので、先に x を進める)
+            k = min(len(x) // self.bin_size, self._capacity - self._n_bins)
+            frames = x[: k * self.bin_size].reshape(k, self.bin_size)
+            x = x[k * self.bin_size :]
+            self._push(frames.min(axis=1), frames.max(axis=1))
+
+    def _push(self, mins: np.ndarray, maxs: np.ndarray):
+        n = self._n_bins
+        self._min[n : n + len(mins)] = mins
+        self._max[n : n + len(maxs)] = maxs
+        self._n_bins += len(mins)
+
+        if self._n_bins == self._capacity:
+            # 隣どうしをまとめて区間の幅を2倍にする (このとき埋まりかけの区間は無い)
+            half = self._capacity // 2
+            np.minimum(self._min[0::2], self._min[1::2], out=self._min[:half])
+            np.maximum(self._max[0::2], self._max[1::2], out=self._max[:half])
+            self._n_bins = half
+            self.bin_size *= 2
+
+    def envelope(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            tuple: (各区間の先頭のサンプル番号, 最小値, 最大値)
+        """
+        mins = self._min[: self._n_bins]
+        maxs = self._max[: self._n_bins]
+        if self._pending > 0:
+            mins = np.append(mins, self._pending_min)
+            maxs = np.append(maxs, self._pending_max)
+        starts = np.arange(len(mins)) * self.bin_size
+        return starts, mins.copy(), maxs.copy()
+
+
+class StreamingSpectrum:
+    """
+    ブロック単位で受け取った信号の Welch PSD とウォーターフォールを更新する
+
+    nfft サンプルのフレームを hop = nfft - noverlap ずつずらして窓を掛け、
+    パワーを平均する。フレームはブロック境界をまたいでもよく、結果はブロックの
+    分け方によらず scipy.signal.welch(..., detrend=False) と丸め誤差の範囲で一致する。
+    複素信号は両側 (中心周波数 center_freq を 0 Hz とする)、実数信号は片側の PSD になる。
+
+    ウォーターフォールは waterfall_average フレームずつ平均した PSD を1行として、
+    最新の waterfall_rows 行をリングバッファに持つ。
+    """
+
+    def __init__(
+        self,
+        fs: float,
+        nfft: int = 4096,
+        noverlap: int | None = None,
+        window: str | np.ndarray = "hann",
+        center_freq: float = 0.0,
+        waterfall_rows: int = 256,
+        waterfall_average: int = 8,
+        envelope_points: int = 2048,
+    ):
+        """
+        Args:
+            fs: サンプリング周波数 [Hz]
+            nfft: フレームの長さ (FFT の点数)
+            noverlap: フレームの重なり (None なら nfft // 2)
+            window: 窓 (scipy.signal.get_window の名前、または長さ nfft の配列)
+            center_freq: 複素信号の中心周波数 [Hz] (周波数軸をずらすだけ)
+            waterfall_rows: ウォーターフォールに残す行数
+            waterfall_average: ウォーターフォールの1行にまとめるフレーム数
+            envelope_points: 時間波形の包絡線の区間の数の目安
+        """
+        self.fs = fs
+        self.nfft = nfft
+        self.noverlap = nfft // 2 if noverlap is None else noverlap
+        self.hop = nfft - self.noverlap
+        if self.hop <= 0:
+            raise ValueError(f"noverlap must be smaller than nfft: {noverlap}")
+        if isinstance(window, str):
+            self.window = signal.get_window(window, nfft)
+        else:
+            self.window = np.asarray(window, dtype=float)
+            if len(self.window) != nfft:
+                raise ValueError(f"window length {len(self.window)} != nfft {nfft}")
+        self.center_freq = center_freq
+        self.waterfall_rows = waterfall_rows
+        self.waterfall_average = waterfall_average
+        self.envelope_points = envelope_points
+        self.reset()
+
+    def reset(self):
+        """蓄積した PSD・ウォーターフォール・包絡線を消す"""
+        self.is_complex = None  # 最初のブロックで決まる
+        self.num_samples = 0
+        self.num_frames = 0
+        self._pending = None  # 次のフレームの先頭以降のサンプル
+        self._psd_sum = None
+        self._rows = None
+        self._row_times = None
+        self._n_rows = 0  # これまでに作った行の数
+        self._row_sum = None
+        self._row_frames = 0
+        self.envelopes = []  # 実数なら [実部]、複素なら [I, Q]
+
+    def process(self, block: np.ndarray):
+        """ブロックを追加する"""
+        block = np.asarray(block).ravel()
+        if self.is_complex is None:
+            self.is_complex = np.iscomplexobj(block)
+            n_freq = self.nfft if self.is_complex else self.nfft // 2 + 1
+            self._psd_sum = np.zeros(n_freq)
+            self._row_sum = np.zeros(n_freq)
+            self._rows = np.zeros((self.waterfall_rows, n_freq))
+            self._row_times = np.zeros(self.waterfall_rows)
+            self.envelopes = [
+                MinMaxEnvelope(self.envelope_points)
+                for _ in range(2 if self.is_complex else 1)
+            ]
+            self._pending = block[:0]
+
+        self.envelopes[0].process(block.real)
+        if self.is_complex:
+            self.envelopes[1].process(block.imag)
+
+        x = np.concatenate([self._pending, block])
+        self.num_samples += len(block)
+        if len(x) < self.nfft:
+            self._pending = x
+            return
+
+        n_frames = (len(x) - self.nfft) // self.hop + 1
+        frames = np.lib.stride_tricks.sliding_window_view(x, self.nfft)[:: self.hop]
+        power = self._frame_power(frames[:n_frames])
+        self._psd_sum += power.sum(axis=0)
+        self._add_waterfall(power)
+        self.num_frames += n_frames
+
+        # 次のフレームの先頭以降を残す (コピーして元のブロックを参照しない)
+        self._pending = x[n_frames * self.hop :].copy()
+
+    def _frame_power(self, frames: np.ndarray) -> np.ndarray:
+        """各フレームの PSD (scipy.signal.welch と同じ密度のスケール)"""
+        windowed = frames * self.window
+        if self.is_complex:
+            spec = fft.fft(windowed, axis=-1)
+        else:
+            spec = fft.rfft(windowed, axis=-1)
+        power = spec.real**2 + spec.imag**2
+        power *= 1.0 / (self.fs * np.sum(self.window**2))
+        if not self.is_complex:
+            # 片側にするので DC と (nfft が偶数なら) ナイキスト以外を2倍
+            last = -1 if self.nfft % 2 == 0 else None
+            power[:, 1:last] *= 2
+        return power
+
+    def _add_waterfall(self, power: np.ndarray):
+        i = 0
+        while i < len(power):
+            m = min(self.waterfall_average - self._row_frames, len(power) - i)
+            self._row_sum += power[i : i + m].sum(axis=0)
+            self._row_frames += m
+            i += m
+            if self._row_frames == self.waterfall_average:
+                row = self._n_rows % self.waterfall_rows
+                self._rows[row] = self._row_sum / self.waterfall_average
+                # 行の時刻 = 最後のフレームの中心
+                last_frame = self.num_frames + i - 1
+                self._row_times[row] = (last_frame * self.hop + self.nfft / 2) / self.fs
+                self._n_rows += 1
+                self._row_sum[:] = 0.0
+                self._row_frames = 0
+
+    def freqs(self) -> np.ndarray:
+        """PSD の周波数軸 [Hz] (複素なら fftshift 済みで center_freq を足したもの)"""
+        if self.is_complex:
+            return fft.fftshift(fft.fftfreq(self.nfft, 1 / self.fs)) + self.center_freq
+        return fft.rfftfreq(self.nfft, 1 / self.fs)
+
+    def psd(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        これまでの全フレームの平均 PSD
+
+        Returns:
+            tuple: (周波数 [Hz], PSD [/Hz])。フレームが1つも無ければ PSD は NaN
+        """
+        if self.is_complex is None:
+            raise ValueError("no samples have been processed")
+        psd = (
+            self._psd_sum / self.num_frames
+            if self.num_frames
+            else self._psd_sum * np.nan
+        )
+        return self.freqs(), self._shift(psd)
+
+    def waterfall(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        ウォーターフォール (古い行から順に並べたもの)
+
+        Returns:
+            tuple: (各行の時刻 [s], 周波数 [Hz], PSD (行数, 周波数の数))
+        """
+        if self.is_complex is None:
+            raise ValueError("no samples have been processed")
+        n = min(self._n_rows, self.waterfall_rows)
+        order = (np.arange(n) + self._n_rows - n) % self.waterfall_rows
+        return self._row_times[order], self.freqs(), self._shift(self._rows[order])
+
+    def envelope(self, component: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        時間波形の包絡線 (component: 0 = 実部/I, 1 = Q)
+
+        Returns:
+            tuple: (各区間の先頭の時刻 [s], 最小値, 最大値)
+        """
+        starts, mins, maxs = self.envelopes[component].envelope()
+        return starts / self.fs, mins, maxs
+
+    def _shift(self, psd: np.ndarray) -> np.ndarray:
+        return fft.fftshift(psd, axes=-1) if self.is_complex else psd
+
+
+def spectrum_of(
+    data: np.ndarray, fs: float, block_size: int = 1 << 18, **kwargs
+) -> StreamingSpectrum:
+    """
+    配列 (memmap でもよい) を block_size ずつ StreamingSpectrum に通す
+
+    kwargs は StreamingSpectrum にそのまま渡す
+    """
+    spectrum = StreamingSpectrum(fs, **kwargs)
+    for start in range(0, len(data), block_size):
+        spectrum.process(data[start : start + block_size])
+    return spectrum
@@ -1,44 +1,58 @@
 # generated by Gemini 3 Pro
+import os
+
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.fft import fft, fftfreq, fftshift
 from scipy.signal.windows import hann
 
+from sfumato.utils.spectrum import StreamingSpectrum, spectrum_of
+
 
 def plot_signal_analysis(
-    signal: np.ndarray,
+    signal: np.ndarray | None,
     fs: float,
     title: str = "Signal Analysis",
     zoom_usec: float = 100.0,
     carrier_freq: float = None,
     xlim_freq: list = None,
     figsize: tuple = (12, 8),
+    spectrum: StreamingSpectrum | None = None,
 ):
     """
     時間領域の波形と、周波数領域のスペクトルを同時にプロットします。
 
     Args:
-        signal (np.ndarray): 入力信号データ（実数または複素数）
+        signal (np.ndarray): 入力信号データ（実数または複素数）。
+            spectrum を渡すなら None でもよい (時間波形は包絡線で描く)
         fs (float): サンプリング周波数 [Hz]
         title (str): グラフのタイトル
         zoom_usec (float): 時間軸の拡大範囲 [マイクロ秒] (デフォルト: 100μs)
         carrier_freq (float, optional): 搬送波周波数のマーカー位置 [Hz]
         xlim_freq (list, optional): 周波数領域のグラフの定義域
         figsize (tuple): 図のサイズ
+        spectrum (StreamingSpectrum, optional): 蓄積済みのスペクトル。
+            渡すと先頭 65536 サンプルの FFT の代わりに、信号全体の平均 PSD を描く
     """
 
+    # --- 1. 時間軸プロット (Time Domain) ---
+    fig, axes = plt.subplots(2, 1, figsize=figsize, constrained_layout=True)
+
+    ax_time = axes[0]
+    if signal is None:
+        # 信号全体の包絡線 (点の数は信号の長さによらない)
+        is_complex = spectrum.is_complex
+        _draw_envelope(ax_time, spectrum, f"{title} - Time Domain (Envelope)")
+        _draw_psd(axes[1], spectrum, carrier_freq, xlim_freq)
+        plt.show()
+        return
+
     # --- データの準備 ---
     N = len(signal)
-    t = np.arange(N) / fs
 
     # 複素信号(IQ)か実信号かで処理を分ける
     is_complex = np.iscomplexobj(signal)
 
-    # --- 1. 時間軸プロット (Time Domain) ---
-    fig, axes = plt.subplots(2, 1, figsize=figsize, constrained_layout=True)
-
-    ax_time = axes[0]
-
     # ズーム範囲のサンプル数を計算
     zoom_samples = int(zoom_usec * 1e-6 * fs)
     if zoom_samples > N:
@@ -47,7 +61,7 @@ def plot_signal_analysis(
         zoom_samples = N  # 安全策
 
     # 時間軸をマイクロ秒単位に変換してプロット
-    t_zoom = t[:zoom_samples] * 1e6
+    t_zoom = np.arange(zoom_samples) / fs * 1e6
     sig_zoom = signal[:zoom_samples]
 
     if is_complex:
@@ -69,6 +83,10 @@ def plot_signal_analysis(
 
     # --- 2. 周波数軸プロット (Frequency Domain) ---
     ax_freq = axes[1]
+    if spectrum is not None:
+        _draw_psd(ax_freq, spectrum, carrier_freq, xlim_freq)
+        plt.show()
+        return
 
     # FFT
     n_fft = min(65536, N)
@@ -108,3 +126,221 @@ def plot_signal_analysis(
     ax_freq.grid(True, linestyle="--", alpha=0.6)
 
     plt.show()
+
+
+def _split_channels(data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """確実に (N, 2) に整形して L, R を返す"""
+    # 1次元 (N,) -> モノラル (L=R)
+    if data.ndim == 1:
+        return data, data
+    # 2次元 (N, 2) -> ステレオ
+    elif data.ndim == 2 and data.shape[1] == 2:
+        return data[:, 0], data[:, 1]
+    # 2次元 (N, 1) -> モノラル
+    elif data.ndim == 2 and data.shape[1] == 1:
+        flat = data.flatten()
+        return flat, flat
+    else:
+        raise ValueError(f"Unexpected data shape: {data.shape}")
+
+
+def plot_stereo_comparison(
+    input_audio: np.ndarray,
+    output_audio: np.ndarray,
+    fs: float,
+    filename: str | None = None,
+    show: bool = True,
+    limit: int = 1000,
+):
+    """
+    入力と復調後の音声を L/R ごとに比べる (上段: 時間波形, 下段: PSD)
+
+    Args:
+        input_audio: 入力音声 (N,) または (N, 2)
+        output_audio: 復調した音声 (N,) または (N, 2)
+        fs: サンプリング周波数 [Hz]
+        filename: 画像の保存先 (None なら保存しない)
+        show: ウィンドウを表示する
+        limit: 拡大表示するサンプル数 (先頭から)
+    """
+    # 入力と出力を安全に分離
+    in_l, in_r = _split_channels(input_audio)
+    out_l, out_r = _split_channels(output_audio)
+
+    # プロット開始
+    plt.figure(figsize=(14, 10))
+
+    # 時間軸 (ms)
+    t_axis = np.arange(limit) / fs * 1000
+
+    # --- [左上] Left Ch 時間波形 ---
+    plt.subplot(2, 2, 1)
+    plt.plot(t_axis, in_l[:limit], label="In (L)", color="blue", alpha=0.5)
+    plt.plot(
+        t_axis,
+        out_l[:limit],
+        label="Out (L)",
+        color="cyan",
+        alpha=0.8,
+        linestyle="--",
+    )
+    plt.title("Left Channel (Time Domain)")
+    plt.xlabel("Time [ms]")
+    plt.ylabel("Amplitude")
+    plt.legend(loc="upper right")
+    plt.grid(True, alpha=0.3)
+
+    # --- [右上] Right Ch 時間波形 ---
+    plt.subplot(2, 2, 2)
+    plt.plot(t_axis, in_r[:limit], label="In (R)", color="red", alpha=0.5)
+    plt.plot(
+        t_axis,
+        out_r[:limit],
+        label="Out (R)",
+        color="orange",
+        alpha=0.8,
+        linestyle="--",
+    )
+    plt.title("Right Channel (Time Domain)")
+    plt.xlabel("Time [ms]")
+    plt.legend(loc="upper right")
+    plt.grid(True, alpha=0.3)
+
+    # --- [下段] 周波数特性 (PSD) ---
+    # plt.psd (NFFT=1024, 重なり無し) と同じ値を、ブロック単位の Welch で求める
+    # (信号全体の配列を一度に FFT しない)
+    for pos, side, sig_in, sig_out, colors in (
+        (3, "Left", in_l, out_l, ("blue", "cyan")),
+        (4, "Right", in_r, out_r, ("red", "orange")),
+    ):
+        ax = plt.subplot(2, 2, pos)
+        ax.set_title(f"{side} Channel (PSD)")
+        for sig, color, label, style in (
+            (sig_in, colors[0], f"In ({side[0]})", "-"),
+            (sig_out, colors[1], f"Out ({side[0]})", "--"),
+        ):
+            spectrum = spectrum_of(
+                sig, fs, nfft=1024, noverlap=0, window=np.hanning(1024)
+            )
+            freqs, psd = spectrum.psd()
+            ax.plot(
+                freqs,
+                10 * np.log10(psd),
+                color=color,
+                label=label,
+                linestyle=style,
+            )
+        ax.set_xlabel("Frequency")
+        ax.set_ylabel("Power Spectral Density (dB/Hz)")
+        ax.grid(True)
+        ax.set_xlim(0, 15000)
+        ax.legend(loc="upper right")
+
+    plt.tight_layout()
+
+    # 保存と表示
+    if filename is not None:
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        plt.savefig(filename)
+    if show:
+        plt.show()
+
+
+def _draw_envelope(ax, spectrum: StreamingSpectrum, title: str):
+    """spectrum に蓄積した時間波形の包絡線 (最小-最大) を塗りつぶしで描く"""
+    components = [("I (Real)", "#1f77b4"), ("Q (Imag)", "#ff7f0e")]
+    if not spectrum.is_complex:
+        components = [("Signal", "#2ca02c")]
+    for i, (label, color) in enumerate(components):
+        t, mins, maxs = spectrum.envelope(i)
+        ax.fill_between(t, mins, maxs, step="post", color=color, alpha=0.6, label=label)
+    ax.set_title(title)
+    ax.set_xlabel("Time [s]")
+    ax.set_ylabel("Amplitude")
+    ax.legend(loc="upper right")
+    ax.grid(True, linestyle="--", alpha=0.6)
+
+
+def _draw_psd(ax, spectrum: StreamingSpectrum, carrier_freq=None, xlim_freq=None):
+    """spectrum に蓄積した平均 PSD を描く"""
+    freqs, psd = spectrum.psd()
+    ax.plot(freqs / 1e3, 10 * np.log10(psd + 1e-30), color="#9467bd", linewidth=1.2)
+
+    # 搬送波マーカー
+    if carrier_freq is not None:
+        ax.axvline(x=carrier_freq / 1e3, color="r", linestyle=":", label="Carrier")
+        if not spectrum.is_complex:
+            ax.axvline(x=-carrier_freq / 1e3, color="r", linestyle=":", alpha=0.5)
+        ax.legend()
+
+    if xlim_freq is not None:
+        ax.set_xlim(xlim_freq)
+    else:
+        ax.set_xlim([freqs.min() / 1e3, freqs.max() / 1e3])
+
+    ax.set_title(
+        f"Frequency Domain (Welch PSD, {spectrum.num_frames} frames"
+        f" x {spectrum.nfft} pt)"
+    )
+    ax.set_xlabel("Frequency [kHz]")
+    ax.set_ylabel("PSD [dB/Hz]")
+    ax.grid(True, linestyle="--", alpha=0.6)
+
+
+def plot_capture_overview(
+    spectrum: StreamingSpectrum,
+    title: str = "Capture Overview",
+    xlim_freq: list | None = None,
+    dynamic_range_db: float = 80.0,
+    figsize: tuple = (12, 10),
+    filename: str | None = None,
+    show: bool = True,
+):
+    """
+    StreamingSpectrum に蓄積した包絡線・平均 PSD・ウォーターフォールを描く
+
+    描く点の数は spectrum の設定 (envelope_points, nfft, waterfall_rows) だけで
+    決まるので、信号がどれだけ長くても描画の時間とメモリは一定。
+
+    Args:
+        spectrum: 信号を通した StreamingSpectrum (utils.spectrum.spectrum_of など)
+        title: グラフのタイトル
+        xlim_freq: 周波数軸の範囲 [kHz]
+        dynamic_range_db: ウォーターフォールの色の範囲 (最大値から何 dB 下まで)
+        figsize: 図のサイズ
+        filename: 画像の保存先 (None なら保存しない)
+        show: ウィンドウを表示する
+    """
+    fig, axes = plt.subplots(3, 1, figsize=figsize, constrained_layout=True)
+    fig.suptitle(title)
+
+    _draw_envelope(axes[0], spectrum, "Time Domain (Envelope)")
+    _draw_psd(axes[1], spectrum, xlim_freq=xlim_freq)
+
+    times, freqs, rows = spectrum.waterfall()
+    ax = axes[2]
+    if len(times) > 0:
+        rows_db = 10 * np.log10(rows + 1e-30)
+        top = rows_db.max()
+        image = ax.imshow(
+            rows_db,
+            aspect="auto",
+            origin="lower",
+            extent=(freqs[0] / 1e3, freqs[-1] / 1e3, times[0], times[-1]),
+            vmin=top - dynamic_range_db,
+            vmax=top,
+            cmap="viridis",
+        )
+        fig.colorbar(image, ax=ax, label="PSD [dB/Hz]")
+    if xlim_freq is not None:
+        ax.set_xlim(xlim_freq)
+    ax.set_title("Waterfall")
+    ax.set_xlabel("Frequency [kHz]")
+    ax.set_ylabel("Time [s]")
+
+    if filename is not None:
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        fig.savefig(filename)
+    if show:
+        plt.show()
+    return fig
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from sfumato.utils.audio_source import AudioSource
+
+BLOCK_METHODS = {
+    "sine_tone_blocks": (1000.0,),
+    "stereo_sine_tone_blocks": (440.0, 1000.0),
+    "time_tone_blocks": (),
+    "stereo_time_tone_blocks": (),
+    "multitone_blocks": ([300.0, 1000.0, 5000.0],),
+    "log_chirp_blocks": (),
+    "white_noise_blocks": (),
+    "pink_noise_blocks": (),
+    "separation_test_blocks": (),
+}
+
+
+@pytest.fixture(scope="module")
+def source() -> AudioSource:
+    return AudioSource()
+
+
+@pytest.mark.parametrize("name", BLOCK_METHODS)
+@pytest.mark.parametrize("block_size", [0, -1])
+def test_bad_block_size_raises_on_call(source, name, block_size):
+    """block_size が正でなければ、next() を待たずに呼んだ時点で ValueError"""
+    with pytest.raises(ValueError, match="block_size"):
+        getattr(source, name)(*BLOCK_METHODS[name], block_size=block_size)
+
+
+def test_bad_channel_raises_on_call(source):
+    with pytest.raises(ValueError, match="channel"):
+        source.separation_test_blocks(channel="center")
+
+
+@pytest.mark.parametrize("name", BLOCK_METHODS)
+def test_block_lengths(source, name):
+    """duration 分を block_size ずつ (最後だけ短く) 返して止まる"""
+    blocks = list(
+        getattr(source, name)(*BLOCK_METHODS[name], duration=0.1, block_size=1000)
+    )
+    assert [len(b) for b in blocks] == [1000] * 4 + [800]
+    assert all(b.dtype == np.float32 for b in blocks)
+
+
+def test_tone_blocks_match_whole(source):
+    """トーンはつなげると一括生成版と同じ値になる"""
+    np.testing.assert_array_equal(
+        np.concatenate(list(source.sine_tone_blocks(1000.0, 0.5, block_size=1777))),
+        source.sine_tone(1000.0, 0.5),
+    )
+    np.testing.assert_array_equal(
+        np.concatenate(
+            list(source.stereo_sine_tone_blocks(440.0, 1000.0, 0.5, block_size=1777))
+        ),
+        source.stereo_sine_tone(440.0, 1000.0, 0.5),
+    )
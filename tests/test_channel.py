@@ -0,0 +1,91 @@
+from itertools import pairwise
+
+import numpy as np
+import pytest
+
+from sfumato import settings
+from sfumato.channnel import NOISE_CHUNK_SIZE, AwgnChannel, add_awgn, signal_power
+from sfumato.sweep import run_snr_sweep
+from sfumato.utils.audio_source import AudioSource
+
+
+def test_complex_noise_density_matches_rf():
+    """複素雑音の I/Q それぞれの分散は Ps / SNR * IQ_FS / RF_FS"""
+    channel = AwgnChannel(20.0, seed=0)
+    std = channel.noise_std(1.0, complex_signal=True)
+    assert std**2 == pytest.approx(0.01 * settings.IQ_FS / settings.RF_FS)
+    assert channel.noise_std(0.5, complex_signal=False) ** 2 == pytest.approx(0.005)
+
+    iq = np.exp(1j * np.linspace(0, 1000, 1 << 18))
+    noise = add_awgn(iq, 20.0, seed=0) - iq
+    expected = 0.01 * settings.IQ_FS / settings.RF_FS
+    assert signal_power(noise) == pytest.approx(2 * expected, rel=0.02)
+
+
+def test_baseband_and_rf_give_same_audio_snr():
+    """同じ公称 SN比なら、RF と複素ベースバンドで受信音声の SN比が揃う"""
+    audio = AudioSource().stereo_sine_tone(440, 1000, 0.5)
+    snr_dbs = (10.0, 20.0, 30.0)
+    seeds = (0, 1)
+
+    def mean_audio_snr(baseband):
+        results = run_snr_sweep(
+            audio, snr_dbs, seeds=seeds, baseband=baseband, max_workers=1
+        )
+        snr = np.array([r["audio_snr_db"] for r in results])
+        return snr.reshape(len(snr_dbs), len(seeds)).mean(axis=1)
+
+    rf = mean_audio_snr(False)
+    iq = mean_audio_snr(True)
+    # 帯域の扱いが違えば 10*log10(RF_FS / (2 * IQ_FS)) = 4.8 dB ずれる
+    np.testing.assert_allclose(iq, rf, atol=0.5)
+
+
+@pytest.mark.parametrize("complex_signal", [False, True])
+def test_blocks_and_ranges_match_add_awgn(complex_signal):
+    """
+    一括 (add_awgn)・ブロック処理 (process)・範囲ごとの処理 (apply(start=)) で、
+    同じ seed と電力なら雑音はサンプル単位で一致する
+    """
+    rng = np.random.default_rng(1)
+    n = 5 * NOISE_CHUNK_SIZE + 1234  # チャンクの境界をまたぐ長さ
+    x = rng.standard_normal(n).astype(np.float32)
+    if complex_signal:
+        x = (x + 1j * rng.standard_normal(n)).astype(np.complex64)
+    expected = add_awgn(x, 20.0, seed=7)
+
+    # 大きさのそろわない 7 ブロック (チャンクより短いもの・長いものを含む)
+    edges = [
+        0,
+        1,
+        1000,
+        NOISE_CHUNK_SIZE,
+        2 * NOISE_CHUNK_SIZE + 5,
+        3 * NOISE_CHUNK_SIZE,
+        n - 10,
+        n,
+    ]
+    channel = AwgnChannel(20.0, seed=7, signal_power=signal_power(x))
+    blocks = [channel.process(x[a:b]) for a, b in pairwise(edges)]
+    np.testing.assert_array_equal(np.concatenate(blocks), expected)
+
+    # 範囲を別々の通信路で処理しても同じ (並列処理の分け方)
+    ranges = [
+        AwgnChannel(20.0, seed=7, signal_power=signal_power(x)).apply(x[a:b], start=a)
+        for a, b in pairwise(edges[::2] + [n])
+    ]
+    np.testing.assert_array_equal(np.concatenate(ranges), expected)
+
+
+def test_sweep_independent_of_worker_count():
+    """run_snr_sweep の結果は、処理時間を除いてワーカー数によらない"""
+    audio = AudioSource().stereo_sine_tone(440, 1000, 0.25)
+    kwargs = {"snr_dbs": (10.0, 30.0), "seeds": (0, 1), "skip_seconds": 0.05}
+    serial = run_snr_sweep(audio, max_workers=1, **kwargs)
+    parallel = run_snr_sweep(audio, max_workers=3, **kwargs)
+
+    assert len(serial) == len(parallel) == 4
+    for a, b in zip(serial, parallel, strict=True):
+        a.pop("elapsed_s")
+        b.pop("elapsed_s")
+        assert a == b
@@ -0,0 +1,107 @@
+from itertools import pairwise
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from sfumato.dsp.decimator import FirDecimator, design_decimation_chain
+from sfumato.receiver import FmReceiver
+from sfumato.transmitter import FmTransmitter
+from sfumato.utils.audio_source import AudioSource
+
+# 偶数 / 奇数 (素数, 合成数) の間引き率
+FACTORS = [2, 3, 4, 5, 6, 9, 12, 15]
+
+PASSBAND = 0.8  # design_decimation_chain の既定 (出力ナイキストに対する比)
+MAX_PASSBAND_DROOP_DB = 1.0
+MIN_ALIAS_REJECTION_DB = 40.0
+
+
+def tone_gain(q: int, freq: float, n_out: int = 4096) -> float:
+    """
+    周波数 freq (入力ナイキストに対する比) の正弦波を通したときの振幅比
+    (先頭の過渡を除いて実効値から求める)
+    """
+    chain = design_decimation_chain(q)
+    x = np.cos(np.pi * freq * np.arange(n_out * q))
+    y = chain.process(x)[n_out // 4 :]
+    return float(np.sqrt(2 * np.mean(y**2)))
+
+
+def split(x: np.ndarray, sizes=(1, 999, 4096, 7, 12345)) -> list[np.ndarray]:
+    edges = np.cumsum((0, *sizes))
+    return [x[a:b] for a, b in pairwise(edges)] + [x[edges[-1] :]]
+
+
+@pytest.mark.parametrize("q", [1, *FACTORS])
+def test_chain_factor(q):
+    chain = design_decimation_chain(q)
+    assert chain.factor == q
+
+
+@pytest.mark.parametrize("q", FACTORS)
+def test_chain_blocks_match_whole(q):
+    """ブロックに分けて process + flush しても、一括の process と一致する"""
+    rng = np.random.default_rng(q)
+    x = rng.standard_normal((30000, 2))
+
+    whole = design_decimation_chain(q)
+    expected = np.concatenate([whole.process(x), whole.flush().reshape(0, 2)])
+
+    chain = design_decimation_chain(q)
+    blocks = [chain.process(block) for block in split(x)]
+    blocks.append(chain.flush().reshape(0, 2))
+    np.testing.assert_array_equal(np.concatenate(blocks), expected)
+
+
+@pytest.mark.parametrize("q", FACTORS)
+def test_chain_passband(q):
+    """通過域 (出力ナイキストの PASSBAND 倍まで) の利得の変化は 1 dB 以内"""
+    freqs = np.linspace(0.02, PASSBAND, 9) / q
+    gains_db = 20 * np.log10([tone_gain(q, f) for f in freqs])
+    assert np.all(gains_db > -MAX_PASSBAND_DROOP_DB)
+    assert np.all(gains_db < 0.1)
+
+
+@pytest.mark.parametrize("q", FACTORS)
+def test_chain_alias_rejection(q):
+    """間引きで通過域に折り返す周波数 (k * 出力fs ± 通過域) を 40 dB 以上抑える"""
+    offsets = np.linspace(0.0, PASSBAND, 5) / q
+    freqs = [
+        f
+        for k in range(1, q // 2 + 1)
+        for f in np.concatenate([2 * k / q - offsets, 2 * k / q + offsets])
+        if 0 < f < 1
+    ]
+    # CIC の零点では利得がちょうど 0 になる
+    gains_db = 20 * np.log10(np.maximum([tone_gain(q, f) for f in freqs], 1e-12))
+    assert np.max(gains_db) < -MIN_ALIAS_REJECTION_DB
+
+
+@pytest.mark.parametrize("q", [2, 3, 12])
+def test_fir_decimator_matches_signal_decimate(q):
+    x = np.random.default_rng(0).standard_normal(20000)
+    dec = FirDecimator(q)
+    blocks = [dec.process(block) for block in split(x)]
+    blocks.append(dec.flush())
+    np.testing.assert_allclose(
+        np.concatenate(blocks), signal.decimate(x, q, ftype="fir"), atol=1e-12
+    )
+
+
+def test_receiver_odd_ratio_multistage():
+    """IQ_FS / MPX_FS が奇数 (576k / 192k = 3) でも多段デシメーションで受信できる"""
+    audio = AudioSource().stereo_sine_tone(440, 1000, 0.25)
+    iq = FmTransmitter(iq_fs=576000).modulate_iq(audio)
+
+    fir = FmReceiver(iq_fs=576000, decimation="fir").process_iq(iq)
+    rx = FmReceiver(iq_fs=576000, decimation="multistage")
+    mpx = rx.process_iq(iq)
+    assert mpx.shape == fir.shape
+    assert np.all(np.isfinite(mpx))
+
+    rx.reset_stream()
+    blocks = (iq[i : i + 5000] for i in range(0, len(iq), 5000))
+    whole = rx._stereo_decode(mpx, rx._recover_carrier(mpx))
+    streamed = np.concatenate(list(rx.stream_iq(blocks)))
+    np.testing.assert_array_equal(streamed, whole)
@@ -0,0 +1,112 @@
+from itertools import pairwise
+
+import numpy as np
+import pytest
+
+from sfumato import settings
+from sfumato.dsp import pll
+from sfumato.dsp.pll import PilotPLL
+
+FS = settings.MPX_FS
+
+# ブロック分割の境界 (長さ 0 / 1 のブロックも含める)
+SPLITS = [0, 1000, 1000, 1001, 7000, 18000, 30000]
+
+FAST_BACKENDS = [
+    "python",
+    pytest.param(
+        "numba",
+        marks=pytest.mark.skipif(pll.numba is None, reason="numba is not installed"),
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def mpx() -> np.ndarray:
+    """少しずれた 19kHz パイロット + 音声成分 (ロックまでの過渡を含む)"""
+    t = np.arange(SPLITS[-1]) / FS
+    pilot = 0.1 * np.sin(2 * np.pi * (settings.PILOT_FREQ + 5) * t + 0.3)
+    return pilot + 0.45 * np.sin(2 * np.pi * 1000 * t)
+
+
+def run_blocks(p: PilotPLL, x: np.ndarray, method: str = "process"):
+    """SPLITS で区切って順に処理し、出力を連結する"""
+    outputs = [getattr(p, method)(x[a:b]) for a, b in pairwise(SPLITS)]
+    carrier = np.concatenate([c for c, _ in outputs])
+    error = np.concatenate([e for _, e in outputs])
+    return carrier, error
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_backend_matches_reference(mpx, backend):
+    """一括処理で、搬送波・位相誤差・位相・積分器が process_reference と一致する"""
+    ref = PilotPLL(backend="reference")
+    fast = PilotPLL(backend=backend)
+    ref_carrier, ref_error = ref.process_reference(mpx)
+    carrier, error = fast.process(mpx)
+
+    np.testing.assert_array_equal(carrier, ref_carrier)
+    np.testing.assert_array_equal(error, ref_error)
+    assert fast.phase == ref.phase
+    assert fast.freq_integrator == ref.freq_integrator
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_backend_matches_reference_blockwise(mpx, backend):
+    """ブロックに分けても、状態を引き継いで一括の reference と一致する"""
+    ref = PilotPLL(backend="reference")
+    ref_carrier, ref_error = ref.process_reference(mpx)
+
+    fast = PilotPLL(backend=backend)
+    carrier, error = run_blocks(fast, mpx)
+
+    np.testing.assert_array_equal(carrier, ref_carrier)
+    np.testing.assert_array_equal(error, ref_error)
+    assert fast.phase == ref.phase
+    assert fast.freq_integrator == ref.freq_integrator
+
+
+def test_reference_blockwise_matches_whole(mpx):
+    """reference 自身もブロック分割に依存しない"""
+    whole = PilotPLL(backend="reference")
+    whole_carrier, _ = whole.process(mpx)
+    blocks = PilotPLL(backend="reference")
+    carrier, _ = run_blocks(blocks, mpx)
+
+    np.testing.assert_array_equal(carrier, whole_carrier)
+    assert blocks.phase == whole.phase
+    assert blocks.freq_integrator == whole.freq_integrator
+
+
+@pytest.mark.parametrize("lut_bits", [10, 16, 20])
+def test_lut_backends(mpx, lut_bits):
+    """
+    LUT 版: python と numba は (ブロック分割しても) 一致し、reference との差は
+    位相の量子化 (38kHz は位相を2倍するので 2 * 2π / 2^bits) で抑えられる
+    """
+    ref = PilotPLL(backend="reference")
+    ref_carrier, _ = ref.process(mpx)
+
+    lut = PilotPLL(backend="python", lut_bits=lut_bits)
+    carrier, error = lut.process(mpx)
+    assert np.max(np.abs(carrier - ref_carrier)) < 4 * np.pi / 2**lut_bits
+
+    blocks = PilotPLL(backend="python", lut_bits=lut_bits)
+    block_carrier, block_error = run_blocks(blocks, mpx)
+    np.testing.assert_array_equal(block_carrier, carrier)
+    np.testing.assert_array_equal(block_error, error)
+    assert blocks.phase == lut.phase
+    assert blocks.freq_integrator == lut.freq_integrator
+
+    if pll.numba is not None:
+        jit = PilotPLL(backend="numba", lut_bits=lut_bits)
+        jit_carrier, jit_error = run_blocks(jit, mpx)
+        np.testing.assert_array_equal(jit_carrier, carrier)
+        np.testing.assert_array_equal(jit_error, error)
+        assert jit.phase == lut.phase
+        assert jit.freq_integrator == lut.freq_integrator
+
+
+def test_lut_requires_fast_backend():
+    with pytest.raises(ValueError):
+        PilotPLL(backend="reference", lut_bits=10)
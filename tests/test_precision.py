@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from sfumato.channnel import add_awgn
+from sfumato.sweep import _receive, audio_metrics
+from sfumato.transmitter import FmTransmitter
+from sfumato.utils.audio_source import AudioSource
+
+SKIP = 12000  # PLL の引き込みを除く (0.25 s)
+
+# float32 の音声 SN比の低下の許容値 (dB)。実測は 0.01 dB 未満
+MAX_PENALTY_DB = 0.1
+
+# 雑音の無いときの float64 との差 (dB)。実測は約 124 dB
+MIN_CLEAN_SNR_DB = 90.0
+
+
+@pytest.fixture(scope="module")
+def audio() -> np.ndarray:
+    return AudioSource().stereo_sine_tone(440, 1000, 2.0)
+
+
+def modulate(audio: np.ndarray, precision: str, mode: str) -> np.ndarray:
+    tx = FmTransmitter(precision=precision)
+    audio = audio.astype(tx.real_dtype)
+    return tx.modulate_iq(audio) if mode == "iq" else tx.modulate(audio)
+
+
+@pytest.fixture(scope="module", params=["rf", "iq"])
+def signals(request, audio) -> dict:
+    """精度ごとの送信信号と、float64 で雑音無しに受信した基準音声"""
+    signals = {p: modulate(audio, p, request.param) for p in ("float64", "float32")}
+    reference = _receive(signals["float64"], {"precision": "float64"})
+    return {"signals": signals, "reference": reference}
+
+
+def test_float32_waveform_tracks_float64(signals):
+    """
+    位相語のアキュムレータなら 2 秒後も float64 と同じ波形になる
+    (float32 で θ = 2π fc t を直接計算すると、2 秒で位相が 0.3 rad 程度ずれる)
+    """
+    rf64 = signals["signals"]["float64"]
+    rf32 = signals["signals"]["float32"]
+    assert rf32.dtype in (np.float32, np.complex64)
+    assert np.max(np.abs(rf32 - rf64)) < 1e-4
+    assert np.max(np.abs(rf32[-100000:] - rf64[-100000:])) < 1e-4
+
+
+def test_float32_clean_audio_matches_float64(signals):
+    audio32 = _receive(signals["signals"]["float32"], {"precision": "float32"})
+    assert audio32.dtype == np.float32
+    snr = audio_metrics(audio32, signals["reference"], SKIP)["audio_snr_db"]
+    assert snr > MIN_CLEAN_SNR_DB
+
+
+@pytest.mark.parametrize("snr_db", [20.0, 40.0])
+def test_float32_audio_snr_penalty(signals, snr_db):
+    """同じ雑音を加えたとき、float32 の音声 SN比は float64 から MAX_PENALTY_DB 以内"""
+    snr = {}
+    for precision, signal_data in signals["signals"].items():
+        noisy = add_awgn(signal_data, snr_db, seed=0)
+        audio = _receive(noisy, {"precision": precision})
+        snr[precision] = audio_metrics(audio, signals["reference"], SKIP)[
+            "audio_snr_db"
+        ]
+    assert snr["float64"] - snr["float32"] < MAX_PENALTY_DB
@@ -0,0 +1,105 @@
+import itertools
+
+import numpy as np
+import pytest
+from scipy import fft, signal
+
+from sfumato.utils.spectrum import MinMaxEnvelope, StreamingSpectrum, spectrum_of
+
+FS = 48000
+N = 50_000
+NFFT = 1024
+
+
+def _signal(is_complex: bool) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    t = np.arange(N) / FS
+    x = np.cos(2 * np.pi * 3000 * t) + 0.1 * rng.standard_normal(N)
+    if is_complex:
+        x = np.exp(2j * np.pi * 5000 * t) + 0.1 * (
+            rng.standard_normal(N) + 1j * rng.standard_normal(N)
+        )
+    return x
+
+
+def _odd_blocks(x: np.ndarray) -> list[np.ndarray]:
+    """nfft・hop と無関係な奇数長のブロックに分ける (1 サンプルのブロックも含む)"""
+    sizes = itertools.cycle([1, 777, 3, 2049, 511])
+    blocks, start = [], 0
+    while start < len(x):
+        size = next(sizes)
+        blocks.append(x[start : start + size])
+        start += size
+    return blocks
+
+
+@pytest.mark.parametrize("is_complex", [False, True])
+@pytest.mark.parametrize("noverlap", [None, 0, 700])
+def test_psd_matches_welch(is_complex, noverlap):
+    """奇数長のブロックで流しても scipy.signal.welch(..., detrend=False) と一致する"""
+    x = _signal(is_complex)
+    spectrum = StreamingSpectrum(FS, nfft=NFFT, noverlap=noverlap)
+    for block in _odd_blocks(x):
+        spectrum.process(block)
+    freqs, psd = spectrum.psd()
+
+    f_ref, psd_ref = signal.welch(
+        x,
+        FS,
+        nperseg=NFFT,
+        noverlap=noverlap,
+        detrend=False,
+        return_onesided=not is_complex,
+    )
+    if is_complex:
+        f_ref, psd_ref = fft.fftshift(f_ref), fft.fftshift(psd_ref)
+    np.testing.assert_allclose(freqs, f_ref)
+    np.testing.assert_allclose(psd, psd_ref, rtol=1e-12)
+    assert spectrum.num_samples == N
+
+
+@pytest.mark.parametrize("is_complex", [False, True])
+def test_independent_of_block_split(is_complex):
+    """PSD とウォーターフォールはブロックの分け方によらない (丸め誤差の範囲で)"""
+    x = _signal(is_complex)
+    kwargs = {"nfft": NFFT, "waterfall_rows": 16, "waterfall_average": 3}
+    whole = spectrum_of(x, FS, block_size=N, **kwargs)
+    split = StreamingSpectrum(FS, **kwargs)
+    for block in _odd_blocks(x):
+        split.process(block)
+
+    np.testing.assert_allclose(split.psd()[1], whole.psd()[1], rtol=1e-12)
+    times, _, rows = split.waterfall()
+    times_ref, _, rows_ref = whole.waterfall()
+    np.testing.assert_array_equal(times, times_ref)
+    np.testing.assert_allclose(rows, rows_ref, rtol=1e-12)
+    assert split.num_frames == whole.num_frames
+
+
+def test_no_frames_gives_nan():
+    """nfft に満たない信号では PSD は NaN"""
+    spectrum = StreamingSpectrum(FS, nfft=NFFT)
+    spectrum.process(np.ones(NFFT - 1))
+    assert np.isnan(spectrum.psd()[1]).all()
+
+
+@pytest.mark.parametrize("max_points", [4, 64])
+def test_envelope_keeps_global_min_max(max_points):
+    """ブロックに分けて渡しても、包絡線は全体の最小/最大と各区間の最小/最大を保つ"""
+    x = _signal(False)
+    envelope = MinMaxEnvelope(max_points)
+    for block in _odd_blocks(x):
+        envelope.process(block)
+    starts, mins, maxs = envelope.envelope()
+
+    assert envelope.num_samples == N
+    assert mins.min() == x.min()
+    assert maxs.max() == x.max()
+    assert len(mins) < 2 * max_points + 1
+
+    # 各区間は元の信号のその区間の最小/最大そのもの (最後は埋まりかけでもよい)
+    np.testing.assert_array_equal(starts, np.arange(len(mins)) * envelope.bin_size)
+    edges = [*starts, N]
+    for (lo, hi), vmin, vmax in zip(itertools.pairwise(edges), mins, maxs):
+        assert vmin == x[lo:hi].min()
+        assert vmax == x[lo:hi].max()
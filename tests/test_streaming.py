@@ -0,0 +1,147 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from sfumato.channnel import AwgnChannel
+from sfumato.receiver import FmReceiver
+from sfumato.streaming import StreamPipeline, StreamStage, fm_stream_pipeline
+from sfumato.transmitter import FmTransmitter
+from sfumato.utils.audio_source import AudioSource
+
+SIGNAL_POWER = 0.5  # cos の平均電力 (雑音が入力の分け方に依存しないよう固定する)
+
+
+def uneven_blocks(x: np.ndarray, sizes=(100, 4000, 37, 9000, 2500)) -> list:
+    """長さのそろわないブロックに分ける (後の方ほどスロットの確保し直しが起きる)"""
+    blocks, pos, i = [], 0, 0
+    while pos < len(x):
+        size = sizes[i % len(sizes)]
+        blocks.append(x[pos : pos + size])
+        pos += size
+        i += 1
+    return blocks
+
+
+@pytest.mark.parametrize("depth", [1, 2, 4])
+def test_fm_pipeline_matches_serial_blocks(depth):
+    """
+    スレッドのパイプラインの出力は modulate_blocks -> AwgnChannel.process -> stream
+    を1スレッドで順に行ったものとビット単位で一致する
+    """
+    audio = AudioSource().stereo_sine_tone(440, 1000, 0.5)
+    blocks = uneven_blocks(audio)
+
+    tx = FmTransmitter()
+    rx = FmReceiver()
+    channel = AwgnChannel(30.0, seed=3, signal_power=SIGNAL_POWER)
+    noisy = (channel.process(rf) for rf in tx.modulate_blocks(blocks))
+    expected = np.concatenate(list(rx.stream(noisy)))
+
+    pipeline = fm_stream_pipeline(
+        snr_db=30.0, seed=3, signal_power=SIGNAL_POWER, depth=depth
+    )
+    result = np.concatenate(list(pipeline.run(blocks)))
+    np.testing.assert_array_equal(result, expected)
+
+    # 2回目の run() も状態を初期化して同じ結果になる
+    again = np.concatenate(list(pipeline.run(blocks)))
+    np.testing.assert_array_equal(again, expected)
+
+
+@pytest.mark.parametrize("depth", [1, 3])
+def test_backpressure_bounds_blocks_in_flight(depth):
+    """後ろの段が遅くても、各リングは depth を超えず、入力の先読みも有限"""
+    n_stages = 3
+    produced = 0
+    max_ahead = 0
+
+    def source():
+        nonlocal produced
+        for i in range(40):
+            produced += 1
+            yield np.full(16, float(i))
+
+    def slow(block):
+        time.sleep(0.002)
+        return block * 2
+
+    stages = [
+        StreamStage("fast1", lambda b: b + 1),
+        StreamStage("fast2", lambda b: b - 1),
+        StreamStage("slow", slow),
+    ]
+    pipeline = StreamPipeline(stages, depth=depth)
+
+    outputs = []
+    for consumed, out in enumerate(pipeline.run(source()), start=1):
+        max_ahead = max(max_ahead, produced - consumed)
+        outputs.append(out)
+
+    np.testing.assert_array_equal(
+        np.concatenate(outputs), np.repeat(np.arange(40.0) * 2, 16)
+    )
+    report = pipeline.report()
+    assert all(q["max_fill"] <= depth for q in report["queues"])
+    # 入力側は満杯で待たされている (バックプレッシャーが効いている)
+    assert report["queues"][0]["put_wait_s"] > 0
+    # リング (n_stages + 1 個) に depth 個ずつ + 各段と入力・出力で処理中の 1 個ずつ
+    assert max_ahead <= (n_stages + 1) * depth + n_stages + 2
+
+
+def _pipeline_threads() -> list[threading.Thread]:
+    names = {"source", "first", "boom", "last"}
+    return [t for t in threading.enumerate() if t.name in names]
+
+
+@pytest.mark.parametrize("where", ["stage", "flush", "source"])
+def test_error_propagates_and_aborts(where):
+    """どこかで例外が起きたら、全段を止めて run() がその例外を送出する"""
+    processed = []
+
+    def boom(block):
+        if where == "stage" and block[0] == 5:
+            raise RuntimeError("stage failed")
+        return block
+
+    def boom_flush():
+        if where == "flush":
+            raise RuntimeError("flush failed")
+        return np.zeros(0)
+
+    def source():
+        for i in range(1000):
+            if where == "source" and i == 5:
+                raise RuntimeError("source failed")
+            yield np.full(8, float(i))
+
+    def last(block):
+        processed.append(block[0])
+        return block
+
+    pipeline = StreamPipeline(
+        [
+            StreamStage("first", lambda b: b),
+            StreamStage("boom", boom, boom_flush),
+            StreamStage("last", last),
+        ],
+        depth=2,
+    )
+    with pytest.raises(RuntimeError, match=f"{where} failed"):
+        for _ in pipeline.run(source()):
+            pass
+
+    # スレッドはすべて終わっていて、後ろの段は失敗した位置より先を処理していない
+    assert not _pipeline_threads()
+    if where != "flush":
+        assert all(value < 5 for value in processed)
+
+
+def test_closing_generator_stops_threads():
+    """run() のジェネレータを途中で閉じても、スレッドが止まる"""
+    pipeline = StreamPipeline([StreamStage("first", lambda b: b)], depth=1)
+    outputs = pipeline.run(np.full(4, float(i)) for i in range(1000))
+    next(outputs)
+    outputs.close()
+    assert not _pipeline_threads()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from sfumato import transmitter
+from sfumato.transmitter import FmTransmitter
+from sfumato.utils.audio_source import AudioSource
+
+
+@pytest.fixture(scope="module")
+def audio() -> np.ndarray:
+    # MPX で 57600 サンプル = 3.5 チャンク (_MODULATE_CHUNK で割り切れない長さ)
+    audio = AudioSource().stereo_sine_tone(440, 1000, 0.3)
+    n_mpx = len(audio) * 4
+    assert n_mpx % transmitter._MODULATE_CHUNK != 0
+    return audio
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+@pytest.mark.parametrize("channels", ["stereo", "mono"])
+def test_modulate_matches_reference(audio, precision, channels):
+    """
+    チャンクに分けた modulate は、全長の配列で計算する modulate_reference と一致する
+    (積分は前のチャンクの累積値から続けて足し、搬送波の位相はサンプル番号から
+    求めるので、丸めも含めて同じになる)
+    """
+    tx = FmTransmitter(precision=precision)
+    x = audio.astype(tx.real_dtype)
+    if channels == "mono":
+        x = x[:, 0]
+    rf = tx.modulate(x)
+    reference = tx.modulate_reference(x)
+    assert rf.dtype == tx.real_dtype
+    np.testing.assert_array_equal(rf, reference)
+
+
+def test_modulate_short_chunk(audio, monkeypatch):
+    """チャンクが短く、端数のチャンクが何度も出ても結果は変わらない"""
+    tx = FmTransmitter()
+    expected = tx.modulate_reference(audio)
+    monkeypatch.setattr(transmitter, "_MODULATE_CHUNK", 1000)
+    np.testing.assert_array_equal(tx.modulate(audio), expected)
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+def test_modulate_out(audio, precision):
+    """out を渡すとそこに書き込んで返す (形か dtype が違えば ValueError)"""
+    tx = FmTransmitter(precision=precision)
+    x = audio.astype(tx.real_dtype)
+    expected = tx.modulate_reference(x)
+
+    out = np.full(len(expected), np.nan, dtype=tx.real_dtype)
+    result = tx.modulate(x, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, expected)
+
+    with pytest.raises(ValueError):
+        tx.modulate(x, out=np.empty(len(expected) - 1, dtype=tx.real_dtype))
+    other = np.float32 if tx.real_dtype == np.float64 else np.float64
+    with pytest.raises(ValueError):
+        tx.modulate(x, out=np.empty(len(expected), dtype=other))
+
+
+def test_modulate_does_not_disturb_stream(audio):
+    """modulate は ブロック処理 (modulate_block) の状態を変えない"""
+    blocks = np.array_split(audio, 5)
+    tx = FmTransmitter()
+    expected = np.concatenate(list(tx.modulate_blocks(blocks)))
+
+    tx.reset_stream()
+    first = tx.modulate_block(blocks[0])
+    tx.modulate(audio)
+    rest = [tx.modulate_block(block) for block in blocks[1:]]
+    result = np.concatenate([first, *rest, tx.flush()])
+    np.testing.assert_array_equal(result, expected)